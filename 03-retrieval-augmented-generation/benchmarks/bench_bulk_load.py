@@ -0,0 +1,83 @@
+"""
+Compare PGVector.add_embeddings with rag_shared.copy_embeddings.
+
+Loads the same precomputed rows into two scratch collections and reports
+rows/second for each path. Connection settings come from the usual PG* env
+vars (see ../README.md) unless --connection is given.
+
+    python benchmarks/bench_bulk_load.py --rows 20000 --dim 1024
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from dotenv import load_dotenv
+from langchain_postgres import PGVector
+from rag_shared import build_pg_connection_string, copy_embeddings
+from bench_common import UnusedEmbeddings
+
+
+def make_rows(count, dim):
+    rng = random.Random(42)
+    texts = [f"benchmark chunk {i} " + "lorem ipsum " * 80 for i in range(count)]
+    embeddings = [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(count)]
+    metadatas = [{"source": "bench.pdf", "page": i // 10, "chunk_id": i % 10} for i in range(count)]
+    return texts, embeddings, metadatas
+
+
+def load(vectorstore, writer, rows, batch_size, prefix):
+    texts, embeddings, metadatas = rows
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        end = i + batch_size
+        writer(
+            texts=texts[i:end],
+            embeddings=embeddings[i:end],
+            metadatas=metadatas[i:end],
+            ids=[f"{prefix}-{j}" for j in range(i, min(end, len(texts)))],
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    load_dotenv()
+    connection = args.connection or build_pg_connection_string()
+    rows = make_rows(args.rows, args.dim)
+    print(f"{args.rows} rows x {args.dim} dims, batches of {args.batch_size}")
+
+    results = {}
+    for name in ("add_embeddings", "copy_embeddings"):
+        store = PGVector(
+            embeddings=UnusedEmbeddings(),
+            connection=connection,
+            collection_name=f"bench_bulk_{name}",
+            pre_delete_collection=True,
+        )
+        if name == "add_embeddings":
+            writer = store.add_embeddings
+        else:
+            def writer(**kwargs):
+                copy_embeddings(store, **kwargs)
+        try:
+            results[name] = load(store, writer, rows, args.batch_size, name)
+        finally:
+            store.delete_collection()
+
+    for name, seconds in results.items():
+        print(f"{name:<16} {seconds:8.2f}s  {args.rows / seconds:10.0f} rows/s")
+    print(f"speedup          {results['add_embeddings'] / results['copy_embeddings']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
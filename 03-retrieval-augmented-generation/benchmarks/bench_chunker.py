@@ -0,0 +1,71 @@
+"""
+Throughput of rag_shared.split_text_spans versus RecursiveCharacterTextSplitter.
+
+Extracts the bundled PDFs in the repository's data/ directory once, then
+chunks the text repeatedly with both splitters and reports MB/s. The two
+outputs are compared chunk by chunk before timing.
+
+    python benchmarks/bench_chunker.py --repeat 20
+
+The apps no longer depend on langchain-text-splitters; install it for this
+benchmark only (pip install langchain-text-splitters).
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from rag_shared import TEXT_CHUNK_SEPARATORS, get_pdf_text, split_text_spans
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+
+# (chunk_size, chunk_overlap) used by rag_shared.get_text_chunks and 07-aurora-ml-chatbot
+CONFIGS = [(1000, 200), (5000, 500)]
+
+
+def timed(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(text)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--pdf", nargs="*", default=None,
+                        help="PDF files to use instead of ../../data/*.pdf")
+    args = parser.parse_args()
+    logging.getLogger("langchain_text_splitters").setLevel(logging.ERROR)
+
+    pdfs = args.pdf or sorted(glob.glob(os.path.join(DATA_DIR, "*.pdf")))
+    text = get_pdf_text(pdfs)
+    megabytes = len(text.encode("utf-8")) / 1e6
+    print(f"{len(pdfs)} PDFs, {len(text):,} characters")
+
+    for chunk_size, chunk_overlap in CONFIGS:
+        splitter = RecursiveCharacterTextSplitter(
+            separators=TEXT_CHUNK_SEPARATORS,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+        baseline, expected = timed(splitter.split_text, text, args.repeat)
+        spans_time, spans = timed(
+            lambda t: split_text_spans(t, chunk_size, chunk_overlap), text, args.repeat)
+        materialized, _ = timed(
+            lambda t: [t[s:e] for s, e in split_text_spans(t, chunk_size, chunk_overlap)],
+            text, args.repeat)
+        same = [text[s:e] for s, e in spans] == expected
+        print(f"\nchunk_size={chunk_size} overlap={chunk_overlap}: {len(expected)} chunks, identical={same}")
+        print(f"  RecursiveCharacterTextSplitter {baseline * 1000:8.2f} ms  {megabytes / baseline:7.1f} MB/s")
+        print(f"  split_text_spans (offsets)     {spans_time * 1000:8.2f} ms  {megabytes / spans_time:7.1f} MB/s")
+        print(f"  split_text_spans + strings     {materialized * 1000:8.2f} ms  {megabytes / materialized:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
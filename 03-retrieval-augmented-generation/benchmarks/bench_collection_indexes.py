@@ -0,0 +1,138 @@
+"""
+Filtered top-k over many collections: global HNSW index versus per-collection routing.
+
+Loads --collections collections of clustered random vectors into
+langchain_pg_embedding (sizes log-uniform between --min-rows and
+--max-rows, as with one collection per uploaded document), then runs the
+same queries two ways:
+
+* global - one HNSW index over the whole table, filtered by collection_id
+           (HybridRetriever with collection_indexes=False);
+* routed - partial HNSW indexes for collections with at least --index-rows
+           rows and exact scans for the rest (sync_collection_indexes +
+           collection_indexes=True).
+
+Reports recall@k against exact NumPy search, p50/p95 latency for small and
+large collections, and the build time and size of the indexes.
+
+    python benchmarks/bench_collection_indexes.py --collections 150 --dims 1024 --queries 300
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from dotenv import load_dotenv
+from langchain_postgres import PGVector
+from sqlalchemy import text
+from rag_shared import (COLLECTION_INDEX_PREFIX, HybridRetriever, build_pg_connection_string,
+                        copy_embeddings, drop_collection_indexes, ensure_hybrid_indexes,
+                        get_pg_engine, percentile, sync_collection_indexes)
+from bench_common import UnusedEmbeddings
+
+
+def make_collection(rng, rows, dims, clusters=8):
+    centers = rng.standard_normal((clusters, dims))
+    vectors = centers[rng.integers(clusters, size=rows)] + 0.6 * rng.standard_normal((rows, dims))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def index_stats(engine, pattern):
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT count(*), coalesce(sum(pg_relation_size(indexrelid)), 0) "
+            "FROM pg_stat_user_indexes WHERE indexrelname LIKE :p"
+        ), {"p": pattern}).one()
+    return row[0], row[1] / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--collections", type=int, default=120)
+    parser.add_argument("--min-rows", type=int, default=50)
+    parser.add_argument("--max-rows", type=int, default=8000)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--index-rows", type=int, default=2000,
+                        help="COLLECTION_INDEX_MIN_ROWS for the routed run")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = get_pg_engine(args.connection or build_pg_connection_string())
+    rng = np.random.default_rng(42)
+    embeddings = UnusedEmbeddings()
+    lo, hi = math.log(args.min_rows), math.log(args.max_rows)
+    sizes = [int(math.exp(rng.uniform(lo, hi))) for _ in range(args.collections)]
+
+    stores, vectors = [], []
+    start = time.perf_counter()
+    for i, rows in enumerate(sizes):
+        store = PGVector(embeddings=embeddings, connection=engine,
+                         collection_name=f"bench_coll_{i}", pre_delete_collection=True)
+        data = make_collection(rng, rows, args.dims)
+        copy_embeddings(store, [f"chunk {j}" for j in range(rows)], data.tolist(),
+                        ids=[f"bench-coll-{i}-{j}" for j in range(rows)])
+        stores.append(store)
+        vectors.append(data)
+    print(f"{args.collections} collections, {sum(sizes)} rows ({min(sizes)}-{max(sizes)} each), "
+          f"{args.dims} dims, loaded in {time.perf_counter() - start:.1f}s")
+
+    # Queries: a random row of a random collection plus noise; truth by exact search
+    queries = []
+    for _ in range(args.queries):
+        c = int(rng.integers(args.collections))
+        q = vectors[c][rng.integers(sizes[c])] + 0.3 * rng.standard_normal(args.dims)
+        q = (q / np.linalg.norm(q)).astype(np.float32)
+        top = np.argsort(-(vectors[c] @ q))[:args.k]
+        queries.append((c, q.tolist(), {f"bench-coll-{c}-{j}" for j in top}))
+
+    try:
+        start = time.perf_counter()
+        ensure_hybrid_indexes(stores[0], args.dims, global_hnsw=True)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE langchain_pg_embedding"))
+        global_build = time.perf_counter() - start
+        start = time.perf_counter()
+        built, _ = sync_collection_indexes(engine, args.dims, min_rows=args.index_rows)
+        routed_build = time.perf_counter() - start
+        count, size_mb = index_stats(engine, f"ix_langchain_pg_embedding_hnsw_{args.dims}")
+        print(f"global index: built in {global_build:.1f}s, {size_mb:.1f} MB")
+        count, size_mb = index_stats(engine, f"{COLLECTION_INDEX_PREFIX}{args.dims}_%")
+        print(f"per-collection: {len(built)} indexes (>= {args.index_rows} rows) "
+              f"built in {routed_build:.1f}s, {size_mb:.1f} MB")
+
+        fetch_k = max(args.k, 40)
+        print(f"{'mode':<7} {'collections':<12} {'queries':>7} {'recall@k':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8}")
+        for mode, routed in (("global", False), ("routed", True)):
+            retrievers = [HybridRetriever(vectorstore=s, k=args.k, fetch_k=fetch_k, sparse=False,
+                                          collection_indexes=routed) for s in stores]
+            retrievers[0]._search("", queries[0][1])  # warm caches
+            results = {"small": ([], []), "large": ([], [])}
+            for c, q, truth in queries:
+                begin = time.perf_counter()
+                docs = retrievers[c]._search("", q)
+                elapsed = (time.perf_counter() - begin) * 1000
+                recall, latency = results["large" if sizes[c] >= args.index_rows else "small"]
+                recall.append(len(truth & {d.id for d in docs}) / len(truth))
+                latency.append(elapsed)
+            for group, (recall, latency) in results.items():
+                if latency:
+                    label = f"{group} ({'>=' if group == 'large' else '<'}{args.index_rows})"
+                    print(f"{mode:<7} {label:<12} {len(latency):>7} "
+                          f"{sum(recall) / len(recall):9.2%} "
+                          f"{percentile(latency, 50):8.2f} {percentile(latency, 95):8.2f}")
+    finally:
+        for store in stores:
+            store.delete_collection()
+        drop_collection_indexes(engine)
+
+
+if __name__ == "__main__":
+    main()
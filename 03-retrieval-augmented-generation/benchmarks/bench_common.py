@@ -0,0 +1,20 @@
+"""
+Helpers shared by the benchmarks in this directory.
+"""
+from langchain_core.embeddings import Embeddings
+
+
+class UnusedEmbeddings(Embeddings):
+    """
+    Embeddings for a PGVector whose vectors are precomputed.
+
+    The benchmarks write vectors with copy_embeddings and query with
+    vectors directly, so nothing should ever embed text; raising makes a
+    path that does fail instead of silently calling a model.
+    """
+
+    def embed_documents(self, texts):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        raise NotImplementedError
@@ -0,0 +1,377 @@
+"""
+Closed-loop concurrency benchmark for the 03 Q&A apps with stubbed models.
+
+Imports an app module headlessly and replaces the remote models with local
+stand-ins of configurable latency: a fake bedrock-runtime client (Titan
+embeddings and Converse) for question-answering-bedrock, and stub
+embeddings, LLM and cross-encoder for question-answering-opensource. The
+app's own conversation chain then runs against a local Postgres+pgvector.
+
+For each --workers level, N threads each send a question, wait for the
+answer, and send the next one (closed loop) for --duration seconds, as N
+Streamlit sessions in one server process would. --ingest-workers threads
+run rag_shared.IngestionPipeline on the bundled PDFs at the same time.
+Reports:
+
+* throughput and p50/p95/p99 request latency;
+* connection pool waits (time spent in QueuePool checkout) and the most
+  connections checked out at once;
+* process CPU per request and cores used, plus wall-clock p50/p95 and
+  mean thread CPU per stage (condense, retrieval, generation, ...).
+
+    python benchmarks/bench_concurrency.py --app bedrock --workers 1 4 16 --duration 30 \\
+        --llm-latency-ms 1500 --embed-latency-ms 60 --ingest-workers 1
+
+The stub latencies are sleeps, so they cost no CPU; what remains is this
+host's own work (LangChain, SQL, serialization, chunking).
+"""
+import argparse
+import glob
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAG_DIR = os.path.join(BENCH_DIR, '..')
+DATA_DIR = os.path.join(RAG_DIR, '..', 'data')
+sys.path.append(RAG_DIR)
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+from langchain_postgres import PGVector
+import rag_retrieval
+from rag_shared import (IngestionPipeline, StageTracer, build_pg_connection_string,
+                        get_pdf_text, get_pg_engine, get_text_chunks, percentile)
+
+ANSWER = ("Based on the provided context: Aurora PostgreSQL supports pgvector for "
+          "similarity search. " * 8).strip()
+
+
+def stub_vector(text, dimensions):
+    """Deterministic unit vector for *text* (bag of hashed words)."""
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+class StubBedrockClient:
+    """bedrock-runtime stand-in: Titan embeddings and Converse with fixed latencies."""
+
+    meta = SimpleNamespace(region_name="us-west-2")
+
+    def __init__(self, args):
+        self.args = args
+
+    def invoke_model(self, body, modelId, accept=None, contentType=None, **kwargs):
+        sleep_ms(self.args.embed_latency_ms)
+        request = json.loads(body)
+        text = request["inputText"]
+        payload = {"embedding": stub_vector(text, request.get("dimensions", 1024)),
+                   "inputTextTokenCount": len(text) // 4}
+        return {"body": io.BytesIO(json.dumps(payload).encode()),
+                "contentType": "application/json"}
+
+    def converse(self, **kwargs):
+        generation_ms = self.args.output_tokens / self.args.tokens_per_second * 1000
+        sleep_ms(self.args.llm_latency_ms + generation_ms)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": ANSWER}]}},
+            "stopReason": "end_turn",
+            "usage": {"inputTokens": 1000, "outputTokens": self.args.output_tokens,
+                      "totalTokens": 1000 + self.args.output_tokens},
+            "metrics": {"latencyMs": int(self.args.llm_latency_ms + generation_ms)},
+        }
+
+
+class StubEmbeddings(Embeddings):
+    """Local embedding model stand-in (per-call latency, per-text cost)."""
+
+    def __init__(self, args, dimensions=768):
+        self.args = args
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts):
+        sleep_ms(self.args.embed_latency_ms * max(1, len(texts) // 8))
+        return [stub_vector(t, self.dimensions) for t in texts]
+
+    def embed_query(self, text):
+        sleep_ms(self.args.embed_latency_ms)
+        return stub_vector(text, self.dimensions)
+
+
+class StubLLM(LLM):
+    """HuggingFaceEndpoint stand-in."""
+
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        sleep_ms(self.latency_ms)
+        return ANSWER
+
+
+class StubCrossEncoder:
+    def __init__(self, args):
+        self.args = args
+
+    def predict(self, pairs, **kwargs):
+        import numpy as np
+        sleep_ms(self.args.rerank_latency_ms * len(pairs))
+        return np.array([len(set(q.split()) & set(d.split())) for q, d in pairs], dtype=float)
+
+
+class CpuStageTracer(StageTracer):
+    """
+    StageTracer that also sums thread CPU time per stage (no file export).
+
+    Only runs that start and end on the same thread are counted; a stage
+    handed to an executor thread shows its wall time but no CPU.
+    """
+
+    def __init__(self):
+        super().__init__(path=None)
+        self.cpu_ms = defaultdict(float)
+
+    def _start(self, run_id, parent_run_id, name, stage=None):
+        super()._start(run_id, parent_run_id, name, stage)
+        self._runs[run_id]["cpu"] = (threading.get_ident(), time.thread_time_ns())
+
+    def _end(self, run_id, error=None):
+        run = self._runs.get(run_id)
+        if run is not None and run["stage"] and "end_ns" not in run:
+            thread, cpu_start = run["cpu"]
+            if thread == threading.get_ident():
+                self.cpu_ms[run["stage"]] += (time.thread_time_ns() - cpu_start) / 1e6
+        super()._end(run_id, error)
+
+
+class PoolWaits:
+    """Time every QueuePool checkout of *engine* and track connections in use."""
+
+    def __init__(self, engine):
+        self.waits = []
+        self.max_checked_out = 0
+        self._lock = threading.Lock()
+        pool = engine.pool
+        do_get = pool._do_get
+
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                waited = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    self.waits.append(waited)
+                    self.max_checked_out = max(self.max_checked_out, pool.checkedout())
+
+        pool._do_get = timed_do_get
+
+    def reset(self):
+        with self._lock:
+            self.waits = []
+            self.max_checked_out = 0
+
+
+def load_bedrock_app(args, connection):
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    sys.path.insert(0, os.path.join(RAG_DIR, "question-answering-bedrock"))
+    import app
+    app.BEDROCK_CLIENT = StubBedrockClient(args)
+    app.connection = connection
+    vectorstore = PGVector(connection=get_pg_engine(connection), embeddings=app.get_embeddings(),
+                           collection_name="bench_concurrency", use_jsonb=True)
+    model = args.model or next(iter(app.MODEL_CONFIG))
+    chain = app.get_conversation_chain(vectorstore, model)
+
+    def ask(question, chat_history, tracer):
+        response = chain({"question": question, "chat_history": chat_history, "tracer": tracer})
+        if response["answer"].startswith("I encountered an error"):
+            raise RuntimeError(response["answer"])
+        return response["chat_history"]
+
+    return vectorstore, ask
+
+
+def load_opensource_app(args, connection):
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    sys.path.insert(0, os.path.join(RAG_DIR, "question-answering-opensource"))
+    import app
+    from langchain_core.messages import AIMessage, HumanMessage
+    app.HuggingFaceEndpoint = lambda **kwargs: StubLLM(latency_ms=args.llm_latency_ms)
+    rag_retrieval.get_cross_encoder = lambda *a, **kw: StubCrossEncoder(args)
+    vectorstore = PGVector(connection=get_pg_engine(connection), embeddings=StubEmbeddings(args),
+                           collection_name="bench_concurrency", use_jsonb=True)
+    chain = app.get_conversation_chain(vectorstore)
+
+    def ask(question, chat_history, tracer):
+        result = chain.invoke(
+            {"input": question, "chat_history": app.PACKER.pack_history(chat_history)},
+            config={"callbacks": [tracer]},
+        )
+        return chat_history + [HumanMessage(content=question),
+                               AIMessage(content=result.get("answer", ""))]
+
+    return vectorstore, ask
+
+
+def run_level(workers, args, ask, questions, ingest_vectorstore, pool_waits):
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, errors = [], []
+    stage_ms, stage_cpu = defaultdict(list), defaultdict(list)
+    ingests = []
+
+    def qa_worker(seed):
+        rng = random.Random(seed)
+        history = []
+        while not stop.is_set():
+            if len(history) >= 2 * args.turns:
+                history = []
+            tracer = CpuStageTracer()
+            start = time.perf_counter()
+            try:
+                history = ask(rng.choice(questions), history, tracer)
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+                history = []
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                for stage, values in tracer.stage_durations().items():
+                    stage_ms[stage].extend(values)
+                for stage, cpu in tracer.cpu_ms.items():
+                    stage_cpu[stage].append(cpu)
+            sleep_ms(args.think_ms)
+
+    def ingest_worker(index):
+        run = 0
+        while not stop.is_set():
+            store = PGVector(connection=ingest_vectorstore._engine,
+                             embeddings=ingest_vectorstore.embeddings,
+                             collection_name=f"bench_ingest_{index}_{run}", use_jsonb=True)
+            try:
+                stats = IngestionPipeline(store).run(args.pdfs)
+                with lock:
+                    ingests.append(stats)
+            except Exception as exc:
+                with lock:
+                    errors.append(f"ingest: {exc!r}")
+            finally:
+                store.delete_collection()
+            run += 1
+
+    threads = [threading.Thread(target=qa_worker, args=(i,), daemon=True) for i in range(workers)]
+    threads += [threading.Thread(target=ingest_worker, args=(i,), daemon=True)
+                for i in range(args.ingest_workers)]
+    pool_waits.reset()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    waits = pool_waits.waits
+    slow_waits = [w for w in waits if w >= 1.0]
+    print(f"{workers:>7} {len(latencies) / wall:7.2f} "
+          f"{percentile(latencies, 50) or 0:8.0f} {percentile(latencies, 95) or 0:8.0f} "
+          f"{percentile(latencies, 99) or 0:8.0f} {len(errors):6} "
+          f"{len(slow_waits):6}/{len(waits):<6} {percentile(waits, 95) or 0:8.1f} "
+          f"{pool_waits.max_checked_out:6} "
+          f"{cpu / max(len(latencies), 1) * 1000:9.1f} {cpu / wall:6.2f}")
+    for stage in sorted(stage_ms):
+        cpu_values = stage_cpu.get(stage)
+        cpu_mean = f"{sum(cpu_values) / len(cpu_values):8.1f}" if cpu_values else f"{'-':>8}"
+        print(f"{'':>9}{stage:<16} p50 {percentile(stage_ms[stage], 50):8.1f} ms  "
+              f"p95 {percentile(stage_ms[stage], 95):8.1f} ms  cpu {cpu_mean} ms")
+    if ingests:
+        pages = sum(s.pages for s in ingests)
+        print(f"{'':>9}{'ingestion':<16} {len(ingests)} runs, {pages / wall:.1f} pages/s, "
+              f"mean {sum(s.total_seconds for s in ingests) / len(ingests):.1f} s/run")
+    for error in sorted(set(errors))[:3]:
+        print(f"{'':>9}error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", choices=["bedrock", "opensource"], default="bedrock")
+    parser.add_argument("--model", default=None, help="Bedrock app MODEL_CONFIG key")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--turns", type=int, default=2,
+                        help="questions per conversation before its history is reset")
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0,
+                        help="stub LLM time to first token")
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=40.0)
+    parser.add_argument("--rerank-latency-ms", type=float, default=1.0, help="per pair")
+    parser.add_argument("--ingest-workers", type=int, default=0)
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="leave the Bedrock app's semantic answer cache on")
+    parser.add_argument("--pdf", nargs="*", default=None,
+                        help="PDF files to use instead of ../../data/*.pdf")
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    load_dotenv()
+    os.environ["TRACE_PATH"] = ""
+    if not args.answer_cache:
+        os.environ["ANSWER_CACHE"] = "0"
+    connection = args.connection or build_pg_connection_string()
+    args.pdfs = args.pdf or sorted(glob.glob(os.path.join(DATA_DIR, "*.pdf")))
+
+    loader = load_bedrock_app if args.app == "bedrock" else load_opensource_app
+    vectorstore, ask = loader(args, connection)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # Load the corpus once; questions are the opening words of its chunks
+    stats = IngestionPipeline(vectorstore).run(args.pdfs)
+    chunks = list(get_text_chunks(get_pdf_text(args.pdfs)))
+    questions = [" ".join(c.split()[:10]) + "?" for c in chunks if len(c.split()) >= 10]
+    pool_waits = PoolWaits(vectorstore._engine)
+    print(f"{args.app} app: {stats.rows} new chunks loaded, {len(questions)} questions, "
+          f"LLM {args.llm_latency_ms:.0f} ms + {args.output_tokens} tokens at "
+          f"{args.tokens_per_second:.0f}/s, embeddings {args.embed_latency_ms:.0f} ms, "
+          f"pool {vectorstore._engine.pool.size()}+{vectorstore._engine.pool._max_overflow}")
+    ask(questions[0], [], CpuStageTracer())  # build indexes, warm caches
+
+    print(f"{'workers':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6} "
+          f"{'waits>=1ms':>13} {'wait p95':>8} {'max out':>7} {'cpu ms/req':>10} {'cores':>6}")
+    try:
+        for workers in args.workers:
+            run_level(workers, args, ask, questions, vectorstore, pool_waits)
+    finally:
+        vectorstore.delete_collection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+HNSW index size, build time, recall@k and query latency: float32 versus halfvec.
+
+Loads --rows clustered random vectors of --dims dimensions into one
+collection, builds its per-collection HNSW index once per storage
+(``embedding::vector(N)`` and ``embedding::halfvec(N)``) with
+ensure_collection_index, and runs the same queries through
+HybridRetriever's vector leg against each. Recall@k is measured against
+exact float32 NumPy search. Needs pgvector >= 0.7.0.
+
+    python benchmarks/bench_halfvec.py --rows 200000 --dims 1024 --queries 500
+
+Compare the index sizes with ``SHOW shared_buffers``: the gain shows up
+when the float32 index no longer fits and halfvec does.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from dotenv import load_dotenv
+from langchain_postgres import PGVector
+from sqlalchemy import text
+from rag_shared import (VECTOR_STORAGE_TYPES, HybridRetriever, build_pg_connection_string,
+                        collection_index_name, copy_embeddings, drop_collection_indexes,
+                        ensure_collection_index, get_pg_engine, percentile)
+from bench_common import UnusedEmbeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dims", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = get_pg_engine(args.connection or build_pg_connection_string())
+    rng = np.random.default_rng(42)
+    centers = rng.standard_normal((args.clusters, args.dims))
+    data = centers[rng.integers(args.clusters, size=args.rows)]
+    data += 0.8 * rng.standard_normal((args.rows, args.dims))
+    data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+    store = PGVector(embeddings=UnusedEmbeddings(), connection=engine,
+                     collection_name="bench_halfvec", pre_delete_collection=True)
+    start = time.perf_counter()
+    for i in range(0, args.rows, 2000):
+        batch = data[i:i + 2000]
+        copy_embeddings(store, [f"chunk {j}" for j in range(i, i + len(batch))], batch.tolist(),
+                        ids=[f"bench-halfvec-{j}" for j in range(i, i + len(batch))])
+    with engine.connect() as conn:
+        shared_buffers = conn.execute(text("SHOW shared_buffers")).scalar()
+        collection_uuid = conn.execute(text(
+            "SELECT uuid FROM langchain_pg_collection WHERE name = 'bench_halfvec'")).scalar()
+    print(f"{args.rows} x {args.dims}-d vectors loaded in {time.perf_counter() - start:.1f}s, "
+          f"shared_buffers {shared_buffers}")
+
+    queries = []
+    for _ in range(args.queries):
+        q = data[rng.integers(args.rows)] + 0.3 * rng.standard_normal(args.dims)
+        q = (q / np.linalg.norm(q)).astype(np.float32)
+        truth = {f"bench-halfvec-{j}" for j in np.argsort(-(data @ q))[:args.k]}
+        queries.append((q.tolist(), truth))
+
+    print(f"{'storage':<8} {'build s':>8} {'index MB':>9} {'recall@k':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for storage in VECTOR_STORAGE_TYPES:
+            start = time.perf_counter()
+            ensure_collection_index(store, args.dims, min_rows=1, storage=storage)
+            build = time.perf_counter() - start
+            with engine.connect() as conn:
+                size = conn.execute(text("SELECT pg_relation_size(to_regclass(:n))"), {
+                    "n": collection_index_name(collection_uuid, args.dims, storage)}).scalar()
+            retriever = HybridRetriever(vectorstore=store, k=args.k, fetch_k=args.k, sparse=False,
+                                        collection_indexes=True, storage=storage,
+                                        ef_search=args.ef_search)
+            for q, _ in queries[:20]:
+                retriever._search("", q)  # warm the index into shared_buffers
+            recall, latency = [], []
+            for q, truth in queries:
+                begin = time.perf_counter()
+                docs = retriever._search("", q)
+                latency.append((time.perf_counter() - begin) * 1000)
+                recall.append(len(truth & {d.id for d in docs}) / len(truth))
+            print(f"{storage:<8} {build:8.1f} {size / 2**20:9.1f} "
+                  f"{sum(recall) / len(recall):9.2%} "
+                  f"{percentile(latency, 50):8.2f} {percentile(latency, 95):8.2f}")
+    finally:
+        store.delete_collection()
+        drop_collection_indexes(engine)
+
+
+if __name__ == "__main__":
+    main()
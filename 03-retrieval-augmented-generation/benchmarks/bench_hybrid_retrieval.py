@@ -0,0 +1,156 @@
+"""
+Recall and latency of dense-only versus hybrid (full-text + vector, RRF) retrieval.
+
+Chunks the PDFs in the repository's data/ directory into a scratch
+collection, then builds two query sets from the chunks themselves:
+
+* exact   - "What does the documentation say about <term>?" for a rare
+            term (a version number, identifier or product name) that occurs
+            in at most --max-df chunks; any chunk containing it is relevant.
+* passage - the first words of a chunk; only that chunk is relevant.
+
+For each retriever it reports recall@k and p50/p95 query latency
+(excluding the query embedding, which both share).
+
+    python benchmarks/bench_hybrid_retrieval.py --embeddings bedrock --queries 200
+
+``--embeddings hashing`` runs offline with a bag-of-words hashing model;
+its recall numbers are only a smoke test, not representative of Titan or
+mpnet.
+"""
+import argparse
+import glob
+import hashlib
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_postgres import PGVector
+from rag_shared import (HybridRetriever, build_pg_connection_string, copy_embeddings,
+                        get_pdf_text, get_text_chunks)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+TERM_PATTERN = re.compile(r"\b(?=\w*\d)\w[\w.]*\w\b|\b[A-Z][A-Za-z]*[A-Z]\w*\b")
+
+
+class HashingEmbeddings(Embeddings):
+    """Offline bag-of-words embeddings for smoke runs."""
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def embed_query(self, text):
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % self.dimensions] += 1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def make_embeddings(name):
+    if name == "bedrock":
+        from langchain_aws import BedrockEmbeddings
+        return BedrockEmbeddings(model_id="amazon.titan-embed-text-v2:0")
+    if name == "hf":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+    return HashingEmbeddings()
+
+
+def build_queries(chunks, count, max_df, rng):
+    """Return [(kind, query, relevant_indexes)] sampled from *chunks*."""
+    postings = {}
+    for i, chunk in enumerate(chunks):
+        for term in set(TERM_PATTERN.findall(chunk)):
+            postings.setdefault(term, set()).add(i)
+    terms = sorted(t for t, docs in postings.items() if len(docs) <= max_df and len(t) > 2)
+    rng.shuffle(terms)
+    queries = [("exact", f"What does the documentation say about {t}?", postings[t])
+               for t in terms[:count]]
+    for i in rng.sample(range(len(chunks)), min(count, len(chunks))):
+        words = chunks[i].split()[:12]
+        if len(words) >= 6:
+            queries.append(("passage", " ".join(words), {i}))
+    return queries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--embeddings", choices=["bedrock", "hf", "hashing"], default="bedrock")
+    parser.add_argument("--queries", type=int, default=100, help="queries per set")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--max-df", type=int, default=2,
+                        help="max chunks an exact-query term may occur in")
+    parser.add_argument("--pdf", nargs="*", default=None,
+                        help="PDF files to use instead of ../../data/*.pdf")
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    load_dotenv()
+    connection = args.connection or build_pg_connection_string()
+    rng = random.Random(42)
+    embeddings = make_embeddings(args.embeddings)
+
+    pdfs = args.pdf or sorted(glob.glob(os.path.join(DATA_DIR, "*.pdf")))
+    chunks = list(get_text_chunks(get_pdf_text(pdfs)))
+    queries = build_queries(chunks, args.queries, args.max_df, rng)
+    print(f"{len(pdfs)} PDFs, {len(chunks)} chunks, {len(queries)} queries, "
+          f"{args.embeddings} embeddings, k={args.k}")
+
+    store = PGVector(embeddings=embeddings, connection=connection,
+                     collection_name="bench_hybrid", pre_delete_collection=True)
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(chunks), 256):
+            batch = chunks[i:i + 256]
+            copy_embeddings(store, batch, embeddings.embed_documents(batch),
+                            ids=[f"bench-hybrid-{j}" for j in range(i, i + len(batch))])
+        print(f"loaded in {time.perf_counter() - start:.1f}s")
+        query_vectors = embeddings.embed_documents([q for _, q, _ in queries])
+
+        hybrid = HybridRetriever(vectorstore=store, k=args.k, fetch_k=args.fetch_k,
+                                 ef_search=max(40, args.fetch_k))
+        retrievers = {
+            "similarity": lambda q, v: store.similarity_search_by_vector(v, k=args.k),
+            "hybrid": hybrid._search,
+        }
+        for retrieve in retrievers.values():
+            retrieve(queries[0][1], query_vectors[0])  # create indexes, warm caches
+
+        print(f"{'retriever':<11} {'set':<8} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, retrieve in retrievers.items():
+            hits, latencies = Counter(), {}
+            for (kind, query, relevant), vector in zip(queries, query_vectors):
+                start = time.perf_counter()
+                docs = retrieve(query, vector)
+                latencies.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+                if any(int(d.id.rsplit("-", 1)[1]) in relevant for d in docs):
+                    hits[kind] += 1
+            for kind, values in latencies.items():
+                print(f"{name:<11} {kind:<8} {hits[kind] / len(values):9.2%} "
+                      f"{statistics.median(values):8.2f} {percentile(values, 95):8.2f}")
+    finally:
+        store.delete_collection()
+
+
+if __name__ == "__main__":
+    main()
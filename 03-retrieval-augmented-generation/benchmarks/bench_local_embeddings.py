@@ -0,0 +1,111 @@
+"""
+Latency, throughput and fidelity of the local all-mpnet-base-v2 backends.
+
+Embeds chunks of the PDFs in the repository's data/ directory with each
+rag_shared.LocalEmbeddingEngine backend (fp32 PyTorch, fp32 ONNX Runtime,
+int8 ONNX Runtime) and reports:
+
+* single-query latency (p50/p95), one request at a time;
+* document throughput, texts/second in batches;
+* concurrent throughput, --clients threads each embedding one query at a
+  time, with dynamic batching and with batching disabled (max batch 1);
+* min/mean cosine similarity to the fp32 PyTorch vectors, checked against
+  rag_shared.LOCAL_EMBEDDING_TOLERANCE.
+
+Needs sentence-transformers[onnx] (see question-answering-opensource/requirements.txt).
+
+    python benchmarks/bench_local_embeddings.py --texts 512 --clients 8
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from rag_shared import (DEFAULT_LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_TOLERANCE,
+                        LocalEmbeddingEngine, get_pdf_text, get_text_chunks)
+from rag_local_embeddings import _load_sentence_transformer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def concurrent_throughput(engine, queries, clients):
+    """Queries/second with *clients* threads sharing *engine*."""
+    def client(offset):
+        for query in queries[offset::clients]:
+            engine.encode([query])
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=DEFAULT_LOCAL_EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=256, help="document chunks to embed")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", nargs="*", default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+
+    pdfs = sorted(glob.glob(os.path.join(DATA_DIR, "*.pdf")))
+    chunks = list(get_text_chunks(get_pdf_text(pdfs)))
+    texts = (chunks * (args.texts // max(len(chunks), 1) + 1))[:args.texts]
+    queries = [" ".join(chunk.split()[:12]) for chunk in texts][:args.queries]
+    print(f"{args.model}: {len(texts)} chunks, {len(queries)} queries, {args.clients} clients")
+
+    reference = None
+    print(f"{'backend':<10} {'load s':>7} {'q p50 ms':>9} {'q p95 ms':>9} {'docs/s':>8} "
+          f"{'conc q/s':>9} {'serial q/s':>10} {'min cos':>8} {'mean cos':>9}")
+    for backend in args.backends:
+        start = time.perf_counter()
+        model = _load_sentence_transformer(args.model, backend)
+        load_seconds = time.perf_counter() - start
+        engine = LocalEmbeddingEngine(model, backend=backend, max_batch_size=args.batch_size)
+        unbatched = LocalEmbeddingEngine(model, backend=backend, max_batch_size=1)
+        engine.encode(queries[:4])  # warm-up
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            engine.encode([query])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        vectors = np.array(engine.encode(texts), dtype=np.float32)
+        docs_per_second = len(texts) / (time.perf_counter() - start)
+
+        batched_qps = concurrent_throughput(engine, queries, args.clients)
+        serial_qps = concurrent_throughput(unbatched, queries, args.clients)
+
+        if reference is None:
+            reference = vectors
+        cosine = np.sum(vectors * reference, axis=1)
+        print(f"{backend:<10} {load_seconds:7.1f} {statistics.median(latencies):9.2f} "
+              f"{percentile(latencies, 95):9.2f} {docs_per_second:8.1f} {batched_qps:9.1f} "
+              f"{serial_qps:10.1f} {cosine.min():8.4f} {cosine.mean():9.4f}")
+        if vectors.shape[1] != reference.shape[1] or 1 - cosine.min() > LOCAL_EMBEDDING_TOLERANCE:
+            print(f"  {backend} exceeds tolerance: cosine distance {1 - cosine.min():.4f} "
+                  f"> {LOCAL_EMBEDDING_TOLERANCE}")
+    if args.backends[0] != "torch":
+        print(f"cosine columns compare against {args.backends[0]}, not torch")
+
+
+if __name__ == "__main__":
+    main()
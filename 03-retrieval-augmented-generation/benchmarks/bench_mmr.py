@@ -0,0 +1,122 @@
+"""
+Latency and redundancy of plain top-k versus MMR retrieval at N=50 and N=200 candidates.
+
+Loads --rows vectors into one collection as runs of near-duplicates (each
+passage followed by --copies perturbed copies, like overlapping chunks of
+one page) and runs the same queries through:
+
+* similarity  - HybridRetriever's vector leg, top k;
+* mmr N       - MMRRetriever: one binary-protocol query for the N nearest
+                rows and their embeddings, vectorized MMR selection;
+* langchain N - PGVector.max_marginal_relevance_search_by_vector, which
+                fetches embeddings through the ORM for the same selection.
+
+Reports p50/p95 latency, the median time of MMRRetriever's selection step
+alone, and the mean highest cosine similarity between two results of one
+query (1.0 = the results include a near-duplicate pair).
+
+    python benchmarks/bench_mmr.py --rows 50000 --dims 1024 --queries 300
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import numpy as np
+from dotenv import load_dotenv
+from langchain_postgres import PGVector
+from rag_shared import (HybridRetriever, MMRRetriever, build_pg_connection_string,
+                        copy_embeddings, drop_collection_indexes, ensure_collection_index,
+                        get_pg_engine, mmr_select, percentile)
+from bench_common import UnusedEmbeddings
+
+
+def redundancy(ids, vectors_by_id):
+    """Highest cosine similarity between two of the returned chunks."""
+    v = np.array([vectors_by_id[i] for i in ids])
+    sims = v @ v.T
+    np.fill_diagonal(sims, -1.0)
+    return float(sims.max()) if len(ids) > 1 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dims", type=int, default=1024)
+    parser.add_argument("--copies", type=int, default=3,
+                        help="near-duplicates per passage (overlapping chunks)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = get_pg_engine(args.connection or build_pg_connection_string())
+    rng = np.random.default_rng(42)
+    passages = args.rows // (args.copies + 1)
+    base = rng.standard_normal((passages, args.dims))
+    data = np.repeat(base, args.copies + 1, axis=0)
+    data += 0.15 * rng.standard_normal(data.shape)
+    data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+    ids = [f"bench-mmr-{j}" for j in range(len(data))]
+    vectors_by_id = dict(zip(ids, data))
+
+    store = PGVector(embeddings=UnusedEmbeddings(), connection=engine,
+                     collection_name="bench_mmr", pre_delete_collection=True)
+    start = time.perf_counter()
+    for i in range(0, len(data), 2000):
+        copy_embeddings(store, [f"chunk {j}" for j in range(i, min(i + 2000, len(data)))],
+                        data[i:i + 2000].tolist(), ids=ids[i:i + 2000])
+    ensure_collection_index(store, args.dims, min_rows=1)
+    print(f"{len(data)} x {args.dims}-d vectors ({passages} passages x {args.copies + 1}) "
+          f"loaded and indexed in {time.perf_counter() - start:.1f}s")
+
+    queries = []
+    for _ in range(args.queries):
+        q = base[rng.integers(passages)] + 0.5 * rng.standard_normal(args.dims)
+        queries.append((q / np.linalg.norm(q)).astype(np.float32).tolist())
+    ef_search = max(args.fetch_k)
+
+    similarity = HybridRetriever(vectorstore=store, k=args.k, fetch_k=args.k, sparse=False,
+                                 collection_indexes=True, ef_search=ef_search)
+    runs = [("similarity", lambda q: similarity._search("", q), None)]
+    for n in args.fetch_k:
+        mmr = MMRRetriever(vectorstore=store, k=args.k, fetch_k=n, lambda_mult=args.lambda_mult,
+                           collection_indexes=True, ef_search=ef_search)
+        runs.append((f"mmr {n}", lambda q, mmr=mmr: mmr._search("", q), mmr))
+        runs.append((f"langchain {n}", lambda q, n=n: store.max_marginal_relevance_search_by_vector(
+            q, k=args.k, fetch_k=n, lambda_mult=args.lambda_mult), None))
+
+    print(f"{'retriever':<14} {'p50 ms':>8} {'p95 ms':>8} {'select ms':>10} {'max sim':>8}")
+    try:
+        for name, search, mmr in runs:
+            for q in queries[:10]:
+                search(q)  # warm up
+            latency, sims = [], []
+            for q in queries:
+                begin = time.perf_counter()
+                docs = search(q)
+                latency.append((time.perf_counter() - begin) * 1000)
+                sims.append(redundancy([d.id for d in docs], vectors_by_id))
+            select = "-"
+            if mmr is not None:
+                timings = []
+                for q in queries[:50]:
+                    _, candidates = mmr._candidates(q)
+                    begin = time.perf_counter()
+                    mmr_select(q, candidates, args.k, args.lambda_mult)
+                    timings.append((time.perf_counter() - begin) * 1000)
+                select = f"{percentile(timings, 50):.3f}"
+            print(f"{name:<14} {percentile(latency, 50):8.2f} {percentile(latency, 95):8.2f} "
+                  f"{select:>10} {sum(sims) / len(sims):8.3f}")
+    finally:
+        store.delete_collection()
+        drop_collection_indexes(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,16 @@ import sys
 import os
 # rag_shared lives one directory up from this app
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from rag_shared import get_pdf_text as _get_pdf_text_core, get_text_chunks, build_pg_connection_string
+from rag_shared import build_pg_connection_string, cached_embeddings, get_pg_engine, ingestion_jobs, track_ingestion_job, show_ingestion_jobs, start_collection_index_sync
+from rag_shared import create_speculative_history_aware_retriever, create_retriever, SemanticAnswerCache, PromptPacker, PackStats
+from rag_shared import stage_tracer, percentile
 from htmlTemplates import css
 from langchain_postgres import PGVector
 from langchain_aws import BedrockEmbeddings, ChatBedrockConverse
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_history_aware_retriever
@@ -19,7 +23,7 @@ from PIL import Image
 import time
 import logging
 import traceback
-from typing import List, Optional
+from typing import Optional
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -31,93 +35,119 @@ DEFAULT_RETRIEVAL_K = 3
 TITLE = "Generative AI Q&A powered by Amazon Bedrock"
 ICON = "🤖"
 
+# Model configurations — ChatBedrockConverse works for both Claude and Nova.
+# "model_id_env" names an env var that overrides model_id; it is read when
+# the chain is built, after load_dotenv() has run. "context_tokens" and
+# "history_tokens" are the prompt budgets PromptPacker enforces for the
+# retrieved context and the chat history.
+MODEL_CONFIG = {
+    "Claude Sonnet 5": {
+        "model_id": "global.anthropic.claude-sonnet-5",
+        "model_id_env": "BEDROCK_MODEL_ID",
+        "temperature": 0.5,
+        "max_tokens": 8192,
+        "context_tokens": 12000,
+        "history_tokens": 4000,
+    },
+    "Amazon Nova Micro": {
+        "model_id": "us.amazon.nova-micro-v1:0",
+        "temperature": 0.5,
+        "max_tokens": 1000,
+        "context_tokens": 4000,
+        "history_tokens": 1500,
+    },
+    "Amazon Nova Lite": {
+        "model_id": "us.amazon.nova-lite-v1:0",
+        "temperature": 0.5,
+        "max_tokens": 1000,
+        "context_tokens": 6000,
+        "history_tokens": 2000,
+    },
+    "Amazon Nova Pro": {
+        "model_id": "us.amazon.nova-pro-v1:0",
+        "temperature": 0.5,
+        "max_tokens": 1000,
+        "context_tokens": 6000,
+        "history_tokens": 2000,
+    },
+}
+
+
+@st.cache_resource(show_spinner=False)
+def get_embeddings():
+    """Process-wide Titan embeddings, cached on disk so repeated text skips Bedrock."""
+    return cached_embeddings(BedrockEmbeddings(
+        model_id="amazon.titan-embed-text-v2:0",
+        client=BEDROCK_CLIENT,
+        region_name=os.getenv('AWS_REGION', DEFAULT_REGION)
+    ))
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_vectorstore(connection_string: str):
+    """One PGVector per DSN, shared by every session, on the pooled engine."""
+    engine = get_pg_engine(connection_string)
+    # builds and drops per-collection indexes as collections come and go
+    start_collection_index_sync(engine)
+    return PGVector(
+        connection=engine,
+        embeddings=get_embeddings(),
+        use_jsonb=True
+    )
 
-def get_pdf_text(pdf_docs) -> Optional[str]:
-    """
-    Extract text from uploaded PDF documents.
-    Wraps rag_shared.get_pdf_text with Streamlit spinner/error handling.
-
-    Args:
-        pdf_docs: List of uploaded PDF files
 
-    Returns:
-        Extracted text or None if processing fails
-    """
-    if not pdf_docs:
-        return None
-    try:
-        with st.spinner("Extracting text from PDFs..."):
-            text = _get_pdf_text_core(pdf_docs)
-        return text if text else None
-    except Exception as e:
-        logger.error(f"Error processing PDF: {str(e)}")
-        st.error(f"Error processing PDF: {str(e)}")
-        return None
+@st.cache_resource(show_spinner=False)
+def _shared_answer_cache(connection_string: str):
+    """Process-wide semantic answer cache on the shared vector store's engine."""
+    return SemanticAnswerCache(
+        _shared_vectorstore(connection_string),
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        ttl_seconds=int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400")),
+    )
 
 
-def _get_text_chunks(text: Optional[str]) -> Optional[List[str]]:
+def get_vectorstore():
     """
-    Split text into smaller chunks for processing.
-    Wraps rag_shared.get_text_chunks with error handling.
-
-    Args:
-        text: Text to be split into chunks
+    The shared (process-wide) vector store on pgvector with Bedrock embeddings.
 
     Returns:
-        List of text chunks or None if processing fails
+        Vector store instance or None if creation fails
     """
-    if not text:
-        return None
     try:
-        chunks = get_text_chunks(text)
-        logger.info(f"Split text into {len(chunks)} chunks")
-        return chunks
+        return _shared_vectorstore(connection)
     except Exception as e:
-        logger.error(f"Error creating text chunks: {str(e)}")
-        st.error(f"Error creating text chunks: {str(e)}")
+        logger.error(f"Error creating vector store: {str(e)}")
+        st.error(f"Error creating vector store: {str(e)}")
         return None
 
-def get_vectorstore(text_chunks: Optional[List[str]]):
+
+def submit_documents(pdf_docs) -> Optional[str]:
     """
-    Create vector store using Bedrock Embeddings and pgvector.
+    Queue PDFs for background ingestion into the shared vector store.
+
+    Extraction, chunking, embedding and inserts run as an IngestionPipeline
+    job on the process-wide rag_ingest.IngestionJobs pool, so the session
+    stays responsive and other sessions keep answering questions. Clicking
+    "Process" again for the same files returns the job already running.
 
     Args:
-        text_chunks: List of text chunks to be stored in vector database
+        pdf_docs: List of uploaded PDF files
 
     Returns:
-        Vector store instance or None if creation fails
+        Job id to show with rag_shared.show_ingestion_jobs, or None if submission fails
     """
+    vectorstore = get_vectorstore()
+    if vectorstore is None:
+        return None
     try:
-        embeddings = BedrockEmbeddings(
-            model_id="amazon.titan-embed-text-v2:0",
-            client=BEDROCK_CLIENT,
-            region_name=os.getenv('AWS_REGION', DEFAULT_REGION)
-        )
-
-        if text_chunks is None:
-            return PGVector(
-                connection=connection,
-                embeddings=embeddings,
-                use_jsonb=True
-            )
-
-        chunks_with_metadata = []
-        for i, chunk in enumerate(text_chunks):
-            chunks_with_metadata.append((chunk, {"chunk_id": i}))
-
-        return PGVector.from_texts(
-            texts=[text for text, _ in chunks_with_metadata],
-            embedding=embeddings,
-            metadatas=[metadata for _, metadata in chunks_with_metadata],
-            connection=connection
-        )
+        return ingestion_jobs().submit(vectorstore, pdf_docs)
     except Exception as e:
-        logger.error(f"Error creating vector store: {str(e)}")
-        st.error(f"Error creating vector store: {str(e)}")
+        logger.error(f"Error submitting documents: {str(e)}")
+        st.error(f"Error submitting documents: {str(e)}")
         return None
 
 
-def get_conversation_chain(vectorstore, model_selection: str):
+def _build_conversation_chain(vectorstore, model_selection: str):
     """
     Build an LCEL retrieval chain using ChatBedrockConverse for all models
     (Claude and Amazon Nova share one code path; only model_id differs).
@@ -136,53 +166,34 @@ def get_conversation_chain(vectorstore, model_selection: str):
         return None
 
     try:
-        # Model configurations — ChatBedrockConverse works for both Claude and Nova
-        model_config = {
-            "Claude Sonnet 5": {
-                "model_id": os.environ.get("BEDROCK_MODEL_ID", "global.anthropic.claude-sonnet-5"),
-                "temperature": 0.5,
-                "max_tokens": 8192,
-            },
-            "Amazon Nova Micro": {
-                "model_id": "us.amazon.nova-micro-v1:0",
-                "temperature": 0.5,
-                "max_tokens": 1000,
-            },
-            "Amazon Nova Lite": {
-                "model_id": "us.amazon.nova-lite-v1:0",
-                "temperature": 0.5,
-                "max_tokens": 1000,
-            },
-            "Amazon Nova Pro": {
-                "model_id": "us.amazon.nova-pro-v1:0",
-                "temperature": 0.5,
-                "max_tokens": 1000,
-            },
-        }
-
-        if model_selection not in model_config:
+        if model_selection not in MODEL_CONFIG:
             logger.error(f"Unknown model selection: {model_selection}")
             st.error(f"Unknown model: {model_selection}")
             return None
 
-        cfg = model_config[model_selection]
+        cfg = MODEL_CONFIG[model_selection]
+        model_id = cfg["model_id"]
+        if "model_id_env" in cfg:
+            model_id = os.environ.get(cfg["model_id_env"], model_id)
 
         # Single LLM class for all Bedrock models (Claude + Nova)
         llm = ChatBedrockConverse(
-            model=cfg["model_id"],
+            model=model_id,
             client=BEDROCK_CLIENT,
             temperature=cfg["temperature"],
             max_tokens=cfg["max_tokens"],
         )
 
-        retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": DEFAULT_RETRIEVAL_K, "include_metadata": True},
-        )
+        # Full-text + vector search fused with RRF (RETRIEVAL_MODE=hybrid,
+        # the default); RETRIEVAL_MODE=similarity restores dense-only search,
+        # RETRIEVAL_MODE=mmr drops near-duplicate overlapping chunks
+        retriever = create_retriever(vectorstore, k=DEFAULT_RETRIEVAL_K)
 
         # --- history-aware retriever ---
         # Rewrites the user question given prior chat history so standalone
-        # retrieval works even in a multi-turn conversation.
+        # retrieval works even in a multi-turn conversation. In speculative
+        # mode (SPECULATIVE_RETRIEVAL, on by default) retrieval on the raw
+        # question runs while the rewrite is generated.
         condense_prompt = ChatPromptTemplate.from_messages([
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{input}"),
@@ -190,9 +201,14 @@ def get_conversation_chain(vectorstore, model_selection: str):
              "Given the conversation above, generate a standalone search query "
              "that captures the user's intent. Return only the query, no explanation."),
         ])
-        history_aware_retriever = create_history_aware_retriever(
-            llm, retriever, condense_prompt
-        )
+        if os.getenv("SPECULATIVE_RETRIEVAL", "1") != "0":
+            history_aware_retriever = create_speculative_history_aware_retriever(
+                llm, retriever, condense_prompt
+            )
+        else:
+            history_aware_retriever = create_history_aware_retriever(
+                llm, retriever, condense_prompt
+            )
 
         # --- answer chain ---
         answer_prompt = ChatPromptTemplate.from_messages([
@@ -213,22 +229,96 @@ def get_conversation_chain(vectorstore, model_selection: str):
         ])
         docs_chain = create_stuff_documents_chain(llm, answer_prompt)
 
+        # --- prompt packing ---
+        # Retrieved chunks are merged where neighbours overlap and cut to the
+        # model's context budget; chain_callable trims old turns to the
+        # history budget (PROMPT_PACKING=0 disables both). With
+        # PACK_SUMMARIZE_HISTORY=1 dropped turns are summarized by the LLM
+        # instead, at the cost of one extra call per request.
+        packer = None
+        if os.getenv("PROMPT_PACKING", "1") != "0":
+            summarizer = None
+            if os.getenv("PACK_SUMMARIZE_HISTORY", "0") == "1":
+                summary_chain = ChatPromptTemplate.from_messages([
+                    MessagesPlaceholder(variable_name="chat_history"),
+                    ("human", "Summarize the conversation above in at most five sentences, "
+                              "keeping names, numbers and open questions."),
+                ]) | llm | StrOutputParser()
+                summarizer = lambda messages: summary_chain.invoke({"chat_history": messages})
+            packer = PromptPacker(
+                context_tokens=cfg.get("context_tokens", 6000),
+                history_tokens=cfg.get("history_tokens", 2000),
+                summarizer=summarizer,
+            )
+
+            def pack_context(documents, config):
+                stats = config.get("configurable", {}).get("pack_stats")
+                return packer.pack_documents(documents, stats)
+
+            history_aware_retriever = history_aware_retriever | RunnableLambda(pack_context)
+
         # Full retrieval chain
         rag_chain = create_retrieval_chain(history_aware_retriever, docs_chain)
 
+        # Standalone questions are answered from the semantic answer cache
+        # in Aurora when a near-identical one was answered before
+        answer_cache = None
+        if os.getenv("ANSWER_CACHE", "1") != "0":
+            answer_cache = _shared_answer_cache(connection)
+
         # Wrap into the dict shape the rest of the app expects:
-        # input:  {"question": str}   (chat_history injected from session_state)
+        # input:  {"question": str}   (chat_history injected from session_state;
+        #         optional "tracer", a StageTracer that records per-stage spans)
         # output: {"answer": str, "source_documents": list, "chat_history": list}
         def chain_callable(query_dict: dict) -> dict:
             question = query_dict["question"]
             chat_history: list = query_dict.get("chat_history", [])
+            tracer = query_dict.get("tracer")
+            use_cache = answer_cache is not None and not chat_history
+            question_embedding = cache_version = None
             try:
-                result = rag_chain.invoke({
-                    "input": question,
-                    "chat_history": chat_history,
-                })
-                answer = result.get("answer", "")
-                source_docs = result.get("context", [])
+                hit = None
+                if use_cache:
+                    lookup_start = time.time_ns()
+                    try:
+                        hit, question_embedding, cache_version = answer_cache.lookup(
+                            question, model_id)
+                    except Exception as exc:
+                        logger.warning(f"Answer cache lookup failed: {exc}")
+                    if tracer is not None:
+                        tracer.record("answer_cache", lookup_start, time.time_ns(),
+                                      {"rag.cache_hit": bool(hit)})
+                if hit:
+                    answer, source_docs, similarity = hit
+                    logger.info(f"Answer cache hit (similarity {similarity:.3f})")
+                else:
+                    pack_stats = PackStats()
+                    prompt_history = chat_history
+                    if packer is not None:
+                        pack_start = time.time_ns()
+                        prompt_history = packer.pack_history(chat_history, pack_stats)
+                        # the summary LLM call runs here, outside rag_chain
+                        if tracer is not None and packer.summarizer is not None:
+                            tracer.record("summarize", pack_start, time.time_ns(),
+                                          {"rag.history_messages": len(chat_history)})
+                    result = rag_chain.invoke({
+                        "input": question,
+                        "chat_history": prompt_history,
+                    }, config={
+                        "configurable": {"pack_stats": pack_stats},
+                        "callbacks": [tracer] if tracer is not None else [],
+                    })
+                    answer = result.get("answer", "")
+                    source_docs = result.get("context", [])
+                    if packer is not None:
+                        logger.info(f"Prompt packing: {pack_stats.summary()}")
+                    # only when the lookup ran: its version predates retrieval
+                    if use_cache and cache_version is not None:
+                        try:
+                            answer_cache.store(question, model_id, answer, source_docs,
+                                               cache_version, question_embedding)
+                        except Exception as exc:
+                            logger.warning(f"Answer cache store failed: {exc}")
                 new_history = list(chat_history) + [
                     HumanMessage(content=question),
                     AIMessage(content=answer),
@@ -238,6 +328,8 @@ def get_conversation_chain(vectorstore, model_selection: str):
                     "answer": answer,
                     "source_documents": source_docs,
                     "chat_history": new_history,
+                    "cached": bool(hit),
+                    "tokens_saved": 0 if hit else pack_stats.saved,
                 }
             except Exception as exc:
                 logger.error(f"Error in chain_callable: {exc}")
@@ -260,6 +352,39 @@ def get_conversation_chain(vectorstore, model_selection: str):
         st.error(f"Error creating conversation chain: {str(e)}")
         return None
 
+
+@st.cache_resource(show_spinner=False)
+def _cached_conversation_chain(model_selection: str, collection_name: str, _vectorstore):
+    chain = _build_conversation_chain(_vectorstore, model_selection)
+    if chain is None:
+        # st.cache_resource does not cache exceptions, so a failed build is retried
+        raise RuntimeError(f"Could not build conversation chain for {model_selection}")
+    return chain
+
+
+def get_conversation_chain(vectorstore, model_selection: str):
+    """
+    Return the conversation chain for *model_selection*.
+
+    Chains are stateless (chat history is passed in per call), so one chain
+    per model and collection is built on first use and shared by every
+    Streamlit session in the process.
+
+    Args:
+        vectorstore: Vector store for document retrieval
+        model_selection: Selected model name
+
+    Returns:
+        Callable described in _build_conversation_chain, or None if creation fails.
+    """
+    if not vectorstore:
+        logger.error("Cannot create conversation chain: Vector store is None")
+        return None
+    try:
+        return _cached_conversation_chain(model_selection, vectorstore.collection_name, vectorstore)
+    except RuntimeError:
+        return None
+
 def handle_userinput(user_question: str):
     """
     Process user input and generate response.
@@ -276,19 +401,31 @@ def handle_userinput(user_question: str):
 
     try:
         with st.spinner("Thinking..."):
-            # Track processing time for metrics
+            # Track processing time for metrics; the tracer records a span
+            # per stage (condense, embedding, pgvector query, generation)
             start_time = time.time()
+            start_ns = time.time_ns()
+            tracer = stage_tracer()
 
             # Get conversation response — pass current chat history so the
             # history-aware retriever can condense the question if needed.
-            response = st.session_state.conversation({
+            conversation = get_conversation_chain(
+                get_vectorstore(),
+                st.session_state.model_selection
+            )
+            if conversation is None:
+                return
+            response = conversation({
                 "question": user_question,
                 "chat_history": st.session_state.chat_history,
+                "tracer": tracer,
             })
 
             # Calculate processing time
             processing_time = time.time() - start_time
             logger.info(f"Processing time: {processing_time:.2f} seconds")
+            tracer.record("total", start_ns, time.time_ns())
+            record_stage_timings(tracer)
 
             # Update chat history from response
             st.session_state.chat_history = response.get("chat_history", [])
@@ -311,7 +448,10 @@ def handle_userinput(user_question: str):
                                         st.markdown(f"```\n{doc.page_content[:300]}...\n```")
 
             # Show processing time as a small note
-            st.caption(f"Response generated in {processing_time:.2f} seconds")
+            cache_note = " (from answer cache)" if response.get("cached") else ""
+            if response.get("tokens_saved"):
+                cache_note += f" · {response['tokens_saved']} prompt tokens saved by packing"
+            st.caption(f"Response generated in {processing_time:.2f} seconds{cache_note}")
 
     except Exception as e:
         logger.error(f"Error in handle_userinput: {str(e)}")
@@ -323,36 +463,58 @@ def reset_chat():
     if "chat_history" in st.session_state:
         st.session_state.chat_history = []
 
-    # Re-initialize conversation with existing vectorstore
-    if "vectorstore" in st.session_state and st.session_state.vectorstore:
-        st.session_state.conversation = get_conversation_chain(
-            st.session_state.vectorstore,
-            st.session_state.model_selection
-        )
-
     # This triggers a rerun to refresh the page and clear displayed messages
     st.rerun()
 
+def record_stage_timings(tracer):
+    """Add a request's stage durations to the session and export its trace."""
+    timings = st.session_state.setdefault("stage_timings", {})
+    for stage, durations in tracer.stage_durations().items():
+        timings.setdefault(stage, []).extend(durations)
+    try:
+        tracer.export()
+    except OSError as e:
+        logger.warning(f"Could not export trace: {e}")
+
+
+def show_stage_latency(container):
+    """Render p50/p95 per stage over this session's requests into *container*."""
+    timings = st.session_state.get("stage_timings", {})
+    with container.container():
+        st.subheader("⏱️ Latency by Stage")
+        if not timings:
+            st.caption("Ask a question to collect timings.")
+            return
+        order = ["answer_cache", "summarize", "condense", "embedding", "pgvector_query",
+                 "retrieval", "rerank", "generation", "total"]
+        stages = sorted(timings, key=lambda s: order.index(s) if s in order else len(order))
+        st.table([{
+            "stage": stage,
+            "n": len(timings[stage]),
+            "p50 ms": round(percentile(timings[stage], 50)),
+            "p95 ms": round(percentile(timings[stage], 95)),
+        } for stage in stages])
+
 def init_session_state():
-    """Initialize session state variables"""
-    # Check and initialize session state variables
+    """
+    Initialize session state variables.
+
+    Only the model choice and chat history are per session; the vector
+    store and conversation chains are process-wide resources.
+    """
     if "model_selection" not in st.session_state:
         st.session_state.model_selection = "Claude Sonnet 5"
 
-    if "vectorstore" not in st.session_state:
-        st.session_state.vectorstore = get_vectorstore(None)
-
-    if "conversation" not in st.session_state:
-        st.session_state.conversation = get_conversation_chain(
-            st.session_state.vectorstore,
-            st.session_state.model_selection
-        )
-
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
 
 def display_sidebar():
-    """Display and handle sidebar elements"""
+    """
+    Display and handle sidebar elements.
+
+    Returns the slot for the stage latency table, which main() fills after
+    the current question has been answered.
+    """
     with st.sidebar:
         # Logo and title
         logo_url = "static/Powered-By_logo-stack_RGB_REV.png"
@@ -368,12 +530,7 @@ def display_sidebar():
 
         # Model selection dropdown
         st.subheader("🤖 Model Selection")
-        model_options = [
-            "Claude Sonnet 5",
-            "Amazon Nova Micro",
-            "Amazon Nova Lite",
-            "Amazon Nova Pro",
-        ]
+        model_options = list(MODEL_CONFIG)
 
         selected_model = st.selectbox(
             "Choose a model:",
@@ -386,12 +543,8 @@ def display_sidebar():
         if selected_model != st.session_state.model_selection:
             with st.spinner(f"Switching to {selected_model}..."):
                 st.session_state.model_selection = selected_model
-                # Reinitialize the conversation with the new model
-                if "vectorstore" in st.session_state and st.session_state.vectorstore:
-                    st.session_state.conversation = get_conversation_chain(
-                        st.session_state.vectorstore,
-                        st.session_state.model_selection
-                    )
+                # Builds the shared chain for this model if no session has yet
+                if get_conversation_chain(get_vectorstore(), selected_model):
                     st.success(f"Switched to {selected_model}!", icon="✅")
 
         # Document upload section
@@ -424,45 +577,21 @@ def display_sidebar():
             if reset_button:
                 reset_chat()
 
-        # Process documents when button is clicked
+        # Process documents when button is clicked: the upload is queued as
+        # a background job and its progress is polled below
         if process_button and pdf_docs:
-            with st.spinner("Processing documents..."):
-                # Show a progress bar
-                progress_bar = st.progress(0)
-
-                # Processing steps
-                progress_bar.progress(10, text="Reading PDF text...")
-                raw_text = get_pdf_text(pdf_docs)
-
-                if raw_text:
-                    progress_bar.progress(40, text="Creating text chunks...")
-                    text_chunks = _get_text_chunks(raw_text)
-
-                    if text_chunks:
-                        progress_bar.progress(70, text="Building vector database...")
-                        vectorstore = get_vectorstore(text_chunks)
-
-                        if vectorstore:
-                            progress_bar.progress(90, text="Initializing conversation chain...")
-                            st.session_state.vectorstore = vectorstore
-                            st.session_state.conversation = get_conversation_chain(
-                                vectorstore,
-                                st.session_state.model_selection
-                            )
-
-                            progress_bar.progress(100, text="Done!")
-                            st.success('Documents processed successfully!', icon="✅")
-                        else:
-                            st.error("Error creating vector store")
-                    else:
-                        st.error("Error creating text chunks")
-                else:
-                    st.error("Error processing PDFs")
+            job_id = submit_documents(pdf_docs)
+            if job_id:
+                track_ingestion_job(job_id)
 
         # Show an error if process is clicked without documents
         elif process_button and not pdf_docs:
             st.error("Please upload at least one PDF document")
 
+        show_ingestion_jobs(get_pg_engine(connection))
+
+        st.divider()
+        latency_slot = st.empty()
         st.divider()
 
         # Sample questions
@@ -487,6 +616,8 @@ def display_sidebar():
             Source: [GitHub Repository](https://github.com/aws-samples/aurora-postgresql-pgvector)
             """)
 
+    return latency_slot
+
 def main():
     """Main application function"""
     # Page configuration
@@ -504,7 +635,7 @@ def main():
     init_session_state()
 
     # Display sidebar
-    display_sidebar()
+    latency_slot = display_sidebar()
 
     # Main content
     st.header(f"{ICON} {TITLE}")
@@ -553,6 +684,8 @@ def main():
         st.session_state["_clicked_search_last_time"] = user_question
         handle_userinput(user_question)
 
+    show_stage_latency(latency_slot)
+
 if __name__ == '__main__':
     try:
         # Load environment variables
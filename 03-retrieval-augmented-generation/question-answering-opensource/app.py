@@ -2,13 +2,14 @@ import sys
 import os
 # rag_shared lives one directory up from this app
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from rag_shared import get_pdf_text, get_text_chunks
+from rag_shared import LocalEmbeddings, PromptPacker, cached_embeddings, create_reranking_retriever, create_speculative_history_aware_retriever, get_pg_engine, ingestion_jobs, show_ingestion_jobs, start_collection_index_sync, track_ingestion_job
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_huggingface import HuggingFaceEmbeddings, HuggingFaceEndpoint
+from langchain_huggingface import HuggingFaceEndpoint
 from langchain_postgres.vectorstores import PGVector
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.runnables import RunnableLambda
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_history_aware_retriever
@@ -17,25 +18,31 @@ from htmlTemplates import css, bot_template, user_template
 # NOTE: A HUGGINGFACEHUB_API_TOKEN environment variable is required to use
 # the HuggingFace Inference API.  Add it to your .env file before running.
 
-
-def get_vectorstore(text_chunks):
-    # HuggingFaceEmbeddings from langchain-huggingface replaces the sunset
-    # langchain_community.embeddings.HuggingFaceInstructEmbeddings.
-    # all-mpnet-base-v2 produces 768-dim vectors — no schema change required.
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-mpnet-base-v2",
-        model_kwargs={"device": "cpu"},
-        encode_kwargs={"normalize_embeddings": True},
-    )
-    if text_chunks is None:
-        return PGVector(
-            connection=CONNECTION_STRING,
-            embeddings=embeddings,
-        )
-    return PGVector.from_texts(
-        texts=text_chunks,
-        embedding=embeddings,
-        connection=CONNECTION_STRING,
+# zephyr-7b-beta has a 4k-token window: keep retrieved context and chat
+# history within these budgets so 512 new tokens always fit.
+PACKER = PromptPacker(context_tokens=2000, history_tokens=1000)
+
+
+@st.cache_resource(show_spinner=False)
+def get_embeddings():
+    # all-mpnet-base-v2 produces 768-dim normalized vectors — no schema change
+    # required. LocalEmbeddings shares one model per process (int8 ONNX
+    # Runtime by default, see EMBEDDING_BACKEND) and batches concurrent
+    # requests. Built once per process, so every session shares one
+    # embedding cache connection and its hit-rate counters.
+    return cached_embeddings(LocalEmbeddings("sentence-transformers/all-mpnet-base-v2"))
+
+
+@st.cache_resource(show_spinner=False)
+def get_vectorstore():
+    embeddings = get_embeddings()
+    # the process-wide engine, shared with the background ingestion jobs
+    engine = get_pg_engine(CONNECTION_STRING)
+    # builds and drops per-collection indexes as collections come and go
+    start_collection_index_sync(engine)
+    return PGVector(
+        connection=engine,
+        embeddings=embeddings,
     )
 
 
@@ -50,10 +57,16 @@ def get_conversation_chain(vectorstore):
         max_new_tokens=512,
     )
 
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 1})
+    # Over-fetch 30 candidates and keep the 3 a local CPU cross-encoder
+    # ranks highest; the model is loaded once per process and scoring stops
+    # at RERANK_BUDGET_MS. RERANK=0 falls back to plain retrieval.
+    retriever = create_reranking_retriever(vectorstore)
 
     # History-aware retriever: rewrites the question as a standalone query when
     # there is prior chat history, so retrieval works across conversation turns.
+    # The speculative variant (SPECULATIVE_RETRIEVAL=1, the default) retrieves on
+    # the raw question while zephyr rewrites it, and only retrieves again if the
+    # rewrite means something different.
     condense_prompt = ChatPromptTemplate.from_messages([
         MessagesPlaceholder(variable_name="chat_history"),
         ("human", "{input}"),
@@ -61,9 +74,17 @@ def get_conversation_chain(vectorstore):
          "Given the conversation above, generate a standalone search query "
          "that captures the user's intent. Return only the query, no explanation."),
     ])
-    history_aware_retriever = create_history_aware_retriever(
-        llm, retriever, condense_prompt
-    )
+    if os.getenv("SPECULATIVE_RETRIEVAL", "1") != "0":
+        history_aware_retriever = create_speculative_history_aware_retriever(
+            llm, retriever, condense_prompt
+        )
+    else:
+        history_aware_retriever = create_history_aware_retriever(
+            llm, retriever, condense_prompt
+        )
+
+    # Merge overlapping neighbour chunks and cut the context to budget
+    history_aware_retriever = history_aware_retriever | RunnableLambda(PACKER.pack_documents)
 
     # Answer chain
     answer_prompt = ChatPromptTemplate.from_messages([
@@ -85,7 +106,7 @@ def handle_userinput(user_question):
     try:
         result = st.session_state.conversation.invoke({
             "input": user_question,
-            "chat_history": st.session_state.chat_history,
+            "chat_history": PACKER.pack_history(st.session_state.chat_history),
         })
     except ValueError:
         st.write("Sorry, please ask again in a different way.")
@@ -123,7 +144,7 @@ def main():
     )
 
     if "conversation" not in st.session_state:
-        st.session_state.conversation = get_conversation_chain(get_vectorstore(None))
+        st.session_state.conversation = get_conversation_chain(get_vectorstore())
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
 
@@ -140,22 +161,16 @@ def main():
             if not pdf_docs:
                 st.error("Please upload at least one PDF document before processing.")
             else:
-                with st.spinner("Processing"):
-                    # get pdf text
-                    raw_text = get_pdf_text(pdf_docs)
-
-                    # get the text chunks
-                    text_chunks = get_text_chunks(raw_text)
-
-                    # create vector store
-                    vectorstore = get_vectorstore(text_chunks)
-
-                    # create conversation chain
-                    st.session_state.conversation = get_conversation_chain(vectorstore)
-                    # reset history on new document upload
-                    st.session_state.chat_history = []
-
-                    st.success('PDF uploaded successfully!', icon="✅")
+                # extract, chunk, embed and store as a background job on the
+                # process-wide pool; the local CPU embedding model gains
+                # nothing from more than one embedding thread
+                job_id = ingestion_jobs().submit(get_vectorstore(), pdf_docs, embed_workers=1)
+                track_ingestion_job(job_id)
+                # reset history on new document upload
+                st.session_state.chat_history = []
+
+        # progress of this session's uploads, polled while any is running
+        show_ingestion_jobs(get_pg_engine(CONNECTION_STRING))
 
 
 if __name__ == '__main__':
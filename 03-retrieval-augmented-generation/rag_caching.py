@@ -0,0 +1,286 @@
+"""Persistent embedding cache (SQLite) and semantic answer cache (Aurora)."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import text
+
+from rag_db import vector_literal
+
+
+# ---------------------------------------------------------------------------
+# Persistent embedding cache
+# ---------------------------------------------------------------------------
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(".cache", "embeddings.sqlite3")
+
+
+def _embedding_identity(embeddings):
+    """Best-effort (model id, dimensions, normalize) of a LangChain embeddings object."""
+    model_kwargs = getattr(embeddings, "model_kwargs", None) or {}
+    encode_kwargs = getattr(embeddings, "encode_kwargs", None) or {}
+    model_id = (getattr(embeddings, "model_id", None)
+                or getattr(embeddings, "model_name", None)
+                or type(embeddings).__name__)
+    dimensions = model_kwargs.get("dimensions")
+    normalize = getattr(embeddings, "normalize", None)
+    if normalize is None:
+        normalize = encode_kwargs.get("normalize_embeddings", model_kwargs.get("normalize"))
+    return model_id, dimensions, normalize
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that memoises vectors in a local SQLite file."""
+
+    def __init__(self, embeddings, path=DEFAULT_EMBEDDING_CACHE_PATH,
+                 max_entries=200_000, model_id=None, dimensions=None, normalize=None):
+        self.embeddings = embeddings
+        self.path = path
+        self.max_entries = max_entries
+        detected = _embedding_identity(embeddings)
+        self.model_id = model_id or detected[0]
+        self.dimensions = dimensions if dimensions is not None else detected[1]
+        self.normalize = normalize if normalize is not None else detected[2]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_cache_last_used ON embedding_cache (last_used)"
+        )
+        self._entries = self._db.execute("SELECT count(*) FROM embedding_cache").fetchone()[0]
+
+    def _key(self, kind, text):
+        prefix = f"{self.model_id}|{self.dimensions}|{self.normalize}|{kind}|"
+        return hashlib.sha256((prefix + text).encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                marks = ",".join("?" * len(part))
+                for key, blob in self._db.execute(
+                        f"SELECT key, vector FROM embedding_cache WHERE key IN ({marks})", part):
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        return found
+
+    def _store(self, items):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+            self._entries += self._db.total_changes - before
+            if self._entries > self.max_entries:
+                evict = self._entries - int(self.max_entries * 0.9)
+                self._db.execute(
+                    "DELETE FROM embedding_cache WHERE key IN ("
+                    " SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?)",
+                    (evict,),
+                )
+                self._entries = self._db.execute("SELECT count(*) FROM embedding_cache").fetchone()[0]
+            self._db.execute("COMMIT")
+
+    def _embed(self, kind, texts, compute):
+        keys = [self._key(kind, t) for t in texts]
+        found = self._lookup(keys)
+        missing = {}
+        for key, t in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, t)
+        if missing:
+            vectors = compute(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self._store(computed.items())
+            found.update(computed)
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed("document", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed("query", [text], lambda t: [self.embeddings.embed_query(t[0])])[0]
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current cache size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._entries,
+            }
+
+
+_CACHED_EMBEDDINGS = {}
+_CACHED_EMBEDDINGS_LOCK = threading.Lock()
+
+
+def cached_embeddings(embeddings):
+    """Process-wide CachedEmbeddings for *embeddings* at EMBEDDING_CACHE_PATH."""
+    path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_EMBEDDING_CACHE_PATH)
+    if not path:
+        return embeddings
+    key = (os.path.abspath(path),) + _embedding_identity(embeddings)
+    with _CACHED_EMBEDDINGS_LOCK:
+        wrapper = _CACHED_EMBEDDINGS.get(key)
+        if wrapper is None:
+            max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+            wrapper = CachedEmbeddings(embeddings, path=path, max_entries=max_entries)
+            _CACHED_EMBEDDINGS[key] = wrapper
+        return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Semantic answer cache
+# ---------------------------------------------------------------------------
+
+def _ensure_collection_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS rag_collection_version ("
+        " collection text PRIMARY KEY,"
+        " version bigint NOT NULL DEFAULT 0,"
+        " updated_at timestamptz NOT NULL DEFAULT now())"
+    ))
+
+
+def bump_collection_version(vectorstore):
+    """Record that *vectorstore*'s collection changed, invalidating its cached answers."""
+    with vectorstore._engine.begin() as conn:
+        _ensure_collection_version_table(conn)
+        conn.execute(text(
+            "INSERT INTO rag_collection_version (collection, version) VALUES (:c, 1) "
+            "ON CONFLICT (collection) DO UPDATE "
+            "SET version = rag_collection_version.version + 1, updated_at = now()"
+        ), {"c": vectorstore.collection_name})
+        exists = conn.execute(text("SELECT to_regclass('rag_answer_cache') IS NOT NULL")).scalar()
+        if exists:
+            conn.execute(text("DELETE FROM rag_answer_cache WHERE collection = :c"),
+                         {"c": vectorstore.collection_name})
+
+
+class SemanticAnswerCache:
+    """Answer cache in Aurora keyed by question embedding, model and collection version."""
+
+    def __init__(self, vectorstore, threshold=0.95, ttl_seconds=86400):
+        self.vectorstore = vectorstore
+        self.engine = vectorstore._engine
+        self.embeddings = vectorstore.embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_tables(self, dimensions):
+        with self._lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                _ensure_collection_version_table(conn)
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS rag_answer_cache ("
+                    " id bigserial PRIMARY KEY,"
+                    " collection text NOT NULL,"
+                    " collection_version bigint NOT NULL,"
+                    " model text NOT NULL,"
+                    " question text NOT NULL,"
+                    f" embedding vector({int(dimensions)}) NOT NULL,"
+                    " answer text NOT NULL,"
+                    " sources jsonb NOT NULL DEFAULT '[]',"
+                    " hits integer NOT NULL DEFAULT 0,"
+                    " created_at timestamptz NOT NULL DEFAULT now())"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS rag_answer_cache_embedding_idx "
+                    "ON rag_answer_cache USING hnsw (embedding vector_cosine_ops)"
+                ))
+            self._ready = True
+
+    def lookup(self, question, model):
+        """Return (hit, embedding, version); on a miss pass the last two to store()."""
+        embedding = self.embeddings.embed_query(question)
+        self._ensure_tables(len(embedding))
+        params = {
+            "e": vector_literal(embedding),
+            "c": self.vectorstore.collection_name,
+            "m": model,
+            "ttl": self.ttl_seconds,
+        }
+        with self.engine.begin() as conn:
+            row = conn.execute(text(
+                "WITH v AS (SELECT COALESCE("
+                "    (SELECT version FROM rag_collection_version WHERE collection = :c), 0)"
+                "    AS version) "
+                "SELECT v.version, a.id, a.answer, a.sources, a.similarity FROM v "
+                "LEFT JOIN LATERAL ("
+                "  SELECT id, answer, sources,"
+                "         1 - (embedding <=> CAST(:e AS vector)) AS similarity "
+                "  FROM rag_answer_cache "
+                "  WHERE collection = :c AND model = :m AND collection_version = v.version "
+                "    AND created_at > now() - make_interval(secs => :ttl) "
+                "  ORDER BY embedding <=> CAST(:e AS vector) LIMIT 1"
+                ") a ON TRUE"
+            ), params).first()
+            if row.id is None or row.similarity < self.threshold:
+                return None, embedding, row.version
+            conn.execute(text("UPDATE rag_answer_cache SET hits = hits + 1 WHERE id = :id"),
+                         {"id": row.id})
+        sources = [Document(page_content=d["page_content"], metadata=d["metadata"])
+                   for d in row.sources]
+        return (row.answer, sources, row.similarity), embedding, row.version
+
+    def store(self, question, model, answer, source_documents, version, embedding=None):
+        """Cache *answer* for *question* under the *version* returned by lookup()."""
+        if embedding is None:
+            embedding = self.embeddings.embed_query(question)
+        self._ensure_tables(len(embedding))
+        sources = [{"page_content": d.page_content, "metadata": d.metadata}
+                   for d in source_documents]
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "DELETE FROM rag_answer_cache "
+                "WHERE created_at <= now() - make_interval(secs => :ttl)"
+            ), {"ttl": self.ttl_seconds})
+            conn.execute(text(
+                "INSERT INTO rag_answer_cache "
+                " (collection, collection_version, model, question, embedding, answer, sources) "
+                "VALUES (:c, :v, :m, :q, CAST(:e AS vector), :a, CAST(:s AS jsonb))"
+            ), {
+                "c": self.vectorstore.collection_name,
+                "v": version,
+                "m": model,
+                "q": question,
+                "e": vector_literal(embedding),
+                "a": answer,
+                "s": json.dumps(sources),
+            })
@@ -0,0 +1,45 @@
+"""Database connection helpers shared by the 03 apps."""
+import os
+import threading
+
+from sqlalchemy import create_engine
+
+
+def build_pg_connection_string():
+    """
+    Build a psycopg3 (asyncpg-compatible) connection URL from env vars.
+
+    Reads standard libpq names (PGUSER, PGPASSWORD, PGHOST, PGPORT,
+    PGDATABASE) with PGVECTOR_* as fallbacks for older workshop copies.
+    """
+    db_user = os.getenv("PGUSER") or os.getenv("PGVECTOR_USER")
+    db_password = os.getenv("PGPASSWORD") or os.getenv("PGVECTOR_PASSWORD")
+    db_host = os.getenv("PGHOST") or os.getenv("PGVECTOR_HOST")
+    db_port = os.getenv("PGPORT") or os.getenv("PGVECTOR_PORT") or "5432"
+    db_name = os.getenv("PGDATABASE") or os.getenv("PGVECTOR_DATABASE")
+    return f"postgresql+psycopg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_pg_engine(connection_string=None):
+    """Process-wide pooled SQLAlchemy engine for *connection_string*."""
+    connection_string = connection_string or build_pg_connection_string()
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(connection_string)
+        if engine is None:
+            engine = create_engine(
+                connection_string,
+                pool_size=int(os.getenv("PG_POOL_SIZE", "5")),
+                max_overflow=int(os.getenv("PG_POOL_MAX_OVERFLOW", "10")),
+                pool_pre_ping=True,
+            )
+            _ENGINES[connection_string] = engine
+        return engine
+
+
+def vector_literal(vector):
+    """pgvector text form, bound as a string and CAST to vector in SQL."""
+    return "[" + ",".join(repr(float(x)) for x in vector) + "]"
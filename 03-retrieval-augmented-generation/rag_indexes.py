@@ -0,0 +1,323 @@
+"""HNSW and full-text indexes on langchain_pg_embedding: global, per-collection, halfvec."""
+import logging
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Table-wide full-text and HNSW indexes
+# ---------------------------------------------------------------------------
+
+_HYBRID_INDEXES = set()
+_HYBRID_INDEX_LOCK = threading.Lock()
+
+
+# HNSW index element types: storage -> (pgvector type, operator class, name tag)
+VECTOR_STORAGE_TYPES = {
+    "float32": ("vector", "vector_cosine_ops", ""),
+    "halfvec": ("halfvec", "halfvec_cosine_ops", "h"),
+}
+
+
+def vector_storage(storage=None):
+    """Element type of the HNSW indexes: *storage*, else VECTOR_STORAGE, else float32."""
+    storage = storage or os.getenv("VECTOR_STORAGE", "float32") or "float32"
+    if storage not in VECTOR_STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage {storage!r}; "
+                         f"expected one of {sorted(VECTOR_STORAGE_TYPES)}")
+    return storage
+
+
+def vector_cast(dimensions, storage):
+    """SQL type the embedding and query vector are cast to, e.g. halfvec(1024)."""
+    return f"{VECTOR_STORAGE_TYPES[storage][0]}({int(dimensions)})"
+
+
+def _hnsw_index_sql(name, dimensions, storage, where, concurrently=False):
+    pgtype, opclass, _ = VECTOR_STORAGE_TYPES[storage]
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+        f"ON langchain_pg_embedding "
+        f"USING hnsw ((embedding::{vector_cast(dimensions, storage)}) {opclass}) "
+        f"WHERE {where}vector_dims(embedding) = {int(dimensions)}"
+    )
+
+
+def _require_storage_support(conn, storage):
+    if storage != "halfvec":
+        return
+    version = conn.execute(
+        text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    if version is None or tuple(int(p) for p in version.split(".")[:2]) < (0, 7):
+        raise RuntimeError(f"VECTOR_STORAGE=halfvec needs pgvector >= 0.7.0 (installed: {version})")
+
+
+def global_index_name(dimensions, storage="float32"):
+    """Name of the table-wide HNSW index, e.g. ix_langchain_pg_embedding_hnsw_h1024."""
+    return f"ix_langchain_pg_embedding_hnsw_{VECTOR_STORAGE_TYPES[storage][2]}{int(dimensions)}"
+
+
+def ensure_hybrid_indexes(vectorstore, dimensions, text_search_config="english",
+                          global_hnsw=True, storage=None):
+    """Create the full-text and global HNSW indexes HybridRetriever relies on, if missing."""
+    dimensions = int(dimensions)
+    storage = vector_storage(storage)
+    key = (id(vectorstore._engine), dimensions, text_search_config, global_hnsw, storage)
+    with _HYBRID_INDEX_LOCK:
+        if key in _HYBRID_INDEXES:
+            return
+        with vectorstore._engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_langchain_pg_embedding_fts_{text_search_config} "
+                f"ON langchain_pg_embedding "
+                f"USING gin (to_tsvector('{text_search_config}'::regconfig, document))"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_langchain_pg_embedding_collection_id "
+                "ON langchain_pg_embedding (collection_id)"
+            ))
+            if global_hnsw:
+                _require_storage_support(conn, storage)
+                conn.execute(text(_hnsw_index_sql(
+                    global_index_name(dimensions, storage), dimensions, storage, where="")))
+        _HYBRID_INDEXES.add(key)
+
+
+# ---------------------------------------------------------------------------
+# Per-collection HNSW indexes
+# ---------------------------------------------------------------------------
+
+COLLECTION_INDEX_PREFIX = "ix_lpe_hnsw_"
+COLLECTION_ROUTE_TTL_SECONDS = 60
+
+_COLLECTION_ROUTES = {}
+_COLLECTION_ROUTE_LOCK = threading.Lock()
+_INDEX_SYNC_THREADS = {}
+_INDEX_SYNC_THREADS_LOCK = threading.Lock()
+# pg_try_advisory_lock key held while sync_collection_indexes runs
+_INDEX_SYNC_LOCK_KEY = 7_301_801
+
+
+def collection_indexes_enabled():
+    """COLLECTION_INDEXES: route the vector leg to per-collection indexes (default on)."""
+    return os.getenv("COLLECTION_INDEXES", "1") != "0"
+
+
+def _collection_index_min_rows(min_rows=None):
+    if min_rows is None:
+        min_rows = int(os.getenv("COLLECTION_INDEX_MIN_ROWS", "2000"))
+    return max(int(min_rows), 1)
+
+
+def collection_index_name(collection_uuid, dimensions, storage="float32"):
+    """Name of the partial HNSW index for one collection, e.g. ix_lpe_hnsw_1024_<hex>."""
+    tag = VECTOR_STORAGE_TYPES[storage][2]
+    return f"{COLLECTION_INDEX_PREFIX}{tag}{int(dimensions)}_{uuid.UUID(str(collection_uuid)).hex}"
+
+
+def _autocommit(engine):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _index_valid(conn, name):
+    """True/False for a valid/invalid index, None if there is none."""
+    return conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(:n)"
+    ), {"n": name}).scalar()
+
+
+def _build_index_concurrently(engine, name, dimensions, storage, where=""):
+    start = time.perf_counter()
+    with _autocommit(engine) as conn:
+        _require_storage_support(conn, storage)
+        valid = _index_valid(conn, name)
+        if valid:
+            return name
+        if valid is False:
+            # left behind by an interrupted CONCURRENTLY build
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(_hnsw_index_sql(name, dimensions, storage, where, concurrently=True)))
+        # fresh statistics, or the planner may still estimate the collection
+        # as empty and prefer the collection_id b-tree
+        conn.execute(text("ANALYZE langchain_pg_embedding"))
+    logger.info(f"Built {name} in {time.perf_counter() - start:.1f}s")
+    return name
+
+
+def _build_collection_index(engine, collection_uuid, dimensions, storage):
+    return _build_index_concurrently(
+        engine, collection_index_name(collection_uuid, dimensions, storage), dimensions,
+        storage, where=f"collection_id = '{uuid.UUID(str(collection_uuid))}'::uuid AND ")
+
+
+def ensure_collection_index(vectorstore, dimensions, min_rows=None, storage=None):
+    """Build the collection's own HNSW index once it has *min_rows* rows; return its name."""
+    dimensions = int(dimensions)
+    storage = vector_storage(storage)
+    min_rows = _collection_index_min_rows(min_rows)
+    with vectorstore._engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT c.uuid, (SELECT count(*) FROM langchain_pg_embedding e"
+            "                WHERE e.collection_id = c.uuid"
+            "                  AND vector_dims(e.embedding) = :d) AS n "
+            "FROM langchain_pg_collection c WHERE c.name = :c"
+        ), {"c": vectorstore.collection_name, "d": dimensions}).first()
+    if row is None or row.n < min_rows:
+        return None
+    name = _build_collection_index(vectorstore._engine, row.uuid, dimensions, storage)
+    _forget_collection_routes()
+    return name
+
+
+def _list_indexes(conn, pattern):
+    return conn.execute(text(
+        "SELECT indexname FROM pg_indexes "
+        "WHERE tablename = 'langchain_pg_embedding' AND indexname LIKE :p"
+    ), {"p": pattern}).scalars().all()
+
+
+def _drop_indexes(engine, names):
+    with _autocommit(engine) as conn:
+        for name in names:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def drop_collection_indexes(engine, collection_uuids=None):
+    """Drop the per-collection indexes of deleted collections; return their names."""
+    with engine.connect() as conn:
+        names = _list_indexes(conn, COLLECTION_INDEX_PREFIX + "%")
+        live = {u.hex for u in conn.execute(
+            text("SELECT uuid FROM langchain_pg_collection")).scalars()}
+    if collection_uuids is not None:
+        wanted = {uuid.UUID(str(u)).hex for u in collection_uuids}
+        names = [n for n in names if n.rsplit("_", 1)[1] in wanted]
+    else:
+        names = [n for n in names if n.rsplit("_", 1)[1] not in live]
+    _drop_indexes(engine, names)
+    if names:
+        logger.info(f"Dropped {len(names)} per-collection indexes")
+        _forget_collection_routes()
+    return names
+
+
+def sync_collection_indexes(engine, dimensions=None, min_rows=None, storage=None):
+    """Build missing and drop orphaned per-collection indexes; return (built, dropped)."""
+    storage = vector_storage(storage)
+    min_rows = _collection_index_min_rows(min_rows)
+    params = {"n": min_rows, "k": _INDEX_SYNC_LOCK_KEY}
+    where = ""
+    if dimensions is not None:
+        where, params["d"] = "WHERE vector_dims(embedding) = :d ", int(dimensions)
+    with _autocommit(engine) as lock:
+        if not lock.execute(text("SELECT pg_try_advisory_lock(:k)"), params).scalar():
+            logger.info("Per-collection indexes are being synced by another process")
+            return [], []
+        try:
+            dropped = drop_collection_indexes(engine)
+            rows = lock.execute(text(
+                "SELECT collection_id, vector_dims(embedding) AS dims "
+                f"FROM langchain_pg_embedding {where}"
+                "GROUP BY 1, 2 HAVING count(*) >= :n"
+            ), params).all()
+            built = [_build_collection_index(engine, row.collection_id, row.dims, storage)
+                     for row in rows]
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:k)"), params)
+    _forget_collection_routes()
+    return built, dropped
+
+
+def _sync_collection_indexes_forever(engine, interval):
+    while True:
+        try:
+            sync_collection_indexes(engine)
+        except Exception as exc:
+            logger.warning(f"Per-collection index sync failed: {exc}")
+        time.sleep(interval)
+
+
+def start_collection_index_sync(engine, interval=None):
+    """Run sync_collection_indexes on *engine* periodically in a daemon thread."""
+    if interval is None:
+        interval = float(os.getenv("COLLECTION_INDEX_SYNC_SECONDS", "600"))
+    if interval <= 0 or not collection_indexes_enabled():
+        return None
+    with _INDEX_SYNC_THREADS_LOCK:
+        thread = _INDEX_SYNC_THREADS.get(id(engine))
+        if thread is None:
+            thread = threading.Thread(target=_sync_collection_indexes_forever,
+                                      args=(engine, interval),
+                                      name="collection-index-sync", daemon=True)
+            thread.start()
+            _INDEX_SYNC_THREADS[id(engine)] = thread
+        return thread
+
+
+def migrate_vector_storage(engine, dimensions, storage="halfvec", drop_old=True):
+    """Rebuild every HNSW index over *dimensions* in *storage*, online."""
+    dimensions = int(dimensions)
+    storage = vector_storage(storage)
+    old_storages = [s for s in VECTOR_STORAGE_TYPES if s != storage]
+    built, old = [], []
+    with engine.connect() as conn:
+        _require_storage_support(conn, storage)
+        for old_storage in old_storages:
+            tag = VECTOR_STORAGE_TYPES[old_storage][2]
+            for name in _list_indexes(conn, f"{COLLECTION_INDEX_PREFIX}{tag}{dimensions}\\_%"):
+                old.append(name)
+                built.append(_build_collection_index(
+                    engine, uuid.UUID(name.rsplit("_", 1)[1]), dimensions, storage))
+            name = global_index_name(dimensions, old_storage)
+            if _index_valid(conn, name) is not None:
+                old.append(name)
+                built.append(_build_index_concurrently(
+                    engine, global_index_name(dimensions, storage), dimensions, storage))
+    _forget_collection_routes()
+    if drop_old and old:
+        time.sleep(COLLECTION_ROUTE_TTL_SECONDS)
+        _drop_indexes(engine, old)
+        with _HYBRID_INDEX_LOCK:
+            _HYBRID_INDEXES.clear()
+    logger.info(f"Migrated {len(built)} HNSW indexes to {storage}")
+    return built, old if drop_old else []
+
+
+def _forget_collection_routes():
+    with _COLLECTION_ROUTE_LOCK:
+        _COLLECTION_ROUTES.clear()
+
+
+def collection_route(vectorstore, dimensions, storage=None):
+    """(collection_uuid, index_storage) for *vectorstore*'s collection, cached per process."""
+    storage = vector_storage(storage)
+    key = (id(vectorstore._engine), vectorstore.collection_name, int(dimensions), storage)
+    now = time.monotonic()
+    with _COLLECTION_ROUTE_LOCK:
+        cached = _COLLECTION_ROUTES.get(key)
+    if cached is not None and now - cached[0] < COLLECTION_ROUTE_TTL_SECONDS:
+        return cached[1]
+    with vectorstore._engine.connect() as conn:
+        collection_uuid = conn.execute(
+            text("SELECT uuid FROM langchain_pg_collection WHERE name = :c"),
+            {"c": vectorstore.collection_name},
+        ).scalar()
+        index_storage = None
+        if collection_uuid is not None:
+            candidates = [storage] + [s for s in VECTOR_STORAGE_TYPES if s != storage]
+            for candidate in candidates:
+                name = collection_index_name(collection_uuid, dimensions, candidate)
+                if _index_valid(conn, name):
+                    index_storage = candidate
+                    break
+    route = (collection_uuid, index_storage)
+    if collection_uuid is not None:
+        with _COLLECTION_ROUTE_LOCK:
+            _COLLECTION_ROUTES[key] = (now, route)
+    return route
@@ -0,0 +1,841 @@
+"""Ingestion: chunk ids, parent sections, binary COPY, the pipeline and background jobs."""
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+from sqlalchemy import select, text
+
+from rag_caching import bump_collection_version
+from rag_indexes import collection_indexes_enabled, ensure_collection_index
+from rag_text import (get_parent_child_chunks, get_text_chunks, iter_pdf_pages,
+                      iter_pdf_pages_parallel, pdf_bytes, pdf_extract_workers, pdf_source)
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Content-addressed chunk ids
+# ---------------------------------------------------------------------------
+
+def chunk_key(collection_name, source, text):
+    """Deterministic row id for a chunk: sha256 over collection, source and text."""
+    digest = hashlib.sha256()
+    for part in (collection_name, source, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def existing_chunk_ids(vectorstore, ids):
+    """Return the subset of *ids* already stored in *vectorstore*'s collection."""
+    if not ids:
+        return set()
+    store = vectorstore.EmbeddingStore
+    with vectorstore._make_sync_session() as session:
+        collection = vectorstore.get_collection(session)
+        if collection is None:
+            return set()
+        stmt = select(store.id).where(
+            store.collection_id == collection.uuid,
+            store.id.in_(list(ids)),
+        )
+        return set(session.execute(stmt).scalars())
+
+
+def chunk_ids_for_source(vectorstore, source):
+    """Return the ids of every chunk stored for *source* in the collection."""
+    store = vectorstore.EmbeddingStore
+    with vectorstore._make_sync_session() as session:
+        collection = vectorstore.get_collection(session)
+        if collection is None:
+            return set()
+        # @> containment can use the ix_cmetadata_gin (jsonb_path_ops) index
+        stmt = select(store.id).where(
+            store.collection_id == collection.uuid,
+            store.cmetadata.contains({"source": source}),
+        )
+        return set(session.execute(stmt).scalars())
+
+
+_PARENT_TABLES = set()
+_PARENT_TABLE_LOCK = threading.Lock()
+
+
+def chunk_layout(layout=None):
+    """*layout* or CHUNK_LAYOUT: ``flat`` (default) or ``parent`` (small-to-big)."""
+    layout = layout or os.getenv("CHUNK_LAYOUT", "flat") or "flat"
+    if layout not in ("flat", "parent"):
+        raise ValueError(f"CHUNK_LAYOUT must be 'flat' or 'parent', not {layout!r}")
+    return layout
+
+
+def ensure_parent_table(engine):
+    """Create rag_parent_chunk, which holds each parent section once."""
+    with _PARENT_TABLE_LOCK:
+        if engine in _PARENT_TABLES:
+            return
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS rag_parent_chunk ("
+                " id text PRIMARY KEY,"
+                " collection_id uuid NOT NULL"
+                "  REFERENCES langchain_pg_collection (uuid) ON DELETE CASCADE,"
+                " source text NOT NULL,"
+                " document text NOT NULL,"
+                " cmetadata jsonb NOT NULL DEFAULT '{}')"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS rag_parent_chunk_source_idx "
+                "ON rag_parent_chunk (collection_id, source)"
+            ))
+        _PARENT_TABLES.add(engine)
+
+
+def store_parent_chunks(vectorstore, parents):
+    """Insert *parents*, ``(id, text, metadata)`` tuples, skipping ids already stored."""
+    if not parents:
+        return
+    ensure_parent_table(vectorstore._engine)
+    with vectorstore._engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO rag_parent_chunk (id, collection_id, source, document, cmetadata) "
+            "SELECT :id, c.uuid, :source, :document, CAST(:cmetadata AS jsonb) "
+            "FROM langchain_pg_collection c WHERE c.name = :collection "
+            "ON CONFLICT (id) DO NOTHING"
+        ), [{"id": key, "source": metadata["source"], "document": document,
+             "cmetadata": json.dumps(metadata), "collection": vectorstore.collection_name}
+            for key, document, metadata in parents])
+
+
+def delete_stale_parents(vectorstore, source, keep):
+    """Delete *source*'s parent sections in the collection whose id is not in *keep*."""
+    with vectorstore._engine.begin() as conn:
+        if not conn.execute(text("SELECT to_regclass('rag_parent_chunk') IS NOT NULL")).scalar():
+            return 0
+        return conn.execute(text(
+            "DELETE FROM rag_parent_chunk p USING langchain_pg_collection c "
+            "WHERE p.collection_id = c.uuid AND c.name = :collection AND p.source = :source "
+            "  AND NOT (p.id = ANY(:keep))"
+        ), {"collection": vectorstore.collection_name, "source": source,
+            "keep": list(keep)}).rowcount
+
+
+def parent_documents(vectorstore, documents, k=None):
+    """Replace child chunks by their distinct parent sections, in order, up to *k*."""
+    ids = [i for i in dict.fromkeys(d.metadata.get("parent_id") for d in documents)
+           if i is not None]
+    parents = {}
+    if ids:
+        ensure_parent_table(vectorstore._engine)
+        with vectorstore._engine.connect() as conn:
+            parents = {row.id: Document(id=row.id, page_content=row.document,
+                                        metadata=row.cmetadata or {})
+                       for row in conn.execute(text(
+                           "SELECT id, document, cmetadata FROM rag_parent_chunk "
+                           "WHERE id = ANY(:ids)"), {"ids": ids})}
+    result, seen = [], set()
+    for document in documents:
+        parent = parents.get(document.metadata.get("parent_id"), document)
+        key = parent.id or id(parent)
+        if key not in seen:
+            seen.add(key)
+            result.append(parent)
+            if k is not None and len(result) >= k:
+                break
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Binary COPY bulk load
+# ---------------------------------------------------------------------------
+
+_PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_PGCOPY_TRAILER = struct.pack(">h", -1)
+_PGCOPY_ROWS_PER_WRITE = 1000
+
+
+def _pgcopy_field(data):
+    return struct.pack(">i", len(data)) + data
+
+
+def _pgcopy_row(key, collection_uuid, text, embedding, metadata):
+    """Encode one langchain_pg_embedding tuple in PostgreSQL binary COPY format."""
+    # pgvector binary form: uint16 dimensions, uint16 unused, float32[] big-endian
+    vector = struct.pack(f">HH{len(embedding)}f", len(embedding), 0, *embedding)
+    # jsonb binary form: version byte 1 followed by the JSON text
+    cmetadata = b"\x01" + json.dumps(metadata or {}).encode("utf-8")
+    return b"".join((
+        struct.pack(">h", 5),
+        _pgcopy_field(key.encode("utf-8")),
+        _pgcopy_field(collection_uuid.bytes),
+        _pgcopy_field(vector),
+        _pgcopy_field(text.encode("utf-8")),
+        _pgcopy_field(cmetadata),
+    ))
+
+
+def copy_embeddings(vectorstore, texts, embeddings, metadatas=None, ids=None, upsert=True):
+    """PGVector.add_embeddings, but streamed with COPY ... (FORMAT BINARY)."""
+    if ids is None:
+        ids = [None] * len(texts)
+    ids = [key if key is not None else str(uuid.uuid4()) for key in ids]
+    if not metadatas:
+        metadatas = [{} for _ in texts]
+    rows = list(zip(ids, texts, embeddings, metadatas))
+    if upsert:
+        # ON CONFLICT cannot touch the same row twice in one statement
+        rows = list({key: (key, *rest) for key, *rest in rows}.values())
+
+    with vectorstore._make_sync_session() as session:
+        collection = vectorstore.get_collection(session)
+        if not collection:
+            raise ValueError("Collection not found")
+        collection_uuid = collection.uuid
+
+    table = vectorstore.EmbeddingStore.__tablename__
+    columns = "id, collection_id, embedding, document, cmetadata"
+    raw = vectorstore._engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        with conn.cursor() as cur:
+            target = table
+            if upsert:
+                target = "_pg_embedding_load"
+                cur.execute(
+                    f"CREATE TEMP TABLE IF NOT EXISTS {target} "
+                    f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                )
+            with cur.copy(f"COPY {target} ({columns}) FROM STDIN (FORMAT BINARY)") as copy:
+                copy.write(_PGCOPY_HEADER)
+                for i in range(0, len(rows), _PGCOPY_ROWS_PER_WRITE):
+                    copy.write(b"".join(
+                        _pgcopy_row(key, collection_uuid, text, embedding, metadata)
+                        for key, text, embedding, metadata in rows[i:i + _PGCOPY_ROWS_PER_WRITE]
+                    ))
+                copy.write(_PGCOPY_TRAILER)
+            if upsert:
+                cur.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {target} "
+                    "ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding, "
+                    "document = EXCLUDED.document, cmetadata = EXCLUDED.cmetadata"
+                )
+        conn.commit()
+    except Exception:
+        raw.driver_connection.rollback()
+        raise
+    finally:
+        raw.close()
+    return ids
+
+
+# ---------------------------------------------------------------------------
+# Pipelined ingestion: extract -> chunk -> embed -> insert
+# ---------------------------------------------------------------------------
+
+_DONE = object()  # end-of-stream marker passed between pipeline stages
+
+
+@dataclass
+class StageStats:
+    """Counters for one ingestion stage; *units* are pages, chunks or rows."""
+    name: str
+    workers: int
+    units: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = None
+    finished_at: float = None
+
+    @property
+    def wall_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def throughput(self):
+        """Units completed per wall-clock second while the stage was running."""
+        wall = self.wall_seconds
+        return self.units / wall if wall else 0.0
+
+
+@dataclass
+class IngestionStats:
+    """Per-stage throughput for one IngestionPipeline.run()."""
+    stages: dict = field(default_factory=dict)
+    total_seconds: float = 0.0
+    skipped: int = 0   # chunks already stored (or repeated in this run)
+    deleted: int = 0   # stale chunks removed from re-ingested sources
+    parents: int = 0   # parent sections stored (``parent`` layout)
+
+    @property
+    def pages(self):
+        return self.stages["extract"].units
+
+    @property
+    def chunks(self):
+        return self.stages["embed"].units
+
+    @property
+    def rows(self):
+        return self.stages["insert"].units
+
+    def summary(self):
+        """One line per stage, e.g. for logging or a Streamlit caption."""
+        units = {"extract": "pages", "chunk": "chunks", "embed": "chunks", "insert": "rows"}
+        lines = [
+            f"{s.name:<8} {s.units:>6} {units[s.name]:<6} "
+            f"{s.throughput:8.1f}/s  busy {s.busy_seconds:6.2f}s  x{s.workers}"
+            for s in self.stages.values()
+        ]
+        lines.append(f"dedup    {self.skipped:>6} unchanged, {self.deleted} stale removed")
+        if self.parents:
+            lines.append(f"parents  {self.parents:>6} sections stored")
+        return "\n".join(lines)
+
+
+class IngestionPipeline:
+    """Extract, chunk, embed and insert PDFs as concurrent stages joined by bounded queues."""
+
+    def __init__(self, vectorstore, chunk_fn=None, extract_workers=None,
+                 chunk_workers=1, embed_workers=None, insert_workers=1,
+                 batch_size=32, queue_size=8, dedup=True, bulk_copy=None, layout=None,
+                 child_size=None):
+        if embed_workers is None:
+            embed_workers = int(os.getenv("INGEST_EMBED_WORKERS", "4") or 4)
+        if bulk_copy is None:
+            bulk_copy = os.getenv("INGEST_BULK_COPY", "1") != "0"
+        self.vectorstore = vectorstore
+        self.chunk_fn = chunk_fn or get_text_chunks
+        self.extract_workers = extract_workers
+        self.chunk_workers = chunk_workers
+        self.embed_workers = max(embed_workers, 1)
+        self.insert_workers = insert_workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.dedup = dedup
+        self.bulk_copy = bulk_copy
+        self.layout = chunk_layout(layout)
+        self.child_size = child_size or int(os.getenv("CHILD_CHUNK_SIZE", "400"))
+
+    # -- queue helpers: never block forever once another stage has failed --
+
+    def _get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._error is not None:
+                    return _DONE
+
+    def _put(self, q, item):
+        while self._error is None:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _fail(self, exc):
+        with self._lock:
+            if self._error is None:
+                self._error = exc
+
+    def _record(self, stage, seconds, units):
+        with self._lock:
+            stage.busy_seconds += seconds
+            stage.units += units
+
+    def _stage_done(self, stage, outq, consumers):
+        with self._lock:
+            self._active[stage.name] -= 1
+            last = self._active[stage.name] == 0
+            if last:
+                stage.finished_at = time.perf_counter()
+        if last and outq is not None:
+            for _ in range(consumers):
+                self._put(outq, _DONE)
+
+    # -- stages --
+
+    def _extract(self, pdf_docs, stage, outq):
+        try:
+            if pdf_extract_workers(self.extract_workers):
+                pages = iter_pdf_pages_parallel(pdf_docs, self.extract_workers)
+            else:
+                pages = iter_pdf_pages(pdf_docs)
+            start = time.perf_counter()
+            for page in pages:
+                self._record(stage, time.perf_counter() - start, 1)
+                self._put(outq, page)
+                if self._error is not None:
+                    break
+                start = time.perf_counter()
+        except Exception as exc:
+            self._fail(exc)
+        finally:
+            self._stage_done(stage, outq, self.chunk_workers)
+
+    def _page_chunks(self, page):
+        """(key, text, metadata) of each chunk of *page* to embed."""
+        collection = self.vectorstore.collection_name
+        if self.layout == "flat":
+            return [(chunk_key(collection, page.source, chunk) if self.dedup else None, chunk,
+                     {"source": page.source, "page": page.page_number, "chunk_id": i})
+                    for i, chunk in enumerate(self.chunk_fn(page.text))]
+        parents, children, parent_of = get_parent_child_chunks(page.text, self.child_size)
+        parent_keys = [chunk_key(collection, page.source, parent) for parent in parents]
+        with self._lock:
+            self._parent_keys.setdefault(page.source, set()).update(parent_keys)
+            for i, (key, parent) in enumerate(zip(parent_keys, parents)):
+                self._parents[key] = (key, parent, {"source": page.source,
+                                                    "page": page.page_number, "chunk_id": i})
+        chunks = []
+        for i, (child, p) in enumerate(zip(children, parent_of)):
+            key = None
+            if self.dedup:
+                # the parent key keeps a child repeated under two sections apart
+                key = chunk_key(collection, page.source, parent_keys[p] + child)
+            chunks.append((key, child, {"source": page.source, "page": page.page_number,
+                                        "chunk_id": i, "parent_id": parent_keys[p]}))
+        return chunks
+
+    def _chunk(self, stage, inq, outq):
+        batch = []
+        try:
+            while True:
+                page = self._get(inq)
+                if page is _DONE:
+                    break
+                start = time.perf_counter()
+                chunks = self._page_chunks(page) if page.text.strip() else []
+                self._record(stage, time.perf_counter() - start, len(chunks))
+                for item in chunks:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        self._put(outq, batch)
+                        batch = []
+            if batch:
+                self._put(outq, batch)
+        except Exception as exc:
+            self._fail(exc)
+        finally:
+            self._stage_done(stage, outq, self.embed_workers)
+
+    def _new_chunks(self, batch):
+        """Drop chunks already in the collection or already seen in this run."""
+        with self._lock:
+            fresh = []
+            for item in batch:
+                key, _, metadata = item
+                seen = self._seen.setdefault(metadata["source"], set())
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(item)
+        stored = existing_chunk_ids(self.vectorstore, [key for key, _, _ in fresh])
+        with self._lock:
+            self._stats.skipped += len(batch) - len(fresh) + len(stored)
+        return [item for item in fresh if item[0] not in stored]
+
+    def _remove_stale(self):
+        """Delete chunks (and parent sections) of the ingested sources that this run did not produce."""
+        for source, keys in self._seen.items():
+            stale = chunk_ids_for_source(self.vectorstore, source) - keys
+            if stale:
+                self.vectorstore.delete(ids=list(stale), collection_only=True)
+                self._stats.deleted += len(stale)
+            delete_stale_parents(self.vectorstore, source, self._parent_keys.get(source, ()))
+
+    def _store_parents(self, batch):
+        """Store the parent sections of *batch* that this run has not stored yet."""
+        with self._lock:
+            pending = []
+            for _, _, metadata in batch:
+                key = metadata["parent_id"]
+                if key not in self._parents_stored:
+                    self._parents_stored.add(key)
+                    pending.append(self._parents[key])
+        store_parent_chunks(self.vectorstore, pending)
+        with self._lock:
+            self._stats.parents += len(pending)
+
+    def _embed(self, stage, inq, outq):
+        try:
+            embeddings = self.vectorstore.embeddings
+            while True:
+                batch = self._get(inq)
+                if batch is _DONE:
+                    break
+                if self.dedup:
+                    batch = self._new_chunks(batch)
+                    if not batch:
+                        continue
+                start = time.perf_counter()
+                vectors = embeddings.embed_documents([text for _, text, _ in batch])
+                self._record(stage, time.perf_counter() - start, len(batch))
+                self._put(outq, (batch, vectors))
+        except Exception as exc:
+            self._fail(exc)
+        finally:
+            self._stage_done(stage, outq, self.insert_workers)
+
+    def _insert(self, stage, inq):
+        try:
+            while True:
+                item = self._get(inq)
+                if item is _DONE:
+                    break
+                batch, vectors = item
+                rows = dict(
+                    texts=[text for _, text, _ in batch],
+                    embeddings=vectors,
+                    metadatas=[metadata for _, _, metadata in batch],
+                    ids=[key for key, _, _ in batch],
+                )
+                self._dimensions = len(vectors[0])
+                start = time.perf_counter()
+                if self.layout == "parent":
+                    self._store_parents(batch)
+                if self.bulk_copy:
+                    copy_embeddings(self.vectorstore, **rows)
+                else:
+                    self.vectorstore.add_embeddings(**rows)
+                self._record(stage, time.perf_counter() - start, len(batch))
+        except Exception as exc:
+            self._fail(exc)
+        finally:
+            self._stage_done(stage, None, 0)
+
+    def run(self, pdf_docs, progress=None, poll_interval=0.5):
+        """Ingest *pdf_docs* and return IngestionStats, calling *progress* while it runs."""
+        self._lock = threading.Lock()
+        self._error = None
+        self._seen = {}  # source -> chunk keys produced by this run
+        self._parents = {}  # parent key -> (key, text, metadata), ``parent`` layout
+        self._parent_keys = {}  # source -> parent keys produced by this run
+        self._parents_stored = set()
+        self._dimensions = None
+        self._stats = stats = IngestionStats(stages={
+            "extract": StageStats("extract", 1),
+            "chunk": StageStats("chunk", self.chunk_workers),
+            "embed": StageStats("embed", self.embed_workers),
+            "insert": StageStats("insert", self.insert_workers),
+        })
+        self._active = {name: s.workers for name, s in stats.stages.items()}
+        pages_q = queue.Queue(self.queue_size)
+        chunks_q = queue.Queue(self.queue_size)
+        vectors_q = queue.Queue(self.queue_size)
+
+        stages = stats.stages
+        targets = [(self._extract, (pdf_docs, stages["extract"], pages_q))]
+        targets += [(self._chunk, (stages["chunk"], pages_q, chunks_q))] * self.chunk_workers
+        targets += [(self._embed, (stages["embed"], chunks_q, vectors_q))] * self.embed_workers
+        targets += [(self._insert, (stages["insert"], vectors_q))] * self.insert_workers
+
+        started = time.perf_counter()
+        for s in stages.values():
+            s.started_at = started
+        threads = [
+            threading.Thread(target=fn, args=args, daemon=True, name=f"ingest-{fn.__name__[1:]}")
+            for fn, args in targets
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            while t.is_alive():
+                t.join(poll_interval)
+                stats.total_seconds = time.perf_counter() - started
+                if progress is not None:
+                    progress(stats)
+        if self._error is not None:
+            raise self._error
+        if self.dedup:
+            self._remove_stale()
+        if stats.rows or stats.deleted:
+            bump_collection_version(self.vectorstore)
+        if stats.rows and collection_indexes_enabled():
+            ensure_collection_index(self.vectorstore, self._dimensions)
+        stats.total_seconds = time.perf_counter() - started
+        return stats
+
+
+# ---------------------------------------------------------------------------
+# Background ingestion jobs
+# ---------------------------------------------------------------------------
+
+_ACTIVE_JOB_STATES = ("queued", "running")
+
+
+def _ensure_ingest_job_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS rag_ingest_job ("
+        " id uuid PRIMARY KEY,"
+        " collection text NOT NULL,"
+        " sources jsonb NOT NULL DEFAULT '[]',"
+        " status text NOT NULL DEFAULT 'queued',"
+        " worker text NOT NULL,"
+        " pages_total integer,"
+        " pages integer NOT NULL DEFAULT 0,"
+        " chunks integer NOT NULL DEFAULT 0,"
+        " embedded integer NOT NULL DEFAULT 0,"
+        " inserted integer NOT NULL DEFAULT 0,"
+        " skipped integer NOT NULL DEFAULT 0,"
+        " eta_seconds real,"
+        " error text,"
+        " created_at timestamptz NOT NULL DEFAULT now(),"
+        " started_at timestamptz,"
+        " updated_at timestamptz NOT NULL DEFAULT now(),"
+        " finished_at timestamptz)"
+    ))
+
+
+def _ingest_fraction(pages_total, pages, chunks, completed):
+    """Share of a job that is done, extrapolating chunks per page to the whole upload."""
+    if not pages_total or not pages or not chunks:
+        return 0.0
+    expected = chunks * max(pages_total / pages, 1.0)
+    return min(completed / expected, 1.0)
+
+
+@dataclass
+class IngestionJob:
+    """One row of rag_ingest_job, as returned by IngestionJobs.status()."""
+    id: str
+    collection: str
+    sources: list
+    status: str
+    pages_total: Optional[int]
+    pages: int
+    chunks: int
+    embedded: int
+    inserted: int
+    skipped: int
+    eta_seconds: Optional[float]
+    error: Optional[str]
+    elapsed_seconds: float
+
+    @property
+    def active(self):
+        return self.status in _ACTIVE_JOB_STATES
+
+    @property
+    def fraction(self):
+        if self.status == "done":
+            return 1.0
+        return _ingest_fraction(self.pages_total, self.pages, self.chunks,
+                                self.inserted + self.skipped)
+
+    def summary(self):
+        """One line for a progress bar or status message."""
+        names = ", ".join(os.path.basename(source) for source in self.sources)
+        if self.status == "queued":
+            return f"Queued: {names}"
+        if self.status == "failed":
+            return f"Ingestion failed: {self.error}"
+        parts = [f"Read {self.pages}/{self.pages_total or '?'} pages",
+                 f"embedded {self.embedded} chunks", f"stored {self.inserted} rows"]
+        if self.skipped:
+            parts.append(f"{self.skipped} unchanged")
+        if self.status == "done":
+            return f"Processed {names} in {self.elapsed_seconds:.0f} s: " + ", ".join(parts)
+        if self.eta_seconds is not None:
+            parts.append(f"about {self.eta_seconds:.0f} s left")
+        return ", ".join(parts)
+
+
+class IngestionJobs:
+    """Process-wide pool that runs IngestionPipeline jobs off the Streamlit script thread."""
+
+    def __init__(self, workers=None, update_interval=1.0):
+        if workers is None:
+            workers = int(os.getenv("INGEST_JOB_WORKERS", "2") or 2)
+        self.workers = max(workers, 1)
+        self.update_interval = update_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="ingest-job")
+        self._lock = threading.Lock()
+        self._active = {}     # (collection, upload digest) -> job id
+        self._ready = set()   # engines whose job table has been set up
+
+    def _ensure_table(self, engine):
+        with self._lock:
+            if engine in self._ready:
+                return
+        with engine.begin() as conn:
+            _ensure_ingest_job_table(conn)
+            conn.execute(text(
+                "UPDATE rag_ingest_job SET status = 'failed', "
+                " error = 'interrupted: the app process stopped', "
+                " finished_at = now(), updated_at = now() "
+                "WHERE status IN ('queued', 'running') AND worker LIKE :host AND worker <> :me"
+            ), {"host": f"{socket.gethostname()}:%", "me": self.worker_id})
+            conn.execute(text(
+                "DELETE FROM rag_ingest_job "
+                "WHERE finished_at < now() - make_interval(days => :days)"
+            ), {"days": int(os.getenv("INGEST_JOB_RETENTION_DAYS", "7"))})
+        with self._lock:
+            self._ready.add(engine)
+
+    def submit(self, vectorstore, pdf_docs, **pipeline_kwargs):
+        """Queue *pdf_docs* for ingestion into *vectorstore* and return the job id."""
+        files = [(pdf_source(pdf), pdf_bytes(pdf)) for pdf in pdf_docs]
+        digest = hashlib.sha256()
+        for name, data in files:
+            digest.update(name.encode("utf-8"))
+            digest.update(hashlib.sha256(data).digest())
+        key = (vectorstore.collection_name, digest.hexdigest())
+        engine = vectorstore._engine
+        self._ensure_table(engine)
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return job_id
+            job_id = str(uuid.uuid4())
+            self._active[key] = job_id
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO rag_ingest_job (id, collection, sources, worker) "
+                    "VALUES (:id, :c, CAST(:s AS jsonb), :w)"
+                ), {"id": job_id, "c": vectorstore.collection_name,
+                    "s": json.dumps([name for name, _ in files]), "w": self.worker_id})
+            self._executor.submit(self._run, job_id, key, vectorstore, files, pipeline_kwargs)
+        except Exception:
+            with self._lock:
+                self._active.pop(key, None)
+            raise
+        return job_id
+
+    def _update(self, engine, job_id, status, stats=None, pages_total=None, eta=None,
+                error=None):
+        params = {"id": job_id, "status": status, "pages_total": pages_total, "eta": eta,
+                  "error": error, "pages": 0, "chunks": 0, "embedded": 0, "inserted": 0,
+                  "skipped": 0}
+        if stats is not None:
+            params.update(pages=stats.pages, chunks=stats.stages["chunk"].units,
+                          embedded=stats.chunks, inserted=stats.rows, skipped=stats.skipped)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE rag_ingest_job SET status = :status,"
+                " pages_total = COALESCE(:pages_total, pages_total),"
+                " pages = GREATEST(pages, :pages), chunks = GREATEST(chunks, :chunks),"
+                " embedded = GREATEST(embedded, :embedded),"
+                " inserted = GREATEST(inserted, :inserted),"
+                " skipped = GREATEST(skipped, :skipped),"
+                " eta_seconds = :eta, error = :error, updated_at = now(),"
+                " started_at = COALESCE(started_at, now()),"
+                " finished_at = CASE WHEN :status IN ('done', 'failed') THEN now() END "
+                "WHERE id = :id"
+            ), params)
+
+    def _run(self, job_id, key, vectorstore, files, pipeline_kwargs):
+        engine = vectorstore._engine
+        try:
+            docs, pages_total = [], 0
+            for name, data in files:
+                pages_total += len(PdfReader(io.BytesIO(data)).pages)
+                doc = io.BytesIO(data)
+                doc.name = name
+                docs.append(doc)
+            self._update(engine, job_id, "running", pages_total=pages_total)
+            last_update = time.perf_counter()
+
+            def report(stats):
+                nonlocal last_update
+                if time.perf_counter() - last_update < self.update_interval:
+                    return
+                last_update = time.perf_counter()
+                done = _ingest_fraction(pages_total, stats.pages, stats.stages["chunk"].units,
+                                        stats.rows + stats.skipped)
+                eta = stats.total_seconds * (1 - done) / done if done else None
+                self._update(engine, job_id, "running", stats, eta=eta)
+
+            stats = IngestionPipeline(vectorstore, **pipeline_kwargs).run(docs, progress=report)
+            self._update(engine, job_id, "done", stats, eta=0.0)
+            logger.info(f"Ingestion job {job_id}: {stats.rows} chunks in "
+                        f"{stats.total_seconds:.2f} seconds\n{stats.summary()}")
+        except Exception as e:
+            logger.exception(f"Ingestion job {job_id} failed")
+            try:
+                self._update(engine, job_id, "failed", error=str(e) or type(e).__name__)
+            except Exception:
+                logger.exception(f"Could not record the failure of ingestion job {job_id}")
+        finally:
+            with self._lock:
+                self._active.pop(key, None)
+
+    def status(self, engine, job_ids):
+        """IngestionJob for each of *job_ids* still in the table, in the given order."""
+        if not job_ids:
+            return []
+        self._ensure_table(engine)
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT id::text, collection, sources, status, pages_total, pages, chunks,"
+                " embedded, inserted, skipped, eta_seconds, error,"
+                " extract(epoch FROM COALESCE(finished_at, now())"
+                "                    - COALESCE(started_at, created_at)) "
+                "FROM rag_ingest_job WHERE id = ANY(CAST(:ids AS uuid[]))"
+            ), {"ids": list(job_ids)}).all()
+        jobs = {row[0]: IngestionJob(*row[:-1], elapsed_seconds=float(row[-1])) for row in rows}
+        return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+_INGESTION_JOBS = None
+_INGESTION_JOBS_LOCK = threading.Lock()
+
+
+def ingestion_jobs():
+    """The process-wide IngestionJobs pool, created on first use."""
+    global _INGESTION_JOBS
+    with _INGESTION_JOBS_LOCK:
+        if _INGESTION_JOBS is None:
+            _INGESTION_JOBS = IngestionJobs()
+        return _INGESTION_JOBS
+
+
+def track_ingestion_job(job_id, keep=5):
+    """Add *job_id* to the Streamlit session's jobs shown by show_ingestion_jobs."""
+    import streamlit as st
+
+    jobs = [j for j in st.session_state.get("ingest_jobs", []) if j != job_id]
+    st.session_state.ingest_jobs = jobs[-(keep - 1):] + [job_id]
+    st.session_state.ingest_polling = True
+
+
+def show_ingestion_jobs(engine):
+    """Show the progress of the Streamlit session's ingestion jobs."""
+    import streamlit as st
+
+    if not st.session_state.get("ingest_jobs"):
+        return
+
+    def render():
+        jobs = ingestion_jobs().status(engine, st.session_state.ingest_jobs)
+        for job in jobs:
+            if job.status == "failed":
+                st.error(job.summary())
+            elif job.status == "done":
+                st.success(job.summary(), icon="✅")
+            else:
+                st.progress(job.fraction, text=job.summary())
+        if st.session_state.ingest_polling and not any(job.active for job in jobs):
+            st.session_state.ingest_polling = False
+            st.rerun()
+
+    poll = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+    st.fragment(run_every=poll if st.session_state.ingest_polling else None)(render)()
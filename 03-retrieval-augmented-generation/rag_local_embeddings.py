@@ -0,0 +1,158 @@
+"""Local sentence-transformers embeddings with dynamic batching."""
+import logging
+import os
+import queue
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LOCAL_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+# Vectors from the int8 ONNX backend stay within this cosine distance of the
+# fp32 PyTorch vectors for the same text (checked by bench_local_embeddings.py)
+LOCAL_EMBEDDING_TOLERANCE = 0.01
+
+_LOCAL_ENGINES = {}
+_LOCAL_ENGINE_LOCK = threading.Lock()
+
+
+def _onnx_int8_file():
+    """Quantized ONNX export shipped with all-mpnet-base-v2 that suits this CPU."""
+    flags = ""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        pass
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512f" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    if "avx2" in flags:
+        return "onnx/model_quint8_avx2.onnx"
+    return "onnx/model_qint8_arm64.onnx"
+
+
+def _load_sentence_transformer(model_name, backend):
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        return SentenceTransformer(model_name, device="cpu")
+    file_name = "onnx/model.onnx"
+    if backend == "onnx-int8":
+        file_name = os.getenv("EMBEDDING_ONNX_FILE") or _onnx_int8_file()
+    return SentenceTransformer(model_name, device="cpu", backend="onnx",
+                               model_kwargs={"file_name": file_name})
+
+
+class LocalEmbeddingEngine:
+    """A sentence-transformers model shared by every thread, with dynamic batching."""
+
+    def __init__(self, model, backend="torch", max_batch_size=64, max_wait_ms=0.0):
+        self.model = model
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.texts = 0
+        self._requests = queue.Queue()
+        threading.Thread(target=self._run, name="embedding-engine", daemon=True).start()
+
+    def encode(self, texts):
+        if not texts:
+            return []
+        done = threading.Event()
+        request = {"texts": list(texts), "done": done}
+        self._requests.put(request)
+        done.wait()
+        if "error" in request:
+            raise request["error"]
+        return request["vectors"]
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        size = len(batch[0]["texts"])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while size < self.max_batch_size:
+            try:
+                request = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request["texts"])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [t for request in batch for t in request["texts"]]
+            try:
+                vectors = self.model.encode(
+                    texts,
+                    batch_size=self.max_batch_size,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                ).tolist()
+            except Exception as exc:
+                for request in batch:
+                    request["error"] = exc
+                    request["done"].set()
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for request in batch:
+                count = len(request["texts"])
+                request["vectors"] = vectors[offset:offset + count]
+                offset += count
+                request["done"].set()
+
+
+def get_local_embedding_engine(model_name=DEFAULT_LOCAL_EMBEDDING_MODEL, backend=None):
+    """Process-wide LocalEmbeddingEngine for *model_name*."""
+    if backend is None:
+        backend = os.getenv("EMBEDDING_BACKEND", "onnx-int8")
+    key = (model_name, backend)
+    with _LOCAL_ENGINE_LOCK:
+        engine = _LOCAL_ENGINES.get(key)
+        if engine is None:
+            start = time.perf_counter()
+            loaded = backend
+            try:
+                model = _load_sentence_transformer(model_name, backend)
+            except Exception as exc:
+                if backend == "torch":
+                    raise
+                logger.warning(f"{backend} backend unavailable ({exc}); using torch")
+                loaded = "torch"
+                model = _load_sentence_transformer(model_name, loaded)
+            engine = LocalEmbeddingEngine(
+                model,
+                backend=loaded,
+                max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+                max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "0")),
+            )
+            logger.info(f"Loaded {model_name} ({loaded}) in {time.perf_counter() - start:.1f}s")
+            _LOCAL_ENGINES[key] = engine
+    return engine
+
+
+class LocalEmbeddings(Embeddings):
+    """LangChain Embeddings backed by the process-wide LocalEmbeddingEngine."""
+
+    def __init__(self, model_name=DEFAULT_LOCAL_EMBEDDING_MODEL, backend=None):
+        self.model_name = model_name
+        self.engine = get_local_embedding_engine(model_name, backend)
+        # cache keys differ per backend: int8 vectors are close, not equal
+        self.model_id = f"{model_name}#{self.engine.backend}"
+        self.normalize = True
+
+    def embed_documents(self, texts):
+        return self.engine.encode(texts)
+
+    def embed_query(self, text):
+        return self.engine.encode([text])[0]
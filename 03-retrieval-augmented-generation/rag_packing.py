@@ -0,0 +1,132 @@
+"""Token-budgeted prompt packing of retrieved context and chat history."""
+import json
+import logging
+from dataclasses import dataclass
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    """Rough token count for Claude/Nova prompts: one token per four characters."""
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(message):
+    content = message.content
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    return estimate_tokens(content) + 4
+
+
+def _overlap(left, right, max_overlap):
+    """Length of the longest suffix of *left* that is a prefix of *right*."""
+    for start in range(max(0, len(left) - max_overlap), len(left)):
+        if right.startswith(left[start:]):
+            return len(left) - start
+    return 0
+
+
+def merge_adjacent_chunks(documents, max_overlap=400):
+    """Merge retrieved chunks that are overlapping neighbours in the same page."""
+    merged = []
+    by_position = {}
+    for doc in documents:
+        meta = doc.metadata or {}
+        chunk_id = meta.get("chunk_id")
+        key = (meta.get("source"), meta.get("page"))
+        if (key, chunk_id) in by_position or any(doc.page_content == m.page_content for m in merged):
+            continue
+        if isinstance(chunk_id, int):
+            for neighbour_id, before in ((chunk_id - 1, True), (chunk_id + 1, False)):
+                target = by_position.get((key, neighbour_id))
+                if target is None:
+                    continue
+                left, right = (target.page_content, doc.page_content) if before else \
+                    (doc.page_content, target.page_content)
+                overlap = _overlap(left, right, max_overlap)
+                if not overlap:
+                    continue
+                target.page_content = left + right[overlap:]
+                ids = target.metadata.setdefault("chunk_ids", [target.metadata["chunk_id"]])
+                ids.append(chunk_id)
+                ids.sort()
+                by_position[(key, chunk_id)] = target
+                break
+            else:
+                doc = Document(page_content=doc.page_content, metadata=dict(meta), id=doc.id)
+                by_position[(key, chunk_id)] = doc
+                merged.append(doc)
+            continue
+        merged.append(doc)
+    return merged
+
+
+@dataclass
+class PackStats:
+    """Estimated prompt tokens before and after packing one request."""
+    context_before: int = 0
+    context_after: int = 0
+    history_before: int = 0
+    history_after: int = 0
+
+    @property
+    def saved(self):
+        return (self.context_before - self.context_after) + (self.history_before - self.history_after)
+
+    def summary(self):
+        return (f"context {self.context_before}->{self.context_after} tokens, "
+                f"history {self.history_before}->{self.history_after} tokens, "
+                f"saved {self.saved}")
+
+
+class PromptPacker:
+    """Keep the retrieved context and chat history of a prompt within token budgets."""
+
+    def __init__(self, context_tokens=6000, history_tokens=2000, summarizer=None):
+        self.context_tokens = context_tokens
+        self.history_tokens = history_tokens
+        self.summarizer = summarizer
+
+    def pack_documents(self, documents, stats=None):
+        stats = stats if stats is not None else PackStats()
+        stats.context_before += sum(estimate_tokens(d.page_content) for d in documents)
+        packed, remaining = [], self.context_tokens
+        for doc in merge_adjacent_chunks(documents):
+            tokens = estimate_tokens(doc.page_content)
+            if tokens > remaining:
+                if remaining >= 50 or not packed:
+                    packed.append(Document(page_content=doc.page_content[:remaining * 4],
+                                           metadata=doc.metadata, id=doc.id))
+                    stats.context_after += remaining
+                break
+            packed.append(doc)
+            remaining -= tokens
+            stats.context_after += tokens
+        return packed
+
+    def pack_history(self, messages, stats=None):
+        from langchain_core.messages import HumanMessage
+        stats = stats if stats is not None else PackStats()
+        sizes = [_message_tokens(m) for m in messages]
+        stats.history_before += sum(sizes)
+        keep, used = len(messages), 0
+        while keep > 0 and used + sizes[keep - 1] <= self.history_tokens:
+            keep -= 1
+            used += sizes[keep]
+        # never start the kept history with an AI reply
+        while keep < len(messages) and messages[keep].type == "ai":
+            used -= sizes[keep]
+            keep += 1
+        packed = list(messages[keep:])
+        if keep and self.summarizer is not None:
+            try:
+                summary = HumanMessage(content="Summary of the earlier conversation: "
+                                                + self.summarizer(messages[:keep]))
+                packed.insert(0, summary)
+                used += _message_tokens(summary)
+            except Exception as exc:
+                logger.warning(f"History summary failed, dropping old turns: {exc}")
+        stats.history_after += used
+        return packed
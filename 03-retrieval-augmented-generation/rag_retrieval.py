@@ -0,0 +1,433 @@
+"""Retrievers for the 03 chains: hybrid, dense, MMR, reranking and speculative history-aware."""
+import logging
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableLambda
+from sqlalchemy import text
+
+from rag_db import vector_literal
+from rag_indexes import (collection_indexes_enabled, collection_route, ensure_hybrid_indexes,
+                         vector_cast, vector_storage)
+from rag_ingest import chunk_layout, ensure_parent_table, parent_documents
+from rag_tracing import emit_stage
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Speculative history-aware retrieval
+# ---------------------------------------------------------------------------
+
+def _cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def create_speculative_history_aware_retriever(llm, retriever, prompt, embeddings=None,
+                                               similarity_threshold=0.92):
+    """create_history_aware_retriever that retrieves while the LLM condenses the question."""
+    if embeddings is None:
+        embeddings = retriever.vectorstore.embeddings
+    condense = prompt | llm | StrOutputParser()
+
+    def retrieve(inputs, config):
+        question = inputs["input"]
+        if not inputs.get("chat_history"):
+            return retriever.invoke(question, config)
+
+        def timed_retrieve(query):
+            start = time.perf_counter()
+            docs = retriever.invoke(query, config)
+            return docs, time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            raw_future = pool.submit(timed_retrieve, question)
+            rewritten = condense.invoke(inputs, config).strip()
+            condense_seconds = time.perf_counter() - started
+            docs, retrieve_seconds = raw_future.result()
+
+        if " ".join(rewritten.lower().split()) == " ".join(question.lower().split()):
+            similarity = 1.0
+        else:
+            similarity = _cosine_similarity(
+                embeddings.embed_query(question), embeddings.embed_query(rewritten))
+        reused = similarity >= similarity_threshold
+        if not reused:
+            docs, retrieve_seconds = timed_retrieve(rewritten)
+
+        elapsed = time.perf_counter() - started
+        saved = condense_seconds + retrieve_seconds - elapsed
+        logger.info(
+            f"Speculative retrieval: similarity={similarity:.3f} "
+            f"{'reused raw-question results' if reused else 'retrieved again for rewrite'}, "
+            f"condense={condense_seconds * 1000:.0f}ms retrieve={retrieve_seconds * 1000:.0f}ms "
+            f"saved={saved * 1000:.0f}ms"
+        )
+        return docs
+
+    return RunnableLambda(retrieve).with_config(run_name="speculative_history_aware_retriever")
+
+
+# ---------------------------------------------------------------------------
+# Hybrid, dense and MMR retrievers
+# ---------------------------------------------------------------------------
+
+class HybridRetriever(BaseRetriever):
+    """Full-text + vector retriever for a PGVector collection, fused with RRF."""
+
+    vectorstore: object
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    bm25_k1: float = 1.2
+    text_search_config: str = "english"
+    ef_search: int = 0
+    collection_indexes: Optional[bool] = None
+    sparse: bool = True
+    storage: Optional[str] = None
+    parent_documents: bool = False
+
+    def _vector_leg(self, dims, embedding_param=":embedding"):
+        """SQL (collection, distance) expressions for the vector leg."""
+        config = self.text_search_config
+        if not re.fullmatch(r"\w+", config):
+            raise ValueError(f"Invalid text search configuration: {config!r}")
+        routed = self.collection_indexes
+        if routed is None:
+            routed = collection_indexes_enabled()
+        storage = vector_storage(self.storage)
+        ensure_hybrid_indexes(self.vectorstore, dims, config, global_hnsw=not routed,
+                              storage=storage)
+        collection = "(SELECT uuid FROM coll)"
+        if routed:
+            collection_uuid, storage = collection_route(self.vectorstore, dims, storage)
+            if collection_uuid is not None:
+                collection = f"'{uuid.UUID(str(collection_uuid))}'::uuid"
+        if storage is None:
+            # no expression match with any HNSW index: exact scan via collection_id
+            return collection, f"e.embedding <=> CAST({embedding_param} AS vector)"
+        cast = vector_cast(dims, storage)
+        return collection, f"e.embedding::{cast} <=> CAST({embedding_param} AS {cast})"
+
+    def _search(self, query, embedding):
+        dims = len(embedding)
+        collection, distance = self._vector_leg(dims)
+        config = self.text_search_config
+        tsvector = f"to_tsvector('{config}'::regconfig, e.document)"
+        dense = f"""
+            dense AS (
+                SELECT id, row_number() OVER () AS rnk FROM (
+                    SELECT e.id FROM langchain_pg_embedding e
+                    WHERE e.collection_id = {collection}
+                      AND vector_dims(e.embedding) = {dims}
+                    ORDER BY {distance}
+                    LIMIT :fetch_k
+                ) nearest
+            )"""
+        if not self.sparse:
+            sql = text(f"""
+                WITH coll AS (
+                    SELECT uuid FROM langchain_pg_collection WHERE name = :collection
+                ),{dense}
+                {self._results("dense", "1.0 / (:rrf_k + r.rnk)")}
+            """)
+            return self._execute(sql, query, embedding)
+        sql = text(f"""
+            WITH coll AS (
+                SELECT uuid FROM langchain_pg_collection WHERE name = :collection
+            ),{dense},
+            terms AS (
+                SELECT t.lexeme,
+                       ln(1 + (n.total - t.df + 0.5) / (t.df + 0.5)) AS idf
+                FROM (
+                    SELECT l.lexeme,
+                           (SELECT count(*) FROM langchain_pg_embedding e
+                            WHERE e.collection_id = {collection}
+                              AND {tsvector} @@ format('%L', l.lexeme)::tsquery) AS df
+                    FROM unnest(tsvector_to_array(
+                        to_tsvector('{config}'::regconfig, :query))) AS l(lexeme)
+                ) t,
+                (SELECT count(*) AS total FROM langchain_pg_embedding e
+                 WHERE e.collection_id = {collection}) n
+            ),
+            matches AS MATERIALIZED (
+                SELECT e.id, {tsvector} AS tsv
+                FROM langchain_pg_embedding e
+                WHERE e.collection_id = {collection}
+                  AND {tsvector} @@ (
+                      SELECT string_agg(format('%L', lexeme), ' | ')::tsquery FROM terms)
+            ),
+            sparse AS (
+                SELECT m.id, row_number() OVER (ORDER BY sum(
+                    t.idf * (:bm25_k1 + 1) * cardinality(u.positions)
+                    / (cardinality(u.positions) + :bm25_k1)) DESC) AS rnk
+                FROM matches m
+                CROSS JOIN LATERAL unnest(m.tsv) AS u
+                JOIN terms t ON t.lexeme = u.lexeme
+                GROUP BY m.id
+                ORDER BY rnk
+                LIMIT :fetch_k
+            ),
+            fused AS (
+                SELECT COALESCE(d.id, s.id) AS id,
+                       COALESCE(1.0 / (:rrf_k + d.rnk), 0)
+                     + COALESCE(1.0 / (:rrf_k + s.rnk), 0) AS score
+                FROM dense d FULL OUTER JOIN sparse s ON d.id = s.id
+            )
+            {self._results("fused", "r.score")}
+        """)
+        return self._execute(sql, query, embedding)
+
+    def _results(self, ranked, score):
+        """Final SELECT of the top *k* rows of CTE *ranked* by *score*."""
+        if not self.parent_documents:
+            return f"""
+                SELECT e.id, e.document, e.cmetadata, {score} AS score
+                FROM {ranked} r JOIN langchain_pg_embedding e ON e.id = r.id
+                ORDER BY 4 DESC, 1
+                LIMIT :k"""
+        ensure_parent_table(self.vectorstore._engine)
+        return f"""
+            SELECT COALESCE(p.id, e.id) AS id, COALESCE(p.document, e.document) AS document,
+                   COALESCE(p.cmetadata, e.cmetadata) AS cmetadata, max({score}) AS score
+            FROM {ranked} r JOIN langchain_pg_embedding e ON e.id = r.id
+            LEFT JOIN rag_parent_chunk p ON p.id = e.cmetadata->>'parent_id'
+            GROUP BY 1, 2, 3
+            ORDER BY 4 DESC, 1
+            LIMIT :k"""
+
+    def _execute(self, sql, query, embedding):
+        params = {
+            "collection": self.vectorstore.collection_name,
+            "embedding": vector_literal(embedding),
+            "query": query,
+            "fetch_k": max(self.fetch_k, self.k),
+            "rrf_k": self.rrf_k,
+            "bm25_k1": self.bm25_k1,
+            "k": self.k,
+        }
+        with self.vectorstore._engine.begin() as conn:
+            if self.ef_search:
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(self.ef_search)}"))
+            rows = conn.execute(sql, params).all()
+        return [Document(id=row.id, page_content=row.document, metadata=row.cmetadata or {})
+                for row in rows]
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        start = time.time_ns()
+        embedding = self.vectorstore.embeddings.embed_query(query)
+        embedded = time.time_ns()
+        documents = self._search(query, embedding)
+        end = time.time_ns()
+        emit_stage(run_manager, "embedding", start, embedded)
+        emit_stage(run_manager, "pgvector_query", embedded, end, {"rag.documents": len(documents)})
+        return documents
+
+
+def mmr_select(query, candidates, k, lambda_mult=0.5):
+    """Indices of the *k* rows of *candidates* picked by maximal marginal relevance."""
+    candidates = np.asarray(candidates, dtype=np.float32)
+    if not len(candidates) or k <= 0:
+        return []
+    norms = np.linalg.norm(candidates, axis=1)
+    norms[norms == 0] = 1.0
+    candidates = candidates / norms[:, None]
+    query = np.asarray(query, dtype=np.float32)
+    relevance = candidates @ (query / (np.linalg.norm(query) or 1.0))
+    redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+    picked = []
+    for _ in range(min(k, len(candidates))):
+        if picked:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    return picked
+
+
+def _decode_vectors(blobs, dims):
+    """(N, dims) float32 matrix from pgvector's binary send format."""
+    matrix = np.frombuffer(b"".join(blobs), dtype=">f4").reshape(len(blobs), dims + 1)
+    return matrix[:, 1:].astype(np.float32)
+
+
+class MMRRetriever(HybridRetriever):
+    """Dense retriever that diversifies the *k* results with maximal marginal relevance."""
+
+    fetch_k: int = 50
+    lambda_mult: float = 0.5
+    sparse: bool = False
+
+    def _candidates(self, embedding):
+        """(documents, embedding matrix) of the *fetch_k* nearest chunks."""
+        dims = len(embedding)
+        collection, distance = self._vector_leg(dims, "%(embedding)s")
+        sql = f"""
+            WITH coll AS (
+                SELECT uuid FROM langchain_pg_collection WHERE name = %(collection)s
+            )
+            SELECT e.id, e.document, e.cmetadata, vector_send(e.embedding)
+            FROM langchain_pg_embedding e
+            WHERE e.collection_id = {collection}
+              AND vector_dims(e.embedding) = {dims}
+            ORDER BY {distance}
+            LIMIT %(fetch_k)s
+        """
+        params = {
+            "collection": self.vectorstore.collection_name,
+            "embedding": vector_literal(embedding),
+            "fetch_k": max(self.fetch_k, self.k),
+        }
+        with self.vectorstore._engine.begin() as conn:
+            if self.ef_search:
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(self.ef_search)}"))
+            with conn.connection.driver_connection.cursor(binary=True) as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        documents = [Document(id=row[0], page_content=row[1], metadata=row[2] or {})
+                     for row in rows]
+        return documents, _decode_vectors([row[3] for row in rows], dims)
+
+    def _search(self, query, embedding):
+        documents, vectors = self._candidates(embedding)
+        if not self.parent_documents:
+            picked = mmr_select(embedding, vectors, self.k, self.lambda_mult)
+            return [documents[i] for i in picked]
+        # several picks may share a section: rank further, keep k distinct parents
+        picked = mmr_select(embedding, vectors, 4 * self.k, self.lambda_mult)
+        return parent_documents(self.vectorstore, [documents[i] for i in picked], self.k)
+
+
+def create_retriever(vectorstore, k=4, fetch_k=None):
+    """Retriever for the 03 chains, chosen by RETRIEVAL_MODE."""
+    mode = os.getenv("RETRIEVAL_MODE", "hybrid")
+    parents = chunk_layout() == "parent"
+    if mode == "mmr":
+        return MMRRetriever(
+            vectorstore=vectorstore,
+            k=k,
+            fetch_k=fetch_k or int(os.getenv("RETRIEVAL_MMR_FETCH_K", "50")),
+            lambda_mult=float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.5")),
+            parent_documents=parents,
+        )
+    if fetch_k is None:
+        fetch_k = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+    if mode == "similarity":
+        if parents:
+            return HybridRetriever(vectorstore=vectorstore, k=k, fetch_k=fetch_k, sparse=False,
+                                   parent_documents=True)
+        if collection_indexes_enabled():
+            return HybridRetriever(vectorstore=vectorstore, k=k, fetch_k=k, sparse=False)
+        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": k})
+    return HybridRetriever(
+        vectorstore=vectorstore,
+        k=k,
+        fetch_k=fetch_k,
+        text_search_config=os.getenv("RETRIEVAL_TEXT_SEARCH_CONFIG", "english"),
+        parent_documents=parents,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cross-encoder reranking
+# ---------------------------------------------------------------------------
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+_CROSS_ENCODERS = {}
+_CROSS_ENCODER_LOCK = threading.Lock()
+
+
+def get_cross_encoder(model_name=DEFAULT_RERANK_MODEL, max_length=512):
+    """Load a sentence-transformers CrossEncoder on CPU, once per process."""
+    key = (model_name, max_length)
+    with _CROSS_ENCODER_LOCK:
+        model = _CROSS_ENCODERS.get(key)
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            start = time.perf_counter()
+            model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+            logger.info(f"Loaded cross-encoder {model_name} in {time.perf_counter() - start:.1f}s")
+            _CROSS_ENCODERS[key] = model
+    return model
+
+
+class CrossEncoderRerankRetriever(BaseRetriever):
+    """Over-fetch from *base_retriever* and keep the *top_n* best cross-encoder scores."""
+
+    base_retriever: BaseRetriever
+    model_name: str = DEFAULT_RERANK_MODEL
+    top_n: int = 3
+    max_candidates: int = 30
+    batch_size: int = 16
+    budget_ms: float = 1000.0
+
+    @property
+    def vectorstore(self):
+        """The base retriever's vector store (used by the speculative retriever)."""
+        return self.base_retriever.vectorstore
+
+    def _rerank(self, query, documents):
+        candidates = documents[:self.max_candidates]
+        if len(candidates) <= 1:
+            return candidates[:self.top_n]
+        model = get_cross_encoder(self.model_name)
+        scores = []
+        start = time.perf_counter()
+        for i in range(0, len(candidates), self.batch_size):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self.budget_ms and i and elapsed_ms + elapsed_ms / i * self.batch_size > self.budget_ms:
+                break
+            batch = candidates[i:i + self.batch_size]
+            scores.extend(model.predict(
+                [(query, doc.page_content) for doc in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+            ).tolist())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Reranked {len(scores)}/{len(candidates)} candidates in {elapsed_ms:.0f} ms")
+        order = sorted(range(len(scores)), key=lambda j: -scores[j])
+        ranked = [candidates[j] for j in order] + candidates[len(scores):]
+        return ranked[:self.top_n]
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        documents = self.base_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child()})
+        start = time.time_ns()
+        reranked = self._rerank(query, documents)
+        emit_stage(run_manager, "rerank", start, time.time_ns(), {"rag.candidates": len(documents)})
+        return reranked
+
+
+def create_reranking_retriever(vectorstore, top_n=None, candidates=None):
+    """create_retriever() over-fetching *candidates* chunks, reranked to *top_n*."""
+    if top_n is None:
+        top_n = int(os.getenv("RERANK_TOP_N", "3"))
+    if os.getenv("RERANK", "1") == "0":
+        return create_retriever(vectorstore, k=top_n)
+    if candidates is None:
+        candidates = int(os.getenv("RERANK_CANDIDATES", "30"))
+    return CrossEncoderRerankRetriever(
+        base_retriever=create_retriever(vectorstore, k=candidates),
+        model_name=os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL),
+        top_n=top_n,
+        max_candidates=candidates,
+        batch_size=int(os.getenv("RERANK_BATCH_SIZE", "16")),
+        budget_ms=float(os.getenv("RERANK_BUDGET_MS", "1000")),
+    )
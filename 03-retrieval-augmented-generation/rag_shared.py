@@ -5,44 +5,28 @@ Imported by each app via:
     import sys, os
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from rag_shared import get_pdf_text, get_text_chunks, build_pg_connection_string
-"""
-import os
-
-from pypdf import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-
-def get_pdf_text(pdf_docs):
-    """Extract and concatenate text from a list of uploaded PDF file objects."""
-    text = ""
-    for pdf in pdf_docs:
-        pdf_reader = PdfReader(pdf)
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    return text
-
 
-def get_text_chunks(text):
-    """Split *text* into overlapping chunks suitable for embedding."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        separators=["\n\n", "\n", ".", " "],
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-    )
-    return text_splitter.split_text(text)
-
-
-def build_pg_connection_string():
-    """
-    Build a psycopg3 (asyncpg-compatible) connection URL from env vars.
-
-    Reads standard libpq names (PGUSER, PGPASSWORD, PGHOST, PGPORT,
-    PGDATABASE) with PGVECTOR_* as fallbacks for older workshop copies.
-    """
-    db_user = os.getenv("PGUSER") or os.getenv("PGVECTOR_USER")
-    db_password = os.getenv("PGPASSWORD") or os.getenv("PGVECTOR_PASSWORD")
-    db_host = os.getenv("PGHOST") or os.getenv("PGVECTOR_HOST")
-    db_port = os.getenv("PGPORT") or os.getenv("PGVECTOR_PORT") or "5432"
-    db_name = os.getenv("PGDATABASE") or os.getenv("PGVECTOR_DATABASE")
-    return f"postgresql+psycopg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+The implementations live in the rag_* modules next to this file:
+rag_db (engine and connection string), rag_text (PDF extraction and
+chunking), rag_ingest (ingestion pipeline, bulk COPY and background jobs),
+rag_indexes (full-text and HNSW indexes), rag_retrieval (retrievers),
+rag_caching (embedding and answer caches), rag_local_embeddings,
+rag_packing (prompt packing) and rag_tracing (per-stage latency spans).
+"""
+from rag_caching import CachedEmbeddings, SemanticAnswerCache, bump_collection_version, cached_embeddings
+from rag_db import build_pg_connection_string, get_pg_engine
+from rag_indexes import (COLLECTION_INDEX_PREFIX, VECTOR_STORAGE_TYPES, collection_index_name,
+                         collection_route, drop_collection_indexes, ensure_collection_index,
+                         ensure_hybrid_indexes, migrate_vector_storage, start_collection_index_sync,
+                         sync_collection_indexes, vector_storage)
+from rag_ingest import (IngestionPipeline, chunk_key, copy_embeddings, ingestion_jobs,
+                        show_ingestion_jobs, track_ingestion_job)
+from rag_local_embeddings import (DEFAULT_LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_TOLERANCE,
+                                  LocalEmbeddingEngine, LocalEmbeddings, get_local_embedding_engine)
+from rag_packing import PackStats, PromptPacker, estimate_tokens, merge_adjacent_chunks
+from rag_retrieval import (HybridRetriever, MMRRetriever, create_reranking_retriever,
+                           create_retriever, create_speculative_history_aware_retriever,
+                           get_cross_encoder, mmr_select)
+from rag_text import (TEXT_CHUNK_SEPARATORS, PdfPage, get_parent_child_chunks, get_pdf_text,
+                      get_text_chunks, iter_pdf_pages, iter_pdf_pages_parallel, split_text_spans)
+from rag_tracing import StageTracer, emit_stage, percentile, stage_tracer
@@ -0,0 +1,219 @@
+"""PDF text extraction and the offset-based chunker."""
+import io
+import os
+from collections import deque, namedtuple
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+
+# One extracted page: *source* is the uploaded file name (or path),
+# *page_number* is 1-based.
+PdfPage = namedtuple("PdfPage", ["source", "page_number", "text"])
+
+# Pages handed to a worker per task; large enough to amortise the cost of
+# re-parsing the PDF's cross-reference table in every task.
+PDF_PAGES_PER_TASK = 16
+
+
+def pdf_source(pdf):
+    """Return a display name for an uploaded file object or a filesystem path."""
+    if isinstance(pdf, (str, os.PathLike)):
+        return os.fspath(pdf)
+    return getattr(pdf, "name", "document.pdf")
+
+
+def pdf_bytes(pdf):
+    """Read the raw bytes of an uploaded file object or a filesystem path."""
+    if isinstance(pdf, (str, os.PathLike)):
+        with open(pdf, "rb") as f:
+            return f.read()
+    if hasattr(pdf, "getvalue"):
+        return pdf.getvalue()
+    pdf.seek(0)
+    return pdf.read()
+
+
+def _extract_page_range(source, data, start, stop):
+    """Process-pool task: extract pages [start, stop) from one PDF's bytes."""
+    reader = PdfReader(io.BytesIO(data))
+    return [
+        PdfPage(source, i + 1, reader.pages[i].extract_text() or "")
+        for i in range(start, stop)
+    ]
+
+
+def pdf_extract_workers(workers):
+    if workers is None:
+        workers = int(os.getenv("PDF_EXTRACT_WORKERS", "0") or 0)
+    return max(workers, 0)
+
+
+def iter_pdf_pages(pdf_docs):
+    """Yield a PdfPage for every page of every PDF, in document order."""
+    for pdf in pdf_docs:
+        source = pdf_source(pdf)
+        pdf_reader = PdfReader(pdf)
+        for i, page in enumerate(pdf_reader.pages):
+            yield PdfPage(source, i + 1, page.extract_text() or "")
+
+
+def iter_pdf_pages_parallel(pdf_docs, workers=None):
+    """Like iter_pdf_pages, but extract the pages in a process pool."""
+    workers = pdf_extract_workers(workers) or os.cpu_count() or 1
+    sources, payloads, starts, stops = [], [], [], []
+    for pdf in pdf_docs:
+        source = pdf_source(pdf)
+        data = pdf_bytes(pdf)
+        page_count = len(PdfReader(io.BytesIO(data)).pages)
+        for start in range(0, page_count, PDF_PAGES_PER_TASK):
+            sources.append(source)
+            payloads.append(data)
+            starts.append(start)
+            stops.append(min(start + PDF_PAGES_PER_TASK, page_count))
+    if not sources:
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+        for pages in executor.map(_extract_page_range, sources, payloads, starts, stops):
+            yield from pages
+
+
+def get_pdf_text(pdf_docs, workers=None):
+    """Extract and concatenate text from a list of uploaded PDF file objects."""
+    if pdf_extract_workers(workers):
+        pages = iter_pdf_pages_parallel(pdf_docs, workers)
+    else:
+        pages = iter_pdf_pages(pdf_docs)
+    return "".join(page.text for page in pages)
+
+
+# ---------------------------------------------------------------------------
+# Offset-based recursive chunker
+# ---------------------------------------------------------------------------
+
+TEXT_CHUNK_SEPARATORS = ["\n\n", "\n", ".", " "]
+
+
+class TextChunks(Sequence):
+    """Chunks of *text* held as (start, end) offsets into the source string."""
+
+    def __init__(self, text, spans):
+        self.text = text
+        self.spans = spans
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.text[start:end] for start, end in self.spans[index]]
+        start, end = self.spans[index]
+        return self.text[start:end]
+
+    def __repr__(self):
+        return f"TextChunks({len(self.spans)} chunks over {len(self.text)} chars)"
+
+
+def _separator_pieces(text, start, end, separator):
+    """Non-empty (start, end) pieces of text[start:end], split before each *separator*."""
+    if not separator:
+        yield from ((i, i + 1) for i in range(start, end))
+        return
+    prev = start
+    pos = text.find(separator, start, end)
+    while pos != -1:
+        if pos > prev:
+            yield prev, pos
+        prev = pos
+        pos = text.find(separator, pos + len(separator), end)
+    if end > prev:
+        yield prev, end
+
+
+def _append_stripped(text, start, end, out):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end > start:
+        out.append((start, end))
+
+
+def _merge_pieces(text, pieces, chunk_size, chunk_overlap, out):
+    """Greedily merge adjacent pieces into chunks, carrying *chunk_overlap* over."""
+    current = deque()
+    total = 0
+    for start, end in pieces:
+        length = end - start
+        if current and total + length > chunk_size:
+            _append_stripped(text, current[0][0], current[-1][1], out)
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                first_start, first_end = current.popleft()
+                total -= first_end - first_start
+        current.append((start, end))
+        total += length
+    if current:
+        _append_stripped(text, current[0][0], current[-1][1], out)
+
+
+def _split_spans(text, start, end, separators, chunk_size, chunk_overlap, out):
+    # Use the first separator that occurs in this range; pieces that are
+    # still too long are split again with the separators after it.
+    separator, remaining = separators[-1], []
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if text.find(candidate, start, end) != -1:
+            separator, remaining = candidate, separators[i + 1:]
+            break
+
+    small = []
+    for piece_start, piece_end in _separator_pieces(text, start, end, separator):
+        if piece_end - piece_start < chunk_size:
+            small.append((piece_start, piece_end))
+            continue
+        if small:
+            _merge_pieces(text, small, chunk_size, chunk_overlap, out)
+            small = []
+        if remaining:
+            _split_spans(text, piece_start, piece_end, remaining, chunk_size, chunk_overlap, out)
+        else:
+            out.append((piece_start, piece_end))
+    if small:
+        _merge_pieces(text, small, chunk_size, chunk_overlap, out)
+
+
+def split_text_spans(text, chunk_size=1000, chunk_overlap=200, separators=None):
+    """(start, end) offsets of the chunks RecursiveCharacterTextSplitter would produce."""
+    spans = []
+    _split_spans(text, 0, len(text), separators or TEXT_CHUNK_SEPARATORS,
+                 chunk_size, chunk_overlap, spans)
+    return spans
+
+
+def get_text_chunks(text, chunk_size=1000, chunk_overlap=200, separators=None):
+    """Split *text* into overlapping chunks suitable for embedding."""
+    return TextChunks(text, split_text_spans(text, chunk_size, chunk_overlap, separators))
+
+
+def get_parent_child_chunks(text, child_size=400, child_overlap=0, chunk_size=1000,
+                            chunk_overlap=200, separators=None):
+    """Split *text* into parent chunks and smaller children: (parents, children, parent_of)."""
+    parents = get_text_chunks(text, chunk_size, chunk_overlap, separators)
+    children = get_text_chunks(text, child_size, child_overlap, separators)
+    parent_of, first = [], 0
+    for start, end in children.spans:
+        while first < len(parents.spans) - 1 and parents.spans[first][1] <= start:
+            first += 1
+        best, best_overlap = first, -1
+        for i in range(first, len(parents.spans)):
+            p_start, p_end = parents.spans[i]
+            if p_start >= end:
+                break
+            overlap = min(end, p_end) - max(start, p_start)
+            if overlap > best_overlap:
+                best, best_overlap = i, overlap
+        parent_of.append(best)
+    return parents, children, parent_of
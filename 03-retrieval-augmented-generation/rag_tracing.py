@@ -0,0 +1,195 @@
+"""Per-stage latency tracing, exported as OTLP/JSON."""
+import json
+import os
+import threading
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler, dispatch_custom_event
+
+
+DEFAULT_TRACE_PATH = ".cache/traces.jsonl"
+STAGE_EVENT = "rag_stage"
+# run names whose LLM descendants belong to a stage: langchain's
+# create_history_aware_retriever, create_speculative_history_aware_retriever
+# and create_stuff_documents_chain
+LLM_STAGE_RUN_NAMES = {
+    "chat_retriever_chain": "condense",
+    "speculative_history_aware_retriever": "condense",
+    "stuff_documents_chain": "generation",
+}
+
+
+def emit_stage(run_manager, stage, start_ns, end_ns, attributes=None):
+    """Report a timed stage inside a runnable to StageTracer as a custom event."""
+    dispatch_custom_event(STAGE_EVENT, {
+        "stage": stage,
+        "start_ns": start_ns,
+        "end_ns": end_ns,
+        "attributes": attributes or {},
+    }, config={"callbacks": run_manager.get_child()})
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of *values* (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class StageTracer(BaseCallbackHandler):
+    """LangChain callback handler that records one request as spans labelled by RAG stage."""
+
+    def __init__(self, path=None, service_name="rag-03"):
+        self.path = path
+        self.service_name = service_name
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    # -- span bookkeeping -------------------------------------------------
+
+    def _start(self, run_id, parent_run_id, name, stage=None):
+        with self._lock:
+            self._runs[run_id] = {
+                "name": name or "run",
+                "parent": parent_run_id,
+                "stage": stage,
+                "start_ns": time.time_ns(),
+            }
+
+    def _end(self, run_id, error=None):
+        end = time.time_ns()
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or "end_ns" in run:
+                return
+            run["end_ns"] = end
+            self._add_span(run["name"], run["start_ns"], end, span_id=run_id.hex[:16],
+                           parent=run["parent"], stage=run["stage"], error=error)
+
+    def _add_span(self, name, start_ns, end_ns, span_id=None, parent=None, stage=None,
+                  attributes=None, error=None):
+        attrs = dict(attributes or {})
+        if stage:
+            attrs["rag.stage"] = stage
+        span = {
+            "traceId": self.trace_id,
+            "spanId": span_id or uuid.uuid4().hex[:16],
+            "name": name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items()],
+            "status": {"code": 2, "message": str(error)} if error else {"code": 1},
+        }
+        if parent is not None:
+            span["parentSpanId"] = parent.hex[:16]
+        self.spans.append(span)
+
+    def _llm_stage(self, parent_run_id):
+        while parent_run_id is not None:
+            run = self._runs.get(parent_run_id)
+            if run is None:
+                break
+            if run["name"] in LLM_STAGE_RUN_NAMES:
+                return LLM_STAGE_RUN_NAMES[run["name"]]
+            parent_run_id = run["parent"]
+        return None
+
+    def record(self, stage, start_ns, end_ns, attributes=None):
+        """Add a span for a stage that ran outside the LangChain runnables."""
+        with self._lock:
+            self._add_span(stage, start_ns, end_ns, stage=stage, attributes=attributes)
+
+    # -- LangChain callbacks ----------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name") or (serialized or {}).get("name"))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "retriever"
+        self._start(run_id, parent_run_id, name, stage="retrieval")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._on_model_start(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._on_model_start(serialized, run_id, parent_run_id, kwargs)
+
+    def _on_model_start(self, serialized, run_id, parent_run_id, kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "llm"
+        with self._lock:
+            stage = self._llm_stage(parent_run_id)
+        self._start(run_id, parent_run_id, name, stage=stage)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        if name != STAGE_EVENT:
+            return
+        with self._lock:
+            self._add_span(data["stage"], data["start_ns"], data["end_ns"], parent=run_id,
+                           stage=data["stage"], attributes=data.get("attributes"))
+
+    # -- results ----------------------------------------------------------
+
+    def stage_durations(self):
+        """``{stage: [milliseconds, ...]}`` for the spans recorded so far."""
+        durations = {}
+        with self._lock:
+            for span in self.spans:
+                for attr in span["attributes"]:
+                    if attr["key"] == "rag.stage":
+                        ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                        durations.setdefault(attr["value"]["stringValue"], []).append(ms)
+        return durations
+
+    def export(self):
+        """Append this trace to *path* as one OTLP/JSON line (no-op without a path)."""
+        if not self.path or not self.spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "rag_shared"}, "spans": self.spans}],
+        }]}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request) + "\n")
+
+
+def stage_tracer():
+    """StageTracer exporting to TRACE_PATH (empty disables the file export)."""
+    return StageTracer(path=os.getenv("TRACE_PATH", DEFAULT_TRACE_PATH) or None)
@@ -1,9 +1,11 @@
 # Import libraries
+import asyncio
 import sys
 import os
+import time
 # rag_shared lives one directory up from this app
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from rag_shared import get_pdf_text, get_text_chunks, build_pg_connection_string
+from rag_shared import build_pg_connection_string, cached_embeddings, create_retriever, get_pg_engine, ingestion_jobs, show_ingestion_jobs, start_collection_index_sync, track_ingestion_job
 from langchain_aws import BedrockEmbeddings
 from langchain_aws import ChatBedrock
 from langchain_core.messages import (
@@ -24,27 +26,169 @@ from PIL import Image
 import boto3
 
 # Create a custom handler and pass a streamlit container to it. This is required for response streaming.
+# Tokens are coalesced into frames: the container is re-rendered at most every
+# min_interval seconds or once min_chars new characters have arrived, and once
+# more when the answer is complete. Re-rendering the whole markdown on every
+# token costs O(n^2) work for long answers and floods the Streamlit websocket.
 class StreamHandler(BaseCallbackHandler):
-    def __init__(self, container, initial_text=""):
+    # Run callbacks on the event loop thread (the session's script thread)
+    # instead of an executor thread, which has no Streamlit script context.
+    run_inline = True
+
+    def __init__(self, container, initial_text="", min_interval=0.05, min_chars=200):
         self.container = container
         self.text = initial_text
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.pending = []
+        self.pending_chars = 0
+        self.frames = 0
+        self.chunks = 0
+        self.output_tokens = None
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.last_render = 0.0
 
     def on_llm_new_token(self, token: str, **kwargs) -> None:
-        self.text += token
+        # the stream ends with an empty chunk that carries only the usage metadata
+        if not token:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.chunks += 1
+        self.pending.append(token)
+        self.pending_chars += len(token)
+        if now - self.last_render >= self.min_interval or self.pending_chars >= self.min_chars:
+            self.flush(now)
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self.finished_at = time.perf_counter()
+        self.output_tokens = output_token_count(response)
+        self.flush(self.finished_at)
+
+    def on_llm_error(self, error, **kwargs) -> None:
+        self.flush(time.perf_counter())
+
+    def flush(self, now):
+        if not self.pending:
+            return
+        self.text += "".join(self.pending)
+        self.pending = []
+        self.pending_chars = 0
         self.container.markdown(self.text)
+        self.frames += 1
+        self.last_render = now
 
-# This function takes the text chunks as input and creates a vector store using Bedrock Embeddings (Titan) and pgvector.
-# The vector store stores the vector representations of the text chunks, enabling efficient retrieval based on semantic similarity.
-def get_vectorstore(text_chunks):
-    if text_chunks is None:
-        return PGVector(
-            connection=connection,
-            embeddings=embeddings,
-            use_jsonb=True
-        )
-    return PGVector.from_texts(texts=text_chunks, embedding=embeddings, connection=connection)
+    @property
+    def time_to_first_token(self):
+        """Seconds from handler creation (the user's prompt) to the first token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self):
+        """Output tokens per second from the first token to the end of the stream.
+
+        None when the model reported no usage metadata; see chunks_per_second.
+        """
+        return self._rate(self.output_tokens)
+
+    @property
+    def chunks_per_second(self):
+        """Streamed (non-empty) chunks per second; a chunk may hold several tokens."""
+        return self._rate(self.chunks)
+
+    def _rate(self, count):
+        if not count or self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return count / elapsed if elapsed > 0 else None
+
+
+def output_token_count(response):
+    """Output tokens reported by the model for an LLMResult, or None."""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage and usage.get("output_tokens"):
+                return usage["output_tokens"]
+    usage = (response.llm_output or {}).get("usage") or {}
+    return usage.get("output_tokens") or usage.get("completion_tokens")
+
+# The vector store and the RAG chain are built once per process (per connection
+# string) and shared by every session. Nothing in the chain is per request: the
+# session's StreamHandler is passed in the runnable config of each call.
+# The vector store holds the Titan embeddings of the uploaded chunks in pgvector,
+# enabling efficient retrieval based on semantic similarity. It runs on the
+# process-wide pooled engine, shared with the background ingestion jobs.
+# Arguments starting with "_" are not hashed by st.cache_resource.
+@st.cache_resource(show_spinner=False)
+def get_shared_vectorstore(connection, _embeddings):
+    engine = get_pg_engine(connection)
+    # builds and drops per-collection indexes as collections come and go
+    start_collection_index_sync(engine)
+    return PGVector(
+        connection=engine,
+        embeddings=_embeddings,
+        use_jsonb=True
+    )
 
-def main():
+
+@st.cache_resource(show_spinner=False)
+def get_streaming_chain(connection, _embeddings, _bedrock_client):
+    llm = ChatBedrock(
+        model_id=os.environ.get("BEDROCK_MODEL_ID", "us.anthropic.claude-haiku-4-5-20251001-v1:0"),
+        streaming=True,
+        client=_bedrock_client,
+        model_kwargs={"temperature": 0.5, "max_tokens": 8191},
+    )
+
+    general_system_template = """
+    Human: "You are a helpful and talkative assistant that answers questions directly in only English and only using the information provided in the context below.
+    Guidance for answers:
+        - In your answers, always use a professional tone.
+        - Begin your answers with "Based on the context provided: "
+        - Simply answer the question clearly and with lots of detail using only the relevant details from the information below. If the context does not contain the answer, say "I don't know."
+        - Use bullet-points and provide as much detail as possible in your answer.
+        - Always provide a summary at the end of your answer.
+    ----
+    {context}
+    ----
+
+    Assistant: """
+
+    general_user_template = "Question:```{input}```"
+
+    qa_prompt = ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(general_system_template),
+        HumanMessagePromptTemplate.from_template(general_user_template),
+    ])
+
+    # LCEL: create_stuff_documents_chain + create_retrieval_chain replace
+    # ConversationalRetrievalChain while preserving streaming callbacks.
+    docs_chain = create_stuff_documents_chain(llm, qa_prompt)
+    return create_retrieval_chain(
+        create_retriever(get_shared_vectorstore(connection, _embeddings), k=1),
+        docs_chain,
+    )
+
+
+# Retrieval and the LLM stream run through the chain's async path. The
+# session's handler is attached through the config, so concurrent sessions
+# stream into their own containers from the same chain.
+async def astream_answer(chain, prompt, stream_handler):
+    response = await chain.ainvoke(
+        {"input": prompt},
+        config={"callbacks": [stream_handler]},
+    )
+    return response.get("answer", "")
+
+
+def main(connection, embeddings, bedrock_client):
     # Set the page configuration for the Streamlit application, including the page title and icon.
     st.set_page_config(page_title="Streamlit Question Answering App",
                        layout="wide",
@@ -61,10 +205,7 @@ def main():
     3. Type your question in the search bar to get more insights
     """
 )
-    # Check if the vectorDB and messages are not present in the session state and initialize them to None.
-    if "vectorDB" not in st.session_state:
-        st.session_state.vectorDB = get_vectorstore(None)
-
+    # Check if the messages are not present in the session state and initialize them.
     if "messages" not in st.session_state:
         st.session_state["messages"] = []
 
@@ -89,46 +230,24 @@ def main():
         st.session_state.messages.append(ChatMessage(role="user", content=prompt))
         with st.chat_message("Assistant"):
             stream_handler = StreamHandler(st.empty())
+            chain = get_streaming_chain(connection, embeddings, bedrock_client)
+            answer = asyncio.run(astream_answer(chain, prompt, stream_handler))
 
-            llm = ChatBedrock(
-                model_id=os.environ.get("BEDROCK_MODEL_ID", "us.anthropic.claude-haiku-4-5-20251001-v1:0"),
-                streaming=True,
-                callbacks=[stream_handler],
-                client=BEDROCK_CLIENT,
-                model_kwargs={"temperature": 0.5, "max_tokens": 8191},
-            )
-
-            general_system_template = """
-            Human: "You are a helpful and talkative assistant that answers questions directly in only English and only using the information provided in the context below.
-            Guidance for answers:
-                - In your answers, always use a professional tone.
-                - Begin your answers with "Based on the context provided: "
-                - Simply answer the question clearly and with lots of detail using only the relevant details from the information below. If the context does not contain the answer, say "I don't know."
-                - Use bullet-points and provide as much detail as possible in your answer.
-                - Always provide a summary at the end of your answer.
-            ----
-            {context}
-            ----
-
-            Assistant: """
-
-            general_user_template = "Question:```{input}```"
-
-            qa_prompt = ChatPromptTemplate.from_messages([
-                SystemMessagePromptTemplate.from_template(general_system_template),
-                HumanMessagePromptTemplate.from_template(general_user_template),
-            ])
-
-            # LCEL: create_stuff_documents_chain + create_retrieval_chain replace
-            # ConversationalRetrievalChain while preserving streaming callbacks.
-            docs_chain = create_stuff_documents_chain(llm, qa_prompt)
-            rag_chain = create_retrieval_chain(
-                st.session_state.vectorDB.as_retriever(search_kwargs={"k": 1}),
-                docs_chain,
-            )
-
-            response = rag_chain.invoke({"input": prompt})
-            answer = response.get("answer", "")
+            # Streaming latency: time to first token (including retrieval),
+            # generation rate and the number of frames rendered. The rate is in
+            # output tokens when the model reports usage, else in stream chunks.
+            if stream_handler.time_to_first_token is not None:
+                if stream_handler.output_tokens:
+                    rate, count, unit = (stream_handler.tokens_per_second,
+                                         stream_handler.output_tokens, "tokens")
+                else:
+                    rate, count, unit = (stream_handler.chunks_per_second,
+                                         stream_handler.chunks, "chunks")
+                st.caption(
+                    f"First token after {stream_handler.time_to_first_token:.2f} s · "
+                    + (f"{rate:.1f} {unit}/s · " if rate else "")
+                    + f"{count} {unit} in {stream_handler.frames} frames"
+                )
 
             st.session_state.messages = st.session_state.messages + [
                 HumanMessage(content=prompt),
@@ -140,22 +259,16 @@ def main():
         pdf_docs = st.file_uploader(
             "Upload your PDFs here and click on 'Process'", type="pdf", accept_multiple_files=True)
 
-        # If the user clicks the "Process" button, the following code is executed:
-        # i. raw_text = get_pdf_text(pdf_docs): retrieves the text content from the uploaded PDF documents.
-        # ii. text_chunks = get_text_chunks(raw_text): splits the text content into smaller chunks for efficient processing.
-        # iii. vectorstore = get_vectorstore(text_chunks): creates a vector store that stores the vector representations of the text chunks.
-        if st.button("Process"):
-            with st.spinner("Processing"):
-                # get pdf text
-                raw_text = get_pdf_text(pdf_docs)
-
-                # get the text chunks
-                text_chunks = get_text_chunks(raw_text)
-
-                # create vector store
-                st.session_state.vectorDB = get_vectorstore(text_chunks)
+        # If the user clicks the "Process" button, the uploaded PDFs are queued as a background
+        # IngestionPipeline job: pages are extracted, split into chunks, embedded with Titan and
+        # inserted into pgvector as overlapping stages on a process-wide worker pool, so the chat
+        # keeps streaming answers while the upload is processed.
+        if st.button("Process") and pdf_docs:
+            job_id = ingestion_jobs().submit(get_shared_vectorstore(connection, embeddings), pdf_docs)
+            track_ingestion_job(job_id)
 
-                st.success('PDF uploaded successfully!', icon="✅")
+        # Progress of this session's uploads, polled while a job is queued or running.
+        show_ingestion_jobs(get_pg_engine(connection))
 
         with st.sidebar:
             st.divider()
@@ -177,12 +290,12 @@ if __name__ == '__main__':
 
     # Define the Bedrock client (region from env; defaults to us-west-2)
     aws_region = os.environ.get('AWS_REGION', 'us-west-2')
-    BEDROCK_CLIENT = boto3.client("bedrock-runtime", aws_region)
+    bedrock_client = boto3.client("bedrock-runtime", aws_region)
 
     # Define the Embedding model using the Bedrock client
-    embeddings = BedrockEmbeddings(model_id="amazon.titan-embed-text-v2:0", client=BEDROCK_CLIENT)
+    embeddings = cached_embeddings(BedrockEmbeddings(model_id="amazon.titan-embed-text-v2:0", client=bedrock_client))
 
     # Create the connection string for pgvector (psycopg3)
     connection = build_pg_connection_string()
 
-    main()
+    main(connection, embeddings, bedrock_client)
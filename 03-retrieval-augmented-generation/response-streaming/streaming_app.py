@@ -7,7 +7,7 @@ from langchain_aws import BedrockEmbeddings
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import app as app_module
-from rag_shared import build_pg_connection_string
+from rag_shared import build_pg_connection_string, cached_embeddings
 
 
 def configure_runtime():
@@ -15,10 +15,10 @@ def configure_runtime():
 
     aws_region = os.getenv("AWS_REGION", "us-west-2")
     app_module.BEDROCK_CLIENT = boto3.client("bedrock-runtime", aws_region)
-    app_module.embeddings = BedrockEmbeddings(
+    app_module.embeddings = cached_embeddings(BedrockEmbeddings(
         model_id="amazon.titan-embed-text-v2:0",
         client=app_module.BEDROCK_CLIENT,
-    )
+    ))
     app_module.connection = build_pg_connection_string()
 
 
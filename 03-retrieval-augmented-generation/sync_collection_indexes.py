@@ -0,0 +1,48 @@
+"""
+Build missing per-collection HNSW indexes and drop those of deleted collections.
+
+    python sync_collection_indexes.py               # once, e.g. from cron
+    python sync_collection_indexes.py --every 600   # keep running
+
+Runs rag_shared.sync_collection_indexes against the database in .env, for
+collections written by any process, including the incident-detection
+s3upload Lambda, which creates one collection per S3 object. Only one
+sync runs at a time across processes; others skip their turn.
+"""
+import argparse
+import logging
+import time
+
+from dotenv import load_dotenv
+from rag_shared import build_pg_connection_string, get_pg_engine, sync_collection_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dimensions", type=int, default=None,
+                        help="only collections of this embedding size (default: all)")
+    parser.add_argument("--min-rows", type=int, default=None,
+                        help="COLLECTION_INDEX_MIN_ROWS override")
+    parser.add_argument("--storage", choices=["float32", "halfvec"], default=None,
+                        help="VECTOR_STORAGE override")
+    parser.add_argument("--every", type=float, default=0,
+                        help="repeat every N seconds instead of running once")
+    parser.add_argument("--connection", default=None,
+                        help="SQLAlchemy URL; defaults to build_pg_connection_string()")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    engine = get_pg_engine(args.connection or build_pg_connection_string())
+    while True:
+        built, dropped = sync_collection_indexes(engine, args.dimensions, args.min_rows,
+                                                 args.storage)
+        logging.info(f"{len(built)} per-collection indexes present or built, "
+                     f"{len(dropped)} dropped")
+        if args.every <= 0:
+            return
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@ import streamlit as st
 import psycopg
 import psycopg.rows
 import os
+import time
 from dotenv import load_dotenv
+from psycopg_pool import ConnectionPool
 
 st.set_page_config(page_title="Movie Recommendations", page_icon="🎬", layout="wide")
 
@@ -15,6 +17,67 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def get_pool():
+    """
+    One connection pool per Streamlit process, shared by every session.
+
+    Connections are opened once instead of on every rerun, checked before
+    they are handed out, and prepare each statement server-side on first use
+    (prepare_threshold=0), so later searches skip parsing and planning.
+    """
+    return ConnectionPool(
+        kwargs=dict(
+            dbname=dbname, host=dbhost, port=dbport, user=dbuser, password=dbpass,
+            row_factory=psycopg.rows.dict_row, autocommit=True, prepare_threshold=0,
+        ),
+        min_size=int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        max_size=int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        max_idle=float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+        max_lifetime=float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+        timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        check=ConnectionPool.check_connection,
+        name="movie-recommendations",
+        open=True,
+    )
+
+
+def fetch(sql, params, timings, label):
+    """Run *sql* on a pooled connection, recording wait and query time in *timings*."""
+    start = time.perf_counter()
+    with get_pool().connection() as conn:
+        acquired = time.perf_counter()
+        rows = conn.execute(sql, params, prepare=True).fetchall()
+    timings[f"{label} wait"] = (acquired - start) * 1000
+    timings[label] = (time.perf_counter() - acquired) * 1000
+    return rows
+
+
+def show_pool_stats(timings):
+    stats = get_pool().get_stats()
+    requests = max(stats.get('requests_num', 0), 1)
+    connections = max(stats.get('connections_num', 0), 1)
+    with st.sidebar:
+        st.subheader("Connection pool")
+        size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+        col_use, col_wait = st.columns(2)
+        col_use.metric("In use", f"{size - available} / {stats.get('pool_max', 0)}")
+        col_wait.metric("Waiting", stats.get('requests_waiting', 0))
+        col_avg, col_open = st.columns(2)
+        col_avg.metric("Avg wait", f"{stats.get('requests_wait_ms', 0) / requests:.1f} ms")
+        col_open.metric("Connections opened", stats.get('connections_num', 0))
+        st.caption(
+            f"{stats.get('requests_num', 0)} requests, "
+            f"{stats.get('requests_queued', 0)} queued, "
+            f"{stats.get('requests_errors', 0)} timed out; "
+            f"connect {stats.get('connections_ms', 0) / connections:.0f} ms avg, "
+            f"{stats.get('connections_lost', 0)} lost"
+        )
+        if timings:
+            st.caption("This search: " + ", ".join(
+                f"{label} {ms:.1f} ms" for label, ms in timings.items()))
+
+
 def write_columns_data(result):
     recommendations = result[1:6]
     cols = st.columns(len(recommendations))
@@ -40,15 +103,10 @@ def main():
         st.info("Enter a search above to find movies using semantic similarity search.")
         return
 
-    with psycopg.connect(
-        dbname=dbname, host=dbhost, port=dbport, user=dbuser, password=dbpass,
-        row_factory=psycopg.rows.dict_row,
-    ) as dbconn:
-        dbcur = dbconn.cursor()
-
+    timings = {}
+    try:
         # Fetch top 6 matches
-        dbcur.execute("SELECT * FROM movie.get_top6_movies(%s);", (query,))
-        result = dbcur.fetchall()
+        result = fetch("SELECT * FROM movie.get_top6_movies(%s);", (query,), timings, "search")
 
         if not result:
             st.warning("No movies found. Try a different search.")
@@ -74,11 +132,11 @@ def main():
 
             with st.expander("AI Review Summary", expanded=True):
                 with st.spinner("Generating review summary with Claude Sonnet 5..."):
-                    dbcur.execute(
+                    res = fetch(
                         "SELECT movie.get_reviews_summary(%s)",
                         (result[0].get('id'),),
+                        timings, "summary",
                     )
-                    res = dbcur.fetchall()
                     if res:
                         summary = (
                             res[0]
@@ -98,6 +156,8 @@ def main():
             write_columns_data(result)
 
         st.divider()
+    finally:
+        show_pool_stats(timings)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,129 @@
 -- Functions
+
+-- Titan V2 embedding size (256, 512 or 1024), read from the type of the
+-- movie_embedding column so stored and query embeddings always match.
+-- Change it without downtime with scripts/reembed_titan.py --preset movies.
+CREATE OR REPLACE FUNCTION movie.embedding_dimensions() RETURNS integer
+LANGUAGE sql STABLE AS $$
+SELECT COALESCE((
+                SELECT NULLIF(atttypmod, -1)
+                FROM pg_attribute
+                WHERE attrelid = 'movie.movies'::regclass
+                        AND attname = 'movie_embedding'
+                        AND NOT attisdropped
+        ), 1024);
+$$;
+-- Query embedding cache. get_top6_movies looks the normalized search text
+-- up here before calling Bedrock, so repeated searches skip the embedding
+-- request. hits counts cache hits; last_used_at drives pruning.
+-- Entries are keyed by dimension too, so resizing movie_embedding never
+-- reuses vectors of the old size.
+CREATE TABLE IF NOT EXISTS movie.query_embedding_cache (
+        query_key text NOT NULL,
+        dimensions integer NOT NULL,
+        embedding vector NOT NULL,
+        hits bigint NOT NULL DEFAULT 0,
+        created_at timestamptz NOT NULL DEFAULT now(),
+        last_used_at timestamptz NOT NULL DEFAULT now(),
+        PRIMARY KEY (query_key, dimensions)
+);
+CREATE INDEX IF NOT EXISTS query_embedding_cache_last_used_idx
+        ON movie.query_embedding_cache (last_used_at);
+
+-- Cache key: lower case, whitespace collapsed. Only the key is normalized;
+-- Bedrock embeds the search text as typed, so a miss ranks exactly as an
+-- uncached search, and other spellings of the key reuse that vector.
+CREATE OR REPLACE FUNCTION movie.normalize_query(search_query text) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+SELECT lower(btrim(regexp_replace(search_query, '\s+', ' ', 'g')));
+$$;
+
+-- Titan V2 embedding of a search, from the cache or from Bedrock.
+-- On a read-only connection (e.g. an Aurora reader) the cache is read but
+-- not written.
+CREATE OR REPLACE FUNCTION movie.query_embedding(search_query text) RETURNS vector
+LANGUAGE plpgsql AS $$
+DECLARE k text := movie.normalize_query(search_query);
+d integer := movie.embedding_dimensions();
+read_only boolean := current_setting('transaction_read_only')::boolean;
+v vector;
+BEGIN
+IF read_only THEN
+        SELECT c.embedding INTO v
+        FROM movie.query_embedding_cache c
+        WHERE c.query_key = k AND c.dimensions = d;
+ELSE
+        UPDATE movie.query_embedding_cache c
+        SET hits = c.hits + 1, last_used_at = now()
+        WHERE c.query_key = k AND c.dimensions = d
+        RETURNING c.embedding INTO v;
+END IF;
+IF v IS NOT NULL THEN
+        RETURN v;
+END IF;
+EXECUTE $x$
+SELECT aws_bedrock.invoke_model_get_embeddings(
+                model_id := 'amazon.titan-embed-text-v2:0',
+                content_type := 'application/json',
+                json_key := 'embedding',
+                model_input := $1::text
+        ) $x$ INTO v USING jsonb_build_object('inputText', search_query, 'dimensions', d, 'normalize', true)::text;
+IF NOT read_only THEN
+        INSERT INTO movie.query_embedding_cache (query_key, dimensions, embedding)
+        VALUES (k, d, v)
+        ON CONFLICT DO NOTHING;
+END IF;
+RETURN v;
+END $$;
+
+-- Embed common searches ahead of time, e.g. the examples shown in the app.
+-- Queries already cached only have last_used_at refreshed, so running this
+-- on a schedule keeps them from being pruned without inflating hits.
+CREATE OR REPLACE PROCEDURE movie.warm_query_embedding_cache(
+        queries text[] DEFAULT ARRAY['Tom Cruise action movies', 'sci-fi space adventures', 'romantic comedies']
+) LANGUAGE plpgsql AS $$
+DECLARE q text;
+rcnt integer := 0;
+BEGIN FOREACH q IN ARRAY queries LOOP
+UPDATE movie.query_embedding_cache
+SET last_used_at = now()
+WHERE query_key = movie.normalize_query(q)
+        AND dimensions = movie.embedding_dimensions();
+IF NOT FOUND THEN
+        PERFORM movie.query_embedding(q);
+        rcnt := rcnt + 1;
+END IF;
+IF rcnt >= 10 THEN COMMIT;
+rcnt := 0;
+END IF;
+END LOOP;
+COMMIT;
+END $$;
+
+-- Drop entries unused for max_idle (TTL), then the least recently used
+-- beyond max_entries (LRU), plus any left from another embedding size.
+-- Returns the number of entries removed.
+CREATE OR REPLACE FUNCTION movie.prune_query_embedding_cache(
+        max_idle interval DEFAULT '30 days',
+        max_entries integer DEFAULT 10000
+) RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE expired integer;
+evicted integer;
+BEGIN
+DELETE FROM movie.query_embedding_cache
+WHERE last_used_at < now() - max_idle
+        OR dimensions <> movie.embedding_dimensions();
+GET DIAGNOSTICS expired = ROW_COUNT;
+DELETE FROM movie.query_embedding_cache
+WHERE (query_key, dimensions) IN (
+                SELECT query_key, dimensions
+                FROM movie.query_embedding_cache
+                ORDER BY last_used_at DESC
+                OFFSET max_entries
+        );
+GET DIAGNOSTICS evicted = ROW_COUNT;
+RETURN expired + evicted;
+END $$;
 CREATE OR REPLACE FUNCTION movie.get_top6_movies(search_query text) RETURNS TABLE(
                 id bigint,
                 title text,
@@ -6,16 +131,10 @@ CREATE OR REPLACE FUNCTION movie.get_top6_movies(search_query text) RETURNS TABL
                 overview text
         ) LANGUAGE plpgsql AS $$
 DECLARE r record;
-v vector(1024);
+v vector;
 rcnt integer;
 BEGIN
-EXECUTE $x$
-SELECT aws_bedrock.invoke_model_get_embeddings(
-                model_id := 'amazon.titan-embed-text-v2:0',
-                content_type := 'application/json',
-                json_key := 'embedding',
-                model_input := $1::text
-        ) $x$ INTO v USING jsonb_build_object('inputText', search_query, 'dimensions', 1024, 'normalize', true)::text;
+v := movie.query_embedding(search_query);
 RETURN QUERY
 SELECT m.id,
         m.title,
@@ -27,7 +146,7 @@ LIMIT 6;
 END $$;
 CREATE OR REPLACE PROCEDURE movie.generate_movie_embeddings(pmovieid bigint default NULL) LANGUAGE plpgsql AS $$
 DECLARE r record;
-v vector(1024);
+v vector;
 v1 text;
 rcnt integer := 0;
 BEGIN FOR r IN
@@ -65,7 +184,7 @@ SELECT aws_bedrock.invoke_model_get_embeddings(
                 content_type := 'application/json',
                 json_key := 'embedding',
                 model_input := $1::text
-        ) $x$ INTO v USING jsonb_build_object('inputText', v1, 'dimensions', 1024, 'normalize', true)::text;
+        ) $x$ INTO v USING jsonb_build_object('inputText', v1, 'dimensions', movie.embedding_dimensions(), 'normalize', true)::text;
 UPDATE movie.movies
 set movie_embedding = v
 WHERE id = r.id;
@@ -38,6 +38,8 @@ bedrock = boto3.client(
 # Constants and configurations
 LOGO_URL = "static/Blaize.png"
 CLAUDE_MODEL_ID = os.environ.get('BEDROCK_CLAUDE_MODEL_ID', 'global.anthropic.claude-sonnet-5')
+# Titan Text Embeddings V2 output size: 256, 512 or 1024; must match product_catalog.embedding
+EMBEDDING_DIMENSIONS = int(os.environ.get('EMBEDDING_DIMENSIONS', '1024'))
 
 # Database functions
 def get_db_connection():
@@ -370,7 +372,7 @@ def similarity_search(query_embedding, top_k=5):
 
 # Bedrock functions
 def generate_embedding(text):
-    body = json.dumps({"inputText": text, "dimensions": 1024, "normalize": True})
+    body = json.dumps({"inputText": text, "dimensions": EMBEDDING_DIMENSIONS, "normalize": True})
     modelId = 'amazon.titan-embed-text-v2:0'
     accept = 'application/json'
     contentType = 'application/json'
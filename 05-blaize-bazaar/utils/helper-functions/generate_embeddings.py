@@ -9,8 +9,9 @@ from tqdm import tqdm
 import os
 bedrock = boto3.client('bedrock-runtime', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
 
-# Embedding model — amazon.titan-embed-text-v2:0 produces 1024-dim vectors
+# Embedding model — amazon.titan-embed-text-v2:0 produces 256-, 512- or 1024-dim vectors
 EMBED_MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBEDDING_DIMENSIONS = int(os.environ.get('EMBEDDING_DIMENSIONS', '1024'))
 
 # Function to get embedding for a single text
 def get_embedding(text):
@@ -19,7 +20,7 @@ def get_embedding(text):
             modelId=EMBED_MODEL_ID,
             contentType="application/json",
             accept="application/json",
-            body=json.dumps({"inputText": text, "dimensions": 1024})
+            body=json.dumps({"inputText": text, "dimensions": EMBEDDING_DIMENSIONS})
         )
         # Read the StreamingBody object
         response_body = json.loads(response['body'].read())
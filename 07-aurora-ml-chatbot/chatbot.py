@@ -2,13 +2,14 @@ import os
 import re
 import json
 import boto3
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader
 import time
 import logging
 import psycopg
 import argparse
 from dotenv import load_dotenv
+from text_chunker import get_text_chunks
 
 logger = logging.getLogger("chatbot")
 logging.basicConfig(format='%(asctime)s %(name)s %(levelname)s : %(message)s', level=logging.INFO)
@@ -19,6 +20,8 @@ load_dotenv()
 # Model configurations
 BEDROCK_MODEL_ID = os.getenv("BEDROCK_MODEL_ID", "global.anthropic.claude-sonnet-5")
 EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+# Titan V2 output size (256, 512 or 1024), used for the column, the procedure and the query
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1024"))
 
 # Environment configurations
 POSTGRESQL_ENDPOINT=None
@@ -93,14 +96,14 @@ def get_generate_embedding_func_sql():
     AS $emb$
         DECLARE
             doc RECORD;
-            emb vector(1024);
+            emb vector({1});
         BEGIN
 	    	FOR doc in SELECT id, content FROM auroraml_chatbot WHERE embedding IS NULL LOOP
 	        	EXECUTE $$ SELECT aws_bedrock.invoke_model_get_embeddings(
 	            		model_id      := '{0}',
 	               		content_type  := 'application/json',
 	               		json_key      := 'embedding',
-	               		model_input   := json_build_object('inputText', $1, 'dimensions', 1024, 'normalize', true)::text)$$
+	               		model_input   := json_build_object('inputText', $1, 'dimensions', {1}, 'normalize', true)::text)$$
 	               	INTO emb
 	               	USING doc.content;
 	           	UPDATE auroraml_chatbot SET embedding = emb WHERE id = doc.id;
@@ -110,7 +113,7 @@ def get_generate_embedding_func_sql():
     $emb$
     LANGUAGE plpgsql;
     """
-    return sql_string.format(EMBEDDING_MODEL_ID)
+    return sql_string.format(EMBEDDING_MODEL_ID, EMBEDDING_DIMENSIONS)
 
 def get_generate_text_func_sql():
     """ This function generates postgresql function code for generate text function"""
@@ -119,7 +122,7 @@ def get_generate_text_func_sql():
     CREATE OR REPLACE FUNCTION generate_text ( question text, chat_history text DEFAULT '' )
     RETURNS text AS $emb$
     DECLARE
-       question_v vector(1024);
+       question_v vector({2});
        context text;
        prompt text;
        response text;
@@ -129,7 +132,7 @@ def get_generate_text_func_sql():
             model_id      := '{0}',
             content_type  := 'application/json',
             json_key      := 'embedding',
-            model_input   := json_build_object('inputText', question, 'dimensions', 1024, 'normalize', true)::text)
+            model_input   := json_build_object('inputText', question, 'dimensions', {2}, 'normalize', true)::text)
         INTO question_v;
 
         SELECT string_agg(content, E'\n\n---\n\n' ORDER BY dist)
@@ -158,7 +161,7 @@ def get_generate_text_func_sql():
     $emb$ 
     LANGUAGE plpgsql;
     """
-    return sql_string.format(EMBEDDING_MODEL_ID, BEDROCK_MODEL_ID)
+    return sql_string.format(EMBEDDING_MODEL_ID, BEDROCK_MODEL_ID, EMBEDDING_DIMENSIONS)
     
 
 def configure_database():
@@ -173,11 +176,11 @@ def configure_database():
         with conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS aws_ml CASCADE")
             cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            cur.execute("""
+            cur.execute(f"""
                 CREATE TABLE IF NOT EXISTS auroraml_chatbot (
                     id int GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
                     content text NOT NULL,
-                    embedding vector(1024)
+                    embedding vector({EMBEDDING_DIMENSIONS})
                 );
                 """
             )
@@ -348,11 +351,6 @@ def ingest_knowledge_dataset(bucket_name):
     # One connection reused across all chunk inserts for this ingestion run.
     conn = get_database_connection()
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=5000,
-        chunk_overlap=500,
-    )
-
     for obj in objects['Contents']:
         s3_key = obj['Key']
         local_filename = os.path.basename(s3_key)
@@ -372,7 +370,11 @@ def ingest_knowledge_dataset(bucket_name):
         # remove downloaded file
         os.remove(local_filename)
 
-        chunks = text_splitter.split_documents(docs)
+        chunks = [
+            Document(page_content=chunk, metadata=doc.metadata)
+            for doc in docs
+            for chunk in get_text_chunks(doc.page_content, 5000, 500)
+        ]
         insert_chunks(conn, chunks)
 
 def ingest_and_embed():
@@ -0,0 +1,94 @@
+"""
+Dependency-free text chunker, producing the same chunks as
+RecursiveCharacterTextSplitter (keep_separator=True, strip_whitespace=True,
+length_function=len).
+
+A copy of the offset-based chunker in
+03-retrieval-augmented-generation/rag_text.py, so this lab runs on its own.
+Separators are located with str.find over index ranges and chunks are sliced
+once from the source text, instead of being re-joined from split fragments.
+"""
+from collections import deque
+
+# RecursiveCharacterTextSplitter's default separators
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def _separator_pieces(text, start, end, separator):
+    # non-empty (start, end) pieces, each separator kept at the start of its piece
+    if not separator:
+        yield from ((i, i + 1) for i in range(start, end))
+        return
+    prev = start
+    pos = text.find(separator, start, end)
+    while pos != -1:
+        if pos > prev:
+            yield prev, pos
+        prev = pos
+        pos = text.find(separator, pos + len(separator), end)
+    if end > prev:
+        yield prev, end
+
+
+def _append_stripped(text, start, end, out):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end > start:
+        out.append((start, end))
+
+
+def _merge_pieces(text, pieces, chunk_size, chunk_overlap, out):
+    # greedily merge adjacent pieces into chunks, carrying chunk_overlap over
+    current = deque()
+    total = 0
+    for start, end in pieces:
+        length = end - start
+        if current and total + length > chunk_size:
+            _append_stripped(text, current[0][0], current[-1][1], out)
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                first_start, first_end = current.popleft()
+                total -= first_end - first_start
+        current.append((start, end))
+        total += length
+    if current:
+        _append_stripped(text, current[0][0], current[-1][1], out)
+
+
+def _split_spans(text, start, end, separators, chunk_size, chunk_overlap, out):
+    # Use the first separator that occurs in this range; pieces that are
+    # still too long are split again with the separators after it.
+    separator, remaining = separators[-1], []
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if text.find(candidate, start, end) != -1:
+            separator, remaining = candidate, separators[i + 1:]
+            break
+
+    small = []
+    for piece_start, piece_end in _separator_pieces(text, start, end, separator):
+        if piece_end - piece_start < chunk_size:
+            small.append((piece_start, piece_end))
+            continue
+        if small:
+            _merge_pieces(text, small, chunk_size, chunk_overlap, out)
+            small = []
+        if remaining:
+            _split_spans(text, piece_start, piece_end, remaining, chunk_size, chunk_overlap, out)
+        else:
+            out.append((piece_start, piece_end))
+    if small:
+        _merge_pieces(text, small, chunk_size, chunk_overlap, out)
+
+
+def get_text_chunks(text, chunk_size=1000, chunk_overlap=200, separators=None):
+    """
+    Split text into overlapping chunks suitable for embedding.
+    """
+    spans = []
+    _split_spans(text, 0, len(text), separators or DEFAULT_SEPARATORS,
+                 chunk_size, chunk_overlap, spans)
+    return [text[start:end] for start, end in spans]
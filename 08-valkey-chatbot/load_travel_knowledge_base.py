@@ -1,15 +1,16 @@
 import argparse
 import ast
 import csv
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import psycopg
 from dotenv import load_dotenv
 
 
-def to_pgvector(value):
-    embedding = ast.literal_eval(value)
+def to_pgvector(embedding):
     return "[" + ",".join(str(item) for item in embedding) + "]"
 
 
@@ -19,7 +20,25 @@ def load_rows(csv_path):
         for row in reader:
             if len(row) != 4:
                 raise ValueError(f"Expected 4 columns in {csv_path}, found {len(row)}")
-            yield int(row[0]), row[1], to_pgvector(row[2]), row[3]
+            yield int(row[0]), row[1], ast.literal_eval(row[2]), row[3]
+
+
+def embed_texts(texts, dimensions, workers=8):
+    """Embed *texts* with Titan V2 at *dimensions* (the CSV ships 1024-d vectors)."""
+    import boto3
+
+    bedrock = boto3.client("bedrock-runtime", region_name=os.getenv("AWS_REGION", "us-west-2"))
+    model_id = os.getenv("BEDROCK_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+
+    def embed(text):
+        response = bedrock.invoke_model(
+            modelId=model_id,
+            body=json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True}),
+        )
+        return json.loads(response["body"].read())["embedding"]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(embed, texts))
 
 
 def main():
@@ -34,10 +53,26 @@ def main():
         action="store_true",
         help="Delete existing rows before loading the CSV.",
     )
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=None,
+        choices=[256, 512, 1024],
+        help="Embedding size (default: EMBEDDING_DIMENSIONS, else 1024). Rows whose CSV "
+             "vector has another size are re-embedded with Bedrock.",
+    )
     args = parser.parse_args()
 
     load_dotenv()
     csv_path = Path(args.csv)
+    dimensions = args.dimensions or int(os.getenv("EMBEDDING_DIMENSIONS", "1024"))
+    rows = list(load_rows(csv_path))
+    stale = [i for i, row in enumerate(rows) if len(row[2]) != dimensions]
+    if stale:
+        print(f"Embedding {len(stale)} rows at {dimensions} dimensions...")
+        vectors = embed_texts([rows[i][1] for i in stale], dimensions)
+        for i, vector in zip(stale, vectors):
+            rows[i] = (rows[i][0], rows[i][1], vector, rows[i][3])
 
     conninfo = {
         "host": os.environ["DB_HOST"],
@@ -51,17 +86,33 @@ def main():
         with conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
             cur.execute(
-                """
+                f"""
                 CREATE TABLE IF NOT EXISTS travel_knowledge_base (
                     id integer PRIMARY KEY,
                     content text NOT NULL,
-                    embedding vector(1024) NOT NULL,
+                    embedding vector({dimensions}) NOT NULL,
                     category text
                 );
                 """
             )
             if args.truncate:
                 cur.execute("TRUNCATE TABLE travel_knowledge_base;")
+            cur.execute(
+                "SELECT atttypmod FROM pg_attribute "
+                "WHERE attrelid = 'travel_knowledge_base'::regclass AND attname = 'embedding'"
+            )
+            current = cur.fetchone()[0]
+            if current != dimensions:
+                if not args.truncate:
+                    raise SystemExit(
+                        f"travel_knowledge_base.embedding is vector({current}); rerun with "
+                        f"--truncate, or use scripts/reembed_titan.py --preset valkey to "
+                        f"switch to {dimensions} dimensions without downtime."
+                    )
+                cur.execute(
+                    f"ALTER TABLE travel_knowledge_base "
+                    f"ALTER COLUMN embedding TYPE vector({dimensions});"
+                )
 
             cur.executemany(
                 """
@@ -72,7 +123,8 @@ def main():
                     embedding = EXCLUDED.embedding,
                     category = EXCLUDED.category;
                 """,
-                list(load_rows(csv_path)),
+                [(id_, content, to_pgvector(vector), category)
+                 for id_, content, vector, category in rows],
             )
             cur.execute(
                 """
@@ -29,6 +29,8 @@ DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_PORT = int(os.getenv('DB_PORT', '5432'))
 EMBEDDING_MODEL_ID = os.getenv('BEDROCK_EMBEDDING_MODEL_ID', 'amazon.titan-embed-text-v2:0')
+# Titan V2 output size (256, 512 or 1024); must match travel_knowledge_base.embedding
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '1024'))
 
 # Initialize connections
 def init_connections():
@@ -86,7 +88,7 @@ def get_embedding(text):
     try:
         response = bedrock.invoke_model(
             modelId=EMBEDDING_MODEL_ID,
-            body=json.dumps({"inputText": text, "dimensions": 1024, "normalize": True})
+            body=json.dumps({"inputText": text, "dimensions": EMBEDDING_DIMENSIONS, "normalize": True})
         )
         response_body = json.loads(response.get('body').read())
         return response_body.get('embedding')
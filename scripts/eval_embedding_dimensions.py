@@ -0,0 +1,150 @@
+"""
+Recall and latency of Titan V2 embeddings at 256, 512 and 1024 dimensions on a lab's own data.
+
+    python scripts/eval_embedding_dimensions.py --preset blaize --sample 2000 --queries 200
+
+Samples --sample rows from the preset's table (the same rows on every run),
+embeds their text with Titan V2 at each dimension, loads the vectors into a
+temporary table with an HNSW cosine index, and runs the queries against it.
+The stored embeddings are not read or changed.
+
+Queries come from --queries-file, a JSON Lines file of
+``{"query": "...", "relevant": ["<id>", ...]}`` whose ids refer to the
+sampled rows, or are otherwise synthesized: a random 8-16 word span of a
+sampled row's text, with that row as the only relevant one.
+
+For each dimension the report shows:
+
+* embed ms  - median Bedrock latency of one query embedding;
+* build s   - HNSW index build time;  index MB - its size;
+* recall@k  - share of relevant rows found in the top k;
+* vs 1024   - overlap of the top k with the 1024-dimension top k;
+* p50/p95   - SQL latency of the top-k search.
+"""
+import argparse
+import json
+import random
+import time
+
+from titan_dimensions import (PRESETS, TITAN_DIMENSIONS, connect, embed_texts,
+                              make_bedrock_client, percentile, text_rows_sql,
+                              vector_literal)
+
+
+def sample_rows(conn, preset, sample):
+    query = text_rows_sql(preset, "TRUE") + " ORDER BY md5(s.id::text) LIMIT %s"
+    return [(str(key), text) for key, text in conn.execute(query, (sample,))]
+
+
+def synthetic_queries(rows, count, seed=42):
+    rng = random.Random(seed)
+    queries = []
+    for key, text in rng.sample(rows, min(count, len(rows))):
+        words = text.split()
+        length = min(len(words), rng.randint(8, 16))
+        start = rng.randint(0, len(words) - length)
+        queries.append((" ".join(words[start:start + length]), {key}))
+    return queries
+
+
+def load_queries(path, rows):
+    keys = {key for key, _ in rows}
+    queries = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                relevant = {str(r) for r in item["relevant"]} & keys
+                if relevant:
+                    queries.append((item["query"], relevant))
+    return queries
+
+
+def search(conn, table, vector, k):
+    return [key for key, in conn.execute(
+        f"SELECT id FROM {table} ORDER BY embedding <=> %s::vector LIMIT %s",
+        (vector_literal(vector), k))]
+
+
+def evaluate(conn, client, rows, queries, dims, args):
+    table = f"eval_titan_{dims}"
+    vectors, _ = embed_texts(client, [text for _, text in rows], dims, args.workers)
+    query_vectors, embed_latency = embed_texts(client, [q for q, _ in queries], dims, args.workers)
+
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(f"CREATE TEMP TABLE {table} (id text PRIMARY KEY, embedding vector({dims}))")
+    with conn.cursor().copy(f"COPY {table} (id, embedding) FROM STDIN") as copy:
+        for (key, _), vector in zip(rows, vectors):
+            copy.write_row((key, vector_literal(vector)))
+    start = time.perf_counter()
+    conn.execute(f"CREATE INDEX ON {table} USING hnsw (embedding vector_cosine_ops)")
+    conn.execute(f"ANALYZE {table}")
+    build = time.perf_counter() - start
+    size = conn.execute("SELECT sum(pg_relation_size(indexrelid)) FROM pg_index "
+                        "WHERE indrelid = %s::regclass AND NOT indisprimary",
+                        (table,)).fetchone()[0]
+    conn.execute(f"SET hnsw.ef_search = {int(args.ef_search)}")
+
+    for vector in query_vectors[:10]:
+        search(conn, table, vector, args.k)  # warm up
+    results, latency = [], []
+    for vector in query_vectors:
+        begin = time.perf_counter()
+        results.append(search(conn, table, vector, args.k))
+        latency.append((time.perf_counter() - begin) * 1000)
+    return {
+        "embed_ms": percentile(embed_latency, 50) * 1000,
+        "build_s": build,
+        "index_mb": size / 2**20,
+        "results": results,
+        "latency": latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), required=True)
+    parser.add_argument("--sample", type=int, default=2000, help="rows to embed and search")
+    parser.add_argument("--queries", type=int, default=200, help="synthetic queries to generate")
+    parser.add_argument("--queries-file", help="JSON Lines of {query, relevant} instead")
+    parser.add_argument("--dimensions", type=int, nargs="+", choices=TITAN_DIMENSIONS,
+                        default=list(TITAN_DIMENSIONS))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent Bedrock requests")
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    client = make_bedrock_client()
+    with connect(preset, autocommit=True) as conn:
+        rows = sample_rows(conn, preset, args.sample)
+        if args.queries_file:
+            queries = load_queries(args.queries_file, rows)
+        else:
+            queries = synthetic_queries(rows, args.queries)
+        if not queries:
+            raise SystemExit("No queries with relevant rows in the sample.")
+        print(f"{preset.table}: {len(rows)} rows, {len(queries)} queries, k={args.k}, "
+              f"ef_search={args.ef_search}")
+
+        reports = {dims: evaluate(conn, client, rows, queries, dims, args)
+                   for dims in sorted(set(args.dimensions), reverse=True)}
+
+    reference = reports.get(1024)
+    print(f"{'dims':>5} {'embed ms':>9} {'build s':>8} {'index MB':>9} {'recall@k':>9} "
+          f"{'vs 1024':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for dims, report in sorted(reports.items()):
+        recall = [len(relevant & set(found)) / min(len(relevant), args.k)
+                  for (_, relevant), found in zip(queries, report["results"])]
+        overlap = "-"
+        if reference:
+            shared = [len(set(a) & set(b)) / max(len(b), 1)
+                      for a, b in zip(report["results"], reference["results"])]
+            overlap = f"{sum(shared) / len(shared):.2%}"
+        print(f"{dims:>5} {report['embed_ms']:9.1f} {report['build_s']:8.2f} "
+              f"{report['index_mb']:9.1f} {sum(recall) / len(recall):9.2%} {overlap:>8} "
+              f"{percentile(report['latency'], 50):8.2f} {percentile(report['latency'], 95):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
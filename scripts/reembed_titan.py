@@ -0,0 +1,187 @@
+"""
+Re-embed a table's Titan V2 vectors at another dimension (256, 512, 1024) without downtime.
+
+    python scripts/reembed_titan.py --preset blaize --dimensions 512
+
+Steps, each resumable if the script is interrupted:
+
+1. add a shadow column ``<column>_next vector(N)`` (no table rewrite);
+2. backfill it in batches: read the rows that have a vector in the old
+   column but none in the shadow column yet, embed their text with
+   Bedrock, write the vectors back and commit;
+3. build every index of the old column on the shadow column with
+   CREATE INDEX CONCURRENTLY;
+4. in one short transaction, embed any rows added meanwhile, drop the old
+   column and rename the shadow column and its indexes into place. The
+   swap is refused while any row with an old vector has no new one (e.g.
+   its text is empty), so no row loses its embedding.
+
+Searches keep using the old column until step 4. After the swap, switch
+the application to the new dimension (the script prints what to change).
+Use --no-swap to stop after step 3 and run the swap later.
+The dropped column's space is reused as rows are updated; run VACUUM FULL
+in a maintenance window to return it to the operating system.
+"""
+import argparse
+import re
+import sys
+import time
+
+from psycopg import sql
+from titan_dimensions import (PRESETS, TITAN_DIMENSIONS, column_dimensions, connect,
+                              embed_texts, make_bedrock_client, text_rows_sql, vector_literal)
+
+
+def _missing(preset, shadow):
+    return f"t.{preset.column} IS NOT NULL AND t.{shadow} IS NULL"
+
+
+def pending_rows(conn, preset, shadow, limit):
+    query = text_rows_sql(preset, _missing(preset, shadow)) + " ORDER BY 1 LIMIT %s"
+    return conn.execute(query, (limit,)).fetchall()
+
+
+def missing_rows(conn, preset, shadow):
+    """Ids of the rows that have an old vector but no new one."""
+    return [key for key, in conn.execute(
+        f"SELECT t.{preset.id_column} FROM {preset.table} t "
+        f"WHERE {_missing(preset, shadow)} ORDER BY 1")]
+
+
+def write_vectors(conn, preset, shadow, rows, vectors):
+    with conn.cursor() as cur:
+        cur.executemany(
+            f"UPDATE {preset.table} SET {shadow} = %s::vector "
+            f"WHERE {preset.id_column} = %s",
+            [(vector_literal(v), key) for (key, _), v in zip(rows, vectors)],
+        )
+
+
+def backfill(conn, client, preset, shadow, dims, args, commit=True):
+    done, start = 0, time.perf_counter()
+    while True:
+        rows = pending_rows(conn, preset, shadow, args.batch_size)
+        if not rows:
+            return done
+        vectors, _ = embed_texts(client, [text for _, text in rows], dims, args.workers)
+        write_vectors(conn, preset, shadow, rows, vectors)
+        if commit:
+            conn.commit()
+        done += len(rows)
+        elapsed = time.perf_counter() - start
+        print(f"  {done} rows re-embedded ({done / elapsed:.1f} rows/s)", flush=True)
+
+
+def column_indexes(conn, table, column):
+    """(name, definition) of the single-column indexes on *column*."""
+    return conn.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = %s::regclass AND a.attname = %s
+    """, (table, column)).fetchall()
+
+
+def qualified_index(conn, preset, name):
+    """*name* qualified with the schema of *preset*'s table, as SQL text."""
+    schema, _, _ = preset.table.rpartition(".")
+    parts = (schema, name) if schema else (name,)
+    return sql.Identifier(*parts).as_string(conn)
+
+
+def build_shadow_indexes(conn, preset, shadow):
+    renames = []
+    for name, definition in column_indexes(conn, preset.table, preset.column):
+        _, using = definition.split(" USING ", 1)
+        using = re.sub(rf"\b{re.escape(preset.column)}\b", shadow, using)
+        new_name = f"{name[:58]}_next"
+        ident = sql.Identifier(new_name).as_string(conn)
+        qualified = qualified_index(conn, preset, new_name)
+        start = time.perf_counter()
+        if not index_valid(conn, qualified):
+            # an interrupted CONCURRENTLY build leaves an invalid index behind
+            conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {qualified}")
+            conn.execute(f"CREATE INDEX CONCURRENTLY {ident} ON {preset.table} USING {using}")
+            print(f"  built {new_name} in {time.perf_counter() - start:.1f}s")
+        renames.append((new_name, name))
+    return renames
+
+
+def index_valid(conn, name):
+    row = conn.execute("SELECT i.indisvalid FROM pg_index i "
+                       "WHERE i.indexrelid = to_regclass(%s)", (name,)).fetchone()
+    return bool(row and row[0])
+
+
+def swap(conn, client, preset, shadow, dims, renames, args):
+    """Catch up on rows written meanwhile, then move the shadow column into place."""
+    backfill(conn, client, preset, shadow, dims, args)
+    not_null = conn.execute(
+        "SELECT attnotnull FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s",
+        (preset.table, preset.column)).fetchone()[0]
+    with conn.transaction():
+        conn.execute(f"LOCK TABLE {preset.table} IN SHARE ROW EXCLUSIVE MODE")
+        # rows written since the last batch; the lock keeps this short
+        backfill(conn, client, preset, shadow, dims, args, commit=False)
+        missing = missing_rows(conn, preset, shadow)
+        if missing:
+            # raising rolls the transaction back; the old column stays
+            sample = ", ".join(str(key) for key in missing[:10])
+            raise SystemExit(f"{len(missing)} rows of {preset.table} have a {preset.column} "
+                             f"but no text to re-embed (e.g. {sample}); fix their text or "
+                             f"clear their {preset.column}, then rerun. Nothing was dropped.")
+        conn.execute(f"ALTER TABLE {preset.table} DROP COLUMN {preset.column}")
+        conn.execute(f"ALTER TABLE {preset.table} RENAME COLUMN {shadow} TO {preset.column}")
+        if not_null:
+            conn.execute(f"ALTER TABLE {preset.table} ALTER COLUMN {preset.column} SET NOT NULL")
+        for new_name, name in renames:
+            conn.execute(f"ALTER INDEX {qualified_index(conn, preset, new_name)} "
+                         f"RENAME TO {sql.Identifier(name).as_string(conn)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), required=True)
+    parser.add_argument("--dimensions", type=int, choices=TITAN_DIMENSIONS, required=True)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent Bedrock requests")
+    parser.add_argument("--no-swap", action="store_true",
+                        help="backfill and index the shadow column, but keep the old one")
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    dims = args.dimensions
+    shadow = f"{preset.column}_next"
+    client = make_bedrock_client()
+    with connect(preset) as conn:
+        current = column_dimensions(conn, preset.table, preset.column)
+        if current == dims:
+            sys.exit(f"{preset.table}.{preset.column} is already vector({dims})")
+        existing = column_dimensions(conn, preset.table, shadow)
+        if existing not in (None, dims):
+            sys.exit(f"{preset.table}.{shadow} exists as vector({existing}); drop it first")
+        print(f"{preset.table}.{preset.column}: vector({current}) -> vector({dims})")
+
+        conn.execute(f"ALTER TABLE {preset.table} ADD COLUMN IF NOT EXISTS {shadow} vector({dims})")
+        conn.commit()
+        print(f"{backfill(conn, client, preset, shadow, dims, args)} rows backfilled")
+        missing = len(missing_rows(conn, preset, shadow))
+        if missing:
+            print(f"Warning: {missing} rows have a {preset.column} but no text to re-embed; "
+                  f"the swap is refused until they do.")
+
+        conn.commit()
+        conn.autocommit = True  # CREATE INDEX CONCURRENTLY
+        renames = build_shadow_indexes(conn, preset, shadow)
+        conn.autocommit = False
+        if args.no_swap:
+            print(f"Shadow column {shadow} ready; rerun without --no-swap to switch over.")
+            return
+        swap(conn, client, preset, shadow, dims, renames, args)
+    print(f"{preset.table}.{preset.column} is now vector({dims}).")
+    print(preset.followup.format(dims=dims))
+
+
+if __name__ == "__main__":
+    main()
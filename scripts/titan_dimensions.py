@@ -0,0 +1,154 @@
+"""
+Shared helpers for reembed_titan.py and eval_embedding_dimensions.py.
+
+Titan Text Embeddings V2 returns 256-, 512- or 1024-dimensional vectors
+depending on the "dimensions" field of the request. Each preset below
+describes one table in this repository that stores Titan V2 embeddings:
+where its connection settings live, which column holds the vector, and a
+query producing the text that was embedded for each row (the same text
+the lab's own ingestion code embeds).
+"""
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+from dotenv import load_dotenv
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TITAN_MODEL_ID = "amazon.titan-embed-text-v2:0"
+TITAN_DIMENSIONS = (256, 512, 1024)
+
+# module: lab directory whose .env holds the connection settings
+# env: psycopg keyword -> environment variable
+# text_sql: SELECT id, text FROM <table> t WHERE {where}; {where} filters on alias t
+#   (callers wrap it with text_rows_sql, which drops rows without text)
+# followup: what to change in the lab after the column has been resized
+Preset = namedtuple("Preset", ["module", "env", "table", "id_column", "column", "text_sql",
+                               "followup"])
+
+_DB_ENV = {"host": "DB_HOST", "port": "DB_PORT", "dbname": "DB_NAME",
+           "user": "DB_USER", "password": "DB_PASSWORD"}
+
+PRESETS = {
+    "blaize": Preset(
+        module="05-blaize-bazaar",
+        env=_DB_ENV,
+        table="bedrock_integration.product_catalog",
+        id_column='"productId"',
+        column="embedding",
+        text_sql='SELECT t."productId", t.product_description '
+                 'FROM bedrock_integration.product_catalog t WHERE {where}',
+        followup="Set EMBEDDING_DIMENSIONS={dims} in 05-blaize-bazaar/.env and restart Streamlit.",
+    ),
+    "valkey": Preset(
+        module="08-valkey-chatbot",
+        env=_DB_ENV,
+        table="travel_knowledge_base",
+        id_column="id",
+        column="embedding",
+        text_sql="SELECT t.id, t.content FROM travel_knowledge_base t WHERE {where}",
+        followup="Set EMBEDDING_DIMENSIONS={dims} in 08-valkey-chatbot/.env and restart Streamlit.",
+    ),
+    "chatbot": Preset(
+        module="07-aurora-ml-chatbot",
+        env={"host": "POSTGRESQL_ENDPOINT", "port": "POSTGRESQL_PORT",
+             "dbname": "POSTGRESQL_DBNAME", "user": "POSTGRESQL_USER",
+             "password": "POSTGRESQL_PW"},
+        table="auroraml_chatbot",
+        id_column="id",
+        column="embedding",
+        text_sql="SELECT t.id, t.content FROM auroraml_chatbot t WHERE {where}",
+        followup="Set EMBEDDING_DIMENSIONS={dims} in 07-aurora-ml-chatbot/.env and run "
+                 "`python chatbot.py --configure` to recreate generate_embeddings/generate_text.",
+    ),
+    "movies": Preset(
+        module="04-aurora-ml-movie-recommendations",
+        env={"host": "DBHOST", "port": "DBPORT", "dbname": "DBNAME",
+             "user": "DBUSER", "password": "DBPASSWORD"},
+        table="movie.movies",
+        id_column="id",
+        column="movie_embedding",
+        # same text as movie.generate_movie_embeddings() in data/functions.sql;
+        # concat_ws and the outer join also cover a movie missing its overview
+        # or credits, where the || concatenation would be NULL
+        text_sql="""
+            SELECT t.id,
+                   regexp_replace(
+                       concat_ws(' ', t.title, t.overview, ARRAY_TO_STRING(t.keywords, ' '),
+                                 ARRAY_TO_STRING(t.genre_id, ' '), cr.names),
+                       '\\s\\s+', ' ', 'g')
+            FROM movie.movies t
+            LEFT JOIN LATERAL (
+                SELECT STRING_AGG(c->>'name', ' , ') AS names
+                FROM jsonb_array_elements(t.credits) AS c) cr ON TRUE
+            WHERE {where}""",
+        followup="Nothing to change: movie.embedding_dimensions() reads the new column type.",
+    ),
+}
+
+
+def connect(preset, **kwargs):
+    """Open a psycopg connection using the preset lab's .env."""
+    load_dotenv(os.path.join(REPO_ROOT, preset.module, ".env"))
+    conninfo = {key: os.getenv(var) for key, var in preset.env.items() if os.getenv(var)}
+    return psycopg.connect(**conninfo, **kwargs)
+
+
+def column_dimensions(conn, table, column):
+    """Declared dimension of a vector(N) column, or None if it has none or is missing."""
+    row = conn.execute(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attname = %s AND NOT attisdropped",
+        (table, column),
+    ).fetchone()
+    return row[0] if row and row[0] > 0 else None
+
+
+def text_rows_sql(preset, where):
+    """*preset*'s text query for the rows matching *where*, skipping NULL or blank text."""
+    return (f"SELECT * FROM ({preset.text_sql.format(where=where)}) s (id, text) "
+            f"WHERE btrim(s.text) <> ''")
+
+
+def vector_literal(vector):
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+def make_bedrock_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client("bedrock-runtime", region_name=os.getenv("AWS_REGION", "us-west-2"),
+                        config=Config(retries={"max_attempts": 10, "mode": "adaptive"}))
+
+
+def embed_texts(client, texts, dimensions, workers=8):
+    """
+    Embed *texts* with Titan V2 at *dimensions*, *workers* requests at a time.
+
+    Returns ``(vectors, seconds)`` with the per-request latencies; botocore's
+    adaptive retry mode absorbs throttling.
+    """
+    if dimensions not in TITAN_DIMENSIONS:
+        raise ValueError(f"Titan V2 supports {TITAN_DIMENSIONS} dimensions, not {dimensions}")
+
+    def embed(text):
+        start = time.perf_counter()
+        response = client.invoke_model(
+            modelId=TITAN_MODEL_ID,
+            body=json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True}),
+        )
+        vector = json.loads(response["body"].read())["embedding"]
+        return vector, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(embed, texts))
+    return [v for v, _ in results], [s for _, s in results]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]